@@ -0,0 +1,231 @@
+# =============================================================================
+# Benchmark: CanSat API client against a local stand-in CanSat
+# Run from the src folder: python -m benchmarks.cansat [commands] [browsers]
+# =============================================================================
+
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import threading
+import requests
+import json
+import sys
+import time
+import os
+
+from scripts.cansat import CansatClient, CansatError
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+SETTINGS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "res/settings/")
+DEFAULT_COMMANDS = 200
+DEFAULT_BROWSERS = 50
+
+# Time the stand-in CanSat takes to read its sensors
+STATUS_DELAY = 0.02
+POLL_SECONDS = 2
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Answers every endpoint of urls.json with json, keeps the connections alive (HTTP/1.1)
+# 	- status takes STATUS_DELAY seconds
+# 	- the first server.failures requests get a 503 answer
+class StandInCansat(BaseHTTPRequestHandler):
+
+	protocol_version = "HTTP/1.1"
+
+	# Headers and body are written separately, Nagle would delay the body until the ack
+	disable_nagle_algorithm = True
+
+
+	def answer(self):
+
+		server = self.server
+
+		with server.lock:
+
+			server.requests[self.path] = server.requests.get(self.path, 0) + 1
+			failing = server.failures > 0
+			server.failures -= 1 if failing else 0
+
+		length = int(self.headers.get("Content-Length", 0))
+		self.rfile.read(length)
+
+		if failing:
+
+			body = b'{"error": "busy"}'
+			self.send_response(503)
+
+		else:
+
+			if self.path == server.urls["status"]:
+
+				time.sleep(STATUS_DELAY)
+
+			body = json.dumps({"path": self.path, "method": self.command, "time": time.time()}).encode("utf-8")
+			self.send_response(200)
+
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+		return
+
+
+	do_GET = answer
+	do_POST = answer
+
+
+	def log_message(self, format, *args):
+
+		return
+
+
+def start_stand_in(urls):
+
+	server = ThreadingHTTPServer(("127.0.0.1", 0), StandInCansat)
+	server.daemon_threads = True
+	server.urls = urls
+	server.requests = {}
+	server.failures = 0
+	server.lock = threading.Lock()
+	threading.Thread(target = server.serve_forever, daemon = True).start()
+
+	return server
+
+
+def create_client(server):
+
+	return CansatClient(
+		False,
+		f"http://127.0.0.1:{server.server_address[1]}",
+		os.path.join(SETTINGS_PATH, "urls.json"),
+		os.path.join(SETTINGS_PATH, "cansat.json")
+		)
+
+
+# Command latency: a new connection per command (requests.request) vs the keep-alive session of the client
+def bench_commands(server, client, commands):
+
+	endpoint = "start_buzzer"
+
+	start = time.perf_counter()
+
+	for n in range(commands):
+
+		requests.request(client.method(endpoint), client.url(endpoint), timeout = client.timeout(endpoint)).json()
+
+	new_connection = (time.perf_counter() - start) / commands
+
+	client.call(endpoint)
+	start = time.perf_counter()
+
+	for n in range(commands):
+
+		client.call(endpoint)
+
+	keep_alive = (time.perf_counter() - start) / commands
+
+	print(f"{'command latency (ms)':>32} new connection: {new_connection * 1000:.2f}, keep-alive: {keep_alive * 1000:.2f} ({new_connection / keep_alive:.1f}x)")
+
+	return
+
+
+# browsers threads poll the status as fast as they can for POLL_SECONDS seconds
+def bench_status(server, client, browsers):
+
+	calls = [0] * browsers
+	stop = time.perf_counter() + POLL_SECONDS
+	before = server.requests.get(server.urls["status"], 0)
+
+	def poll(n):
+
+		while time.perf_counter() < stop:
+
+			client.status()
+			calls[n] += 1
+
+		return
+
+	threads = [threading.Thread(target = poll, args = (n,)) for n in range(browsers)]
+
+	for thread in threads:
+
+		thread.start()
+
+	for thread in threads:
+
+		thread.join()
+
+	upstream = server.requests.get(server.urls["status"], 0) - before
+
+	print(f"{'status polling':>32} {browsers} browsers, {sum(calls)} status calls, {upstream} requests to the CanSat ({sum(calls) / max(upstream, 1):.0f} calls per request)")
+
+	return
+
+
+# The first answers are 503: GET requests are retried with backoff, commands are not
+def bench_retry(server, client):
+
+	server.failures = client.config["retries"]
+	start = time.perf_counter()
+	client.call("logs")
+	elapsed = time.perf_counter() - start
+
+	server.failures = 1
+
+	try:
+
+		client.call("start_buzzer")
+		command = "sent"
+
+	except CansatError as e:
+
+		command = f"failed ({e})"
+
+	server.failures = 0
+
+	print(f"{'retries':>32} logs after {client.config['retries']} x 503: ok in {elapsed * 1000:.0f}ms, command after 1 x 503: {command}")
+
+	return
+
+
+def main(commands, browsers):
+
+	with open(os.path.join(SETTINGS_PATH, "urls.json"), "r", encoding = "utf-8") as file:
+
+		urls = json.load(file)
+		file.close()
+
+	server = start_stand_in(urls)
+	client = create_client(server)
+
+	bench_commands(server, client, commands)
+	bench_status(server, client, browsers)
+	bench_retry(server, client)
+
+	client.close()
+	server.shutdown()
+
+	return
+
+
+if __name__ == '__main__':
+
+	main(
+		int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_COMMANDS,
+		int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_BROWSERS
+		)
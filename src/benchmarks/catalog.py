@@ -0,0 +1,103 @@
+# =============================================================================
+# Benchmark: catalog scans (manifests built, read from the index, one data set added)
+# Run from the src folder: python -m benchmarks.catalog [data sets] [samples]
+# =============================================================================
+
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import numpy as np
+import tempfile
+import shutil
+import sys
+import time
+import os
+
+from scripts.datasets import DatasetRegistry, write_dataset
+from scripts.catalog import Catalog
+from scripts.pyramid import PyramidStore
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+DEFAULT_DATA_SETS = 20
+DEFAULT_SAMPLES = 10 ** 5
+SAMPLE_RATE = 1 / 0.3
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+def create_data_set(path, samples, seed):
+
+	generator = np.random.default_rng(seed)
+	os.makedirs(path)
+
+	write_dataset(path, {
+		"press": (1000 + generator.normal(0, 0.1, samples)).astype(np.float32),
+		"temp": generator.normal(20, 1, samples).astype(np.float32),
+		"lat": (47.3 + np.cumsum(generator.normal(0, 1e-5, samples))).astype(np.float32),
+		"lon": (5.1 + np.cumsum(generator.normal(0, 1e-5, samples))).astype(np.float32),
+		"ax": generator.normal(0, 50, samples).astype(np.int16),
+		"ay": generator.normal(0, 50, samples).astype(np.int16),
+		"az": generator.normal(0, 50, samples).astype(np.int16)
+	}, SAMPLE_RATE)
+
+	return
+
+
+def bench_scan(name, catalog):
+
+	start = time.perf_counter()
+	manifests = catalog.scan()
+	elapsed = time.perf_counter() - start
+
+	print(f"{name:>24} {elapsed * 1000:9.1f}ms | {len(manifests)} data sets | {catalog.stats()}")
+
+	return
+
+
+def main(data_sets, samples):
+
+	root_path = tempfile.mkdtemp()
+	data_path = os.path.join(root_path, "normal")
+
+	for n in range(data_sets):
+
+		create_data_set(os.path.join(data_path, str(n)), samples, n)
+
+	index_path = os.path.join(root_path, "catalog.json")
+	registry = DatasetRegistry(False, data_path, SAMPLE_RATE, 2 ** 30)
+
+	# The pyramids are built with the manifests, like in the application
+	bench_scan("first scan", Catalog(False, registry, index_path, PyramidStore(False)))
+
+	catalog = Catalog(False, registry, index_path, PyramidStore(False))
+	bench_scan("from the index", catalog)
+	bench_scan("again", catalog)
+
+	create_data_set(os.path.join(data_path, str(data_sets)), samples, data_sets)
+	bench_scan("one data set added", catalog)
+
+	shutil.rmtree(os.path.join(data_path, "0"))
+	bench_scan("one data set removed", catalog)
+
+	shutil.rmtree(root_path)
+
+	return
+
+
+if __name__ == '__main__':
+
+	main(
+		int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DATA_SETS,
+		int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_SAMPLES
+		)
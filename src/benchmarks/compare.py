@@ -0,0 +1,100 @@
+# =============================================================================
+# Benchmark: loading the flights of a comparison one after the other or by a pool of threads
+# Run from the src folder: python -m benchmarks.compare [flights] [samples]
+# =============================================================================
+
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import numpy as np
+import tempfile
+import shutil
+import sys
+import time
+import os
+
+from scripts.datasets import Dataset, write_dataset
+from scripts.graphs import Chart
+from scripts.compare import map_parallel
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+SETTINGS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "res/settings/")
+DEFAULT_FLIGHTS = 8
+DEFAULT_SAMPLES = 5 * 10 ** 6
+SAMPLE_RATE = 1 / 0.3
+
+# Channels drawn for each flight
+CHANNELS = ["press", "temp", "alt", "hum"]
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+def create_flights(root_path, flights, samples):
+
+	paths = []
+
+	for n in range(flights):
+
+		generator = np.random.default_rng(n)
+		path = os.path.join(root_path, str(n))
+		os.makedirs(path)
+		write_dataset(path, {name: generator.normal(0, 1, samples).astype(np.float32) for name in CHANNELS}, SAMPLE_RATE)
+		paths.append(path)
+
+	return paths
+
+
+def bench_load(name, chart, paths, workers):
+
+	def load(path):
+
+		data = Dataset(path)
+
+		return chart.flight_lines(None, [data[channel] for channel in CHANNELS], 0, False)
+
+	start = time.perf_counter()
+	flights = map_parallel(load, paths, workers)
+	elapsed = time.perf_counter() - start
+
+	points = sum(len(X) for lines in flights for X, Y in lines)
+	print(f"{name:>24} {elapsed * 1000:9.1f}ms | {len(flights)} flights, {points} points to draw")
+
+	return elapsed
+
+
+def main(flights, samples):
+
+	root_path = tempfile.mkdtemp()
+	paths = create_flights(root_path, flights, samples)
+	chart = Chart(False, os.path.join(SETTINGS_PATH, "charts.json"), root_path, None)
+
+	# The first load reads the files from the disk
+	bench_load("warm up", chart, paths, 1)
+
+	serial = bench_load("one after the other", chart, paths, 1)
+	parallel = bench_load(f"{min(flights, os.cpu_count() or 1)} threads", chart, paths, None)
+
+	print(f"{'speedup':>24} {serial / parallel:9.2f}x ({os.cpu_count()} cores)")
+
+	shutil.rmtree(root_path)
+
+	return
+
+
+if __name__ == '__main__':
+
+	main(
+		int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_FLIGHTS,
+		int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_SAMPLES
+		)
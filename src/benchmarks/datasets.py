@@ -0,0 +1,156 @@
+# =============================================================================
+# Benchmark: pickle data.bin vs columnar memory-mapped dataset
+# Run from the src folder: python -m benchmarks.datasets [hours ...]
+# =============================================================================
+
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import multiprocessing
+import numpy as np
+import pickle
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import os
+
+from scripts.datasets import convert_pickle, open_dataset, PICKLE_NAME
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+RECORDING_FREQUENCY = 0.3
+DEFAULT_HOURS = [1, 3, 6]
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Build a fake flight with the same channels and dtypes as a CanSat data.bin
+def synthetic_flight(hours):
+
+	n = int(hours * 3600 / RECORDING_FREQUENCY)
+	rng = np.random.default_rng(0)
+	t = np.arange(n, dtype = "float64") * RECORDING_FREQUENCY
+
+	data = {}
+	data["press"] = (1013 - t / t[-1] * 100 + rng.normal(0, 0.2, n)).astype("float32")
+	data["temp"] = rng.normal(15, 2, n).astype("float16")
+	data["alt"] = (t / t[-1] * 1000).astype("float16")
+	data["hum"] = rng.uniform(30, 60, n).astype("float16")
+	data["ax"] = rng.integers(-500, 500, n).astype("int16")
+	data["ay"] = rng.integers(-500, 500, n).astype("int16")
+	data["az"] = rng.integers(-500, 500, n).astype("int16")
+	data["lat"] = (47.34 + np.cumsum(rng.normal(0, 1e-5, n))).astype("float32")
+	data["lon"] = (5.06 + np.cumsum(rng.normal(0, 1e-5, n))).astype("float32")
+	data["sat"] = rng.integers(0, 12, n).astype("uint8")
+	data["qual"] = rng.integers(0, 5, n).astype("uint8")
+	data["speed"] = rng.normal(8, 1, n).astype("float16")
+	data["therm"] = rng.normal(20, 5, (n, 8, 8)).astype("float16")
+
+	return data
+
+
+# Resident set size of the current process (linux), falls back on the peak RSS elsewhere
+def rss_kb():
+
+	try:
+
+		with open("/proc/self/statm", "r") as file:
+
+			pages = int(file.read().split()[1])
+			file.close()
+
+		return pages * resource.getpagesize() // 1024
+
+	except OSError:
+
+		return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+# Open the data set like the map view does (only lat/lon are read)
+def measure(path, mode, results):
+
+	rss = rss_kb()
+	start = time.perf_counter()
+
+	if mode == "pickle":
+
+		with open(os.path.join(path, PICKLE_NAME), "rb") as file:
+
+			data = pickle.load(file)
+			file.close()
+
+	else:
+
+		data = open_dataset(path, 1 / RECORDING_FREQUENCY)
+
+	lat = float(np.asarray(data["lat"]).sum())
+	lon = float(np.asarray(data["lon"]).sum())
+	elapsed = time.perf_counter() - start
+
+	results.put((elapsed, rss_kb() - rss))
+
+	return
+
+
+def run(path, mode):
+
+	context = multiprocessing.get_context("spawn")
+	results = context.Queue()
+	process = context.Process(target = measure, args = (path, mode, results))
+	process.start()
+	result = results.get()
+	process.join()
+
+	return result
+
+
+def main(hours_list):
+
+	print(f"{'hours':>6} {'samples':>9} {'size (MB)':>10} {'pickle (ms)':>12} {'pickle RSS (MB)':>16} {'memmap (ms)':>12} {'memmap RSS (MB)':>16}")
+
+	for hours in hours_list:
+
+		path = tempfile.mkdtemp()
+
+		try:
+
+			data = synthetic_flight(hours)
+
+			with open(os.path.join(path, PICKLE_NAME), "wb") as file:
+
+				pickle.dump(data, file)
+				file.close()
+
+			convert_pickle(path, 1 / RECORDING_FREQUENCY)
+
+			# Computed once when a data set is first opened: only the opening is measured
+			open_dataset(path, 1 / RECORDING_FREQUENCY)
+
+			size = os.path.getsize(os.path.join(path, PICKLE_NAME)) / 2 ** 20
+			pickle_time, pickle_rss = run(path, "pickle")
+			memmap_time, memmap_rss = run(path, "memmap")
+
+			print(f"{hours:>6} {len(data['lat']):>9} {size:>10.1f} {pickle_time * 1000:>12.2f} {pickle_rss / 1024:>16.1f} {memmap_time * 1000:>12.2f} {memmap_rss / 1024:>16.1f}")
+
+		finally:
+
+			shutil.rmtree(path)
+
+	return
+
+
+if __name__ == '__main__':
+
+	main([float(h) for h in sys.argv[1:]] or DEFAULT_HOURS)
@@ -0,0 +1,100 @@
+# =============================================================================
+# Benchmark: min/max decimation before plotting
+# Run from the src folder: python -m benchmarks.decimation [samples ...]
+# =============================================================================
+
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import numpy as np
+import sys
+import time
+
+from scripts.decimation import minmax_decimate
+from scripts.graphs import CHART_WIDTH, CHART_DPI
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+DEFAULT_SAMPLES = [10 ** 5, 10 ** 6, 10 ** 7]
+PANEL_HEIGHT = 4
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Noisy descent with a few spikes, like an accelerometer channel
+def synthetic_channel(n):
+
+	rng = np.random.default_rng(0)
+	t = np.arange(n, dtype = "float64") * 0.3
+	y = np.sin(t / t[-1] * 20) * 100 + rng.normal(0, 5, n)
+	y[rng.integers(0, n, 20)] += rng.normal(0, 300, 20)
+
+	return t, y
+
+
+# Draw one panel the same way Chart.render_chart does and return the rgba pixels
+def render(x, y, marker):
+
+	fig = Figure(figsize = (CHART_WIDTH, PANEL_HEIGHT))
+	canvas = FigureCanvasAgg(fig)
+	ax = fig.subplots()
+	ax.plot(x, y, "#000000", marker = marker, linestyle = "-", linewidth = 1)
+	ax.set_xlim(x[0], x[-1])
+	ax.set_ylim(np.min(y), np.max(y))
+	fig.set_dpi(CHART_DPI)
+	canvas.draw()
+	pixels = np.asarray(canvas.buffer_rgba())[:, :, :3].copy()
+	fig.clear()
+
+	return pixels
+
+
+def timed_render(x, y, marker):
+
+	start = time.perf_counter()
+	pixels = render(x, y, marker)
+
+	return time.perf_counter() - start, pixels
+
+
+def main(samples_list):
+
+	print(f"{'samples':>10} {'marker':>6} {'kept':>6} {'decimate (ms)':>14} {'full (ms)':>10} {'reduced (ms)':>13} {'speedup':>8} {'pixels changed':>15}")
+
+	for n in samples_list:
+
+		x, y = synthetic_channel(n)
+
+		for marker in ("", "."):
+
+			start = time.perf_counter()
+			x_reduced, y_reduced = minmax_decimate(x, y, CHART_WIDTH * CHART_DPI)
+			decimate_time = time.perf_counter() - start
+
+			full_time, full_pixels = timed_render(x, y, marker)
+			reduced_time, reduced_pixels = timed_render(x_reduced, y_reduced, marker)
+			reduced_time += decimate_time
+
+			# Fraction of the pixels that differ between both images
+			error = np.any(full_pixels != reduced_pixels, axis = 2).mean()
+
+			print(f"{n:>10} {repr(marker):>6} {len(x_reduced):>6} {decimate_time * 1000:>14.1f} {full_time * 1000:>10.0f} {reduced_time * 1000:>13.0f} {full_time / reduced_time:>7.1f}x {error * 100:>14.2f}%")
+
+	return
+
+
+if __name__ == '__main__':
+
+	main([int(float(n)) for n in sys.argv[1:]] or DEFAULT_SAMPLES)
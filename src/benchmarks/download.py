@@ -0,0 +1,226 @@
+# =============================================================================
+# Benchmark: download of the CanSat recordings from a local stand-in CanSat dropping the connection
+# Run from the src folder: python -m benchmarks.download [archive MB] [drop every MB]
+# =============================================================================
+
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+import tracemalloc
+import threading
+import tempfile
+import zipfile
+import hashlib
+import pickle
+import shutil
+import json
+import sys
+import time
+import os
+
+from scripts.cansat import CansatClient
+from scripts.datasets import Dataset
+from scripts.download import download_data_sets
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+SETTINGS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "res/settings/")
+DEFAULT_SIZE = 64
+DEFAULT_DROP = 8
+SAMPLE_RATE = 1 / 0.3
+
+# Bytes written by the stand-in CanSat at once
+WRITE_SIZE = 64 * 1024
+
+# Recordings of the archive
+FLIGHTS = ["flight_1", "flight_2"]
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Serves the archive at the download url with ETag, Range and If-Range support and its sha256 in X-Checksum-Sha256
+# 	- after server.drop bytes sent in an answer, the connection is closed (0: never)
+class StandInCansat(BaseHTTPRequestHandler):
+
+	protocol_version = "HTTP/1.1"
+	disable_nagle_algorithm = True
+
+
+	def do_GET(self):
+
+		server = self.server
+		server.requests += 1
+		size = os.path.getsize(server.archive)
+		start = 0
+		range_header = self.headers.get("Range")
+
+		if range_header is not None and self.headers.get("If-Range", server.etag) == server.etag:
+
+			start = int(range_header[len("bytes="):].split("-")[0])
+
+		if start > 0:
+
+			self.send_response(206)
+			self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+
+		else:
+
+			self.send_response(200)
+
+		self.send_header("Content-Type", "application/zip")
+		self.send_header("Content-Length", str(size - start))
+		self.send_header("ETag", server.etag)
+		self.send_header(server.checksum_header, server.checksum)
+		self.end_headers()
+
+		sent = 0
+
+		with open(server.archive, "rb") as file:
+
+			file.seek(start)
+
+			while True:
+
+				chunk = file.read(WRITE_SIZE)
+
+				if len(chunk) == 0:
+
+					break
+
+				self.wfile.write(chunk)
+				sent += len(chunk)
+
+				if server.drop > 0 and sent >= server.drop:
+
+					server.drops += 1
+					self.close_connection = True
+
+					break
+
+			file.close()
+
+		return
+
+
+	def log_message(self, format, *args):
+
+		return
+
+
+# Archive with one data.bin per flight, the thermal camera channel makes its size
+def create_archive(path, size):
+
+	rows = size * 2 ** 20 // len(FLIGHTS) // (8 * 8 * 2)
+	generator = np.random.default_rng(0)
+
+	with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as archive:
+
+		for flight in FLIGHTS:
+
+			data = {
+				"press": (1000 - np.arange(rows) * 0.01).astype(np.float32),
+				"alt": (np.arange(rows) * 0.1).astype(np.float16),
+				"therm": generator.uniform(20, 30, (rows, 8, 8)).astype(np.float16)
+			}
+			archive.writestr(f"{flight}/data.bin", pickle.dumps(data))
+
+		archive.close()
+
+	digest = hashlib.sha256()
+
+	with open(path, "rb") as file:
+
+		for chunk in iter(lambda: file.read(2 ** 20), b""):
+
+			digest.update(chunk)
+
+		file.close()
+
+	return digest.hexdigest()
+
+
+def start_stand_in(archive, checksum, checksum_header, drop):
+
+	server = ThreadingHTTPServer(("127.0.0.1", 0), StandInCansat)
+	server.daemon_threads = True
+	server.archive = archive
+	server.checksum = checksum
+	server.checksum_header = checksum_header
+	server.etag = f'"{checksum[:16]}"'
+	server.drop = drop
+	server.drops = 0
+	server.requests = 0
+	threading.Thread(target = server.serve_forever, daemon = True).start()
+
+	return server
+
+
+def bench_download(name, server, data_path, size):
+
+	client = CansatClient(
+		False,
+		f"http://127.0.0.1:{server.server_address[1]}",
+		os.path.join(SETTINGS_PATH, "urls.json"),
+		os.path.join(SETTINGS_PATH, "cansat.json")
+		)
+
+	tracemalloc.start()
+	start = time.perf_counter()
+	data_sets = download_data_sets(client, data_path, SAMPLE_RATE)
+	elapsed = time.perf_counter() - start
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	client.close()
+
+	lengths = [len(Dataset(os.path.join(data_path, "normal", data_set))) for data_set in data_sets]
+
+	print(f"{name:>20} {elapsed:.2f}s ({size / elapsed:.0f} MB/s), {server.requests} requests, {server.drops} drops, data sets {', '.join(data_sets)} ({', '.join(map(str, lengths))} rows), peak python memory {peak / 2 ** 20:.1f} MB")
+
+	return
+
+
+def main(size, drop):
+
+	with open(os.path.join(SETTINGS_PATH, "cansat.json"), "r", encoding = "utf-8") as file:
+
+		checksum_header = json.load(file)["download"]["checksumHeader"]
+		file.close()
+
+	work_path = tempfile.mkdtemp()
+	archive = os.path.join(work_path, "archive.zip")
+	checksum = create_archive(archive, size)
+	size = os.path.getsize(archive) / 2 ** 20
+
+	for name, drop_bytes in (("no drop", 0), (f"drop every {drop}MB", int(drop * 2 ** 20))):
+
+		data_path = os.path.join(work_path, name.replace(" ", "_"))
+		os.makedirs(os.path.join(data_path, "normal"))
+		server = start_stand_in(archive, checksum, checksum_header, drop_bytes)
+
+		bench_download(name, server, data_path, size)
+
+		server.shutdown()
+
+	shutil.rmtree(work_path)
+
+	return
+
+
+if __name__ == '__main__':
+
+	main(
+		int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE,
+		float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_DROP
+		)
@@ -0,0 +1,123 @@
+# =============================================================================
+# Benchmark: live telemetry latency, from the row written to the row received by each viewer
+# Run from the src folder: python -m benchmarks.live [viewers] [seconds]
+# =============================================================================
+
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import numpy as np
+import threading
+import tempfile
+import shutil
+import json
+import sys
+import time
+import os
+
+from scripts.datasets import DatasetWriter
+from scripts.live import LiveFeed, write_pointer, live_channels
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+LIVE_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "res/settings/live.json")
+DEFAULT_VIEWERS = 50
+DEFAULT_SECONDS = 10
+DATA_SET = "0"
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Writes a row every pollInterval seconds, its time channel is the wall clock time it was written at
+def record(data_path, config, seconds):
+
+	channels = live_channels(config)
+	writer = DatasetWriter(os.path.join(data_path, "normal", DATA_SET), channels, 1 / config["pollInterval"])
+	write_pointer(data_path, {"dataSet": DATA_SET, "running": True, "started": time.time()})
+	stop = time.perf_counter() + seconds
+
+	while time.perf_counter() < stop:
+
+		row = {name: np.zeros(shape) for name, (dtype, shape) in channels.items()}
+		row["time"] = time.time()
+		writer.append([row])
+		time.sleep(config["pollInterval"])
+
+	writer.close()
+	write_pointer(data_path, {"dataSet": DATA_SET, "running": False, "started": None})
+
+	return
+
+
+# Waits for the rows like the /api/live/stream view, the latency of each row is the time it was received minus its time channel
+def view(feed, config, latencies, stopped):
+
+	data_set, index, running = None, 0, None
+
+	while not stopped.is_set():
+
+		data_set, first, rows, running = feed.wait(data_set, index, running, config["keepAlive"])
+		received = time.time()
+		index = first + len(rows)
+
+		for row in rows:
+
+			# Rows sent to the viewer as json
+			latencies.append(received - json.loads(row)["time"])
+
+	return
+
+
+def main(viewers, seconds):
+
+	with open(LIVE_CONFIG_PATH, "r", encoding = "utf-8") as file:
+
+		config = json.load(file)
+		file.close()
+
+	data_path = tempfile.mkdtemp()
+	os.makedirs(os.path.join(data_path, "normal"))
+
+	feed = LiveFeed(False, data_path, config["bufferSize"], config["tailInterval"], viewers)
+	stopped = threading.Event()
+	latencies = [[] for n in range(viewers)]
+
+	for n in range(viewers):
+
+		feed.connect()
+		threading.Thread(target = view, args = (feed, config, latencies[n], stopped), daemon = True).start()
+
+	record(data_path, config, seconds)
+
+	# The last rows are read by the next check
+	time.sleep(config["tailInterval"] * 2)
+	stopped.set()
+
+	latency = np.array([value for values in latencies for value in values]) * 1000
+	rows = feed.stats()["length"]
+
+	print(f"{viewers} viewers, {rows} rows every {config['pollInterval']}s, tail interval {config['tailInterval']}s")
+	print(f"{'rows received':>16} {len(latency)} ({len(latency) / max(viewers, 1):.0f} per viewer)")
+	print(f"{'latency (ms)':>16} median {np.median(latency):.1f}, p99 {np.percentile(latency, 99):.1f}, max {latency.max():.1f}")
+
+	shutil.rmtree(data_path)
+
+	return
+
+
+if __name__ == '__main__':
+
+	main(
+		int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_VIEWERS,
+		float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_SECONDS
+		)
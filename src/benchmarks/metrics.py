@@ -0,0 +1,121 @@
+# =============================================================================
+# Benchmark: derived metrics of synthetic flights (ascent, drop, descent under parachute)
+# Run from the src folder: python -m benchmarks.metrics [samples ...]
+# =============================================================================
+
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import numpy as np
+import sys
+import time
+
+from scripts.metrics import compute_metrics
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+DEFAULT_SAMPLES = [10 ** 4, 10 ** 6, 10 ** 7]
+GROUND_PRESSURE = 1013.25
+
+# Flight profile (seconds, meters, m/s): the same flight is sampled more or less often
+GROUND_TIME = 10.0
+ASCENT_TIME = 5.0
+APOGEE = 1000.0
+FREE_FALL_TIME = 3.0
+PARACHUTE_RATE = 8.0
+LANDED_TIME = 10.0
+GRAVITY = 9.81
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Altitude at each time: on the ground, rocket ascent, free fall, parachute descent then on the ground
+def flight_altitude(time):
+
+	altitude = np.zeros(len(time))
+
+	ascent = (time >= GROUND_TIME) & (time < GROUND_TIME + ASCENT_TIME)
+	altitude[ascent] = APOGEE * np.sin((time[ascent] - GROUND_TIME) / ASCENT_TIME * np.pi / 2)
+
+	apogee = GROUND_TIME + ASCENT_TIME
+	fall = (time >= apogee) & (time < apogee + FREE_FALL_TIME)
+	altitude[fall] = APOGEE - GRAVITY / 2 * (time[fall] - apogee) ** 2
+
+	descent_start = apogee + FREE_FALL_TIME
+	descent = time >= descent_start
+	altitude[descent] = np.maximum(APOGEE - GRAVITY / 2 * FREE_FALL_TIME ** 2 - (time[descent] - descent_start) * PARACHUTE_RATE, 0)
+
+	return altitude
+
+
+# Seconds between two samples for the whole flight to last samples samples
+def flight_period(samples):
+
+	apogee_height = APOGEE - GRAVITY / 2 * FREE_FALL_TIME ** 2
+	duration = GROUND_TIME + ASCENT_TIME + FREE_FALL_TIME + apogee_height / PARACHUTE_RATE + LANDED_TIME
+
+	return duration / samples
+
+
+def synthetic_flight(samples, period):
+
+	generator = np.random.default_rng(0)
+	altitude = flight_altitude(np.arange(samples) * period)
+
+	# Inverse of the barometric formula, with sensor noise
+	pressure = GROUND_PRESSURE * (1 - altitude / 44330.0) ** 5.255 + generator.normal(0, 0.02, samples)
+	acceleration = generator.normal(0, 50, (3, samples)).astype(np.int16)
+
+	return {
+		"press": pressure.astype(np.float32),
+		"alt": altitude.astype(np.float16),
+		"ax": acceleration[0],
+		"ay": acceleration[1],
+		"az": acceleration[2]
+	}, altitude
+
+
+class Flight(dict):
+
+
+	def __len__(self):
+
+		return len(self["press"])
+
+
+def main(samples):
+
+	for length in samples:
+
+		period = flight_period(length)
+		data, altitude = synthetic_flight(length, period)
+
+		start = time.perf_counter()
+		metrics = compute_metrics(Flight(data), period)
+		elapsed = time.perf_counter() - start
+
+		error = np.nanmax(np.abs(metrics["channels"]["baro_alt"] - altitude))
+		events = ", ".join(f"{event} {index}" for event, index in metrics["events"].items())
+
+		print(f"{length:>10} samples: {elapsed * 1000:8.1f}ms | barometric altitude error {error:.1f}m | {events}")
+
+		for phase, stats in metrics["phases"].items():
+
+			print(f"{'':>20}{phase:>8}: {stats['duration']:7.1f}s, altitude {stats['altitude']['max']:7.1f} -> {stats['altitude']['min']:7.1f}m, max descent rate {stats['descent_rate']['max']:6.1f}m/s")
+
+	return
+
+
+if __name__ == '__main__':
+
+	main([int(n) for n in sys.argv[1:]] or DEFAULT_SAMPLES)
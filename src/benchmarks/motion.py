@@ -0,0 +1,100 @@
+# =============================================================================
+# Benchmark: motion detection of a synthetic camera video with one worker process or one per CPU core
+# Run from the src folder: python -m benchmarks.motion [frames] [chunk frames]
+# =============================================================================
+
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import numpy as np
+import tempfile
+import shutil
+import json
+import sys
+import os
+
+from scripts.motion import detect_motion, STAGES
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+SETTINGS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "res/settings/")
+DEFAULT_FRAMES = 600
+DEFAULT_CHUNK_FRAMES = 16
+FRAME_SIZE = (640, 480)
+FPS = 30
+# The synthetic camera video is an .mp4 like the real one, the motion video uses the fourcc of the settings
+SOURCE_FOURCC = "mp4v"
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Noisy still background with a square crossing it
+def create_video(path, frames):
+
+	import cv2 as cv
+
+	generator = np.random.default_rng(0)
+	width, height = FRAME_SIZE
+	background = generator.integers(0, 80, (height, width, 3), dtype = np.uint8)
+	writer = cv.VideoWriter(path, cv.VideoWriter_fourcc(*SOURCE_FOURCC), FPS, FRAME_SIZE)
+
+	for n in range(frames):
+
+		frame = cv.add(background, generator.integers(0, 6, (height, width, 3), dtype = np.uint8))
+		x = n * 3 % (width - 60)
+		cv.rectangle(frame, (x, 100), (x + 60, 160), (200, 200, 255), -1)
+		writer.write(frame)
+
+	writer.release()
+
+	return
+
+
+def bench_motion(name, source, output, settings):
+
+	stats = detect_motion(source, output, settings)
+	stages = " | ".join(f"{stage} {stats['stages'][stage]['fps']:7.1f}" for stage in STAGES)
+
+	print(f"{name:>24} {stats['seconds'] * 1000:9.1f}ms {stats['fps']:7.1f} frames/s | {stages} frames/s | {stats['movingFrames']} frames with motion")
+
+	return
+
+
+def main(frames, chunk_frames):
+
+	with open(os.path.join(SETTINGS_PATH, "video.json"), "r", encoding = "utf-8") as file:
+
+		settings = json.load(file)["motionDetection"]
+		file.close()
+
+	root_path = tempfile.mkdtemp()
+	source = os.path.join(root_path, "cam.mp4")
+	output = os.path.join(root_path, "motion-detection.webm")
+	create_video(source, frames)
+
+	settings["chunkFrames"] = chunk_frames
+
+	bench_motion("1 worker", source, output, dict(settings, workers = 1))
+	bench_motion(f"{os.cpu_count()} workers", source, output, dict(settings, workers = 0))
+
+	shutil.rmtree(root_path)
+
+	return
+
+
+if __name__ == '__main__':
+
+	main(
+		int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_FRAMES,
+		int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_CHUNK_FRAMES
+		)
@@ -0,0 +1,102 @@
+# =============================================================================
+# Benchmark: min / max pyramid of a channel, build time and queries of the whole flight and of a zoom
+# Run from the src folder: python -m benchmarks.pyramid [points] [samples ...]
+# =============================================================================
+
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import numpy as np
+import tempfile
+import shutil
+import sys
+import time
+
+from scripts.datasets import Dataset, write_dataset
+from scripts.pyramid import PyramidStore, reduce_buckets
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+DEFAULT_POINTS = 1000
+DEFAULT_SAMPLES = [10 ** 5, 10 ** 6, 10 ** 7]
+SAMPLE_RATE = 1 / 0.3
+QUERIES = 100
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Min and max of each bucket from the samples: what a query costs without the pyramid
+def naive_query(values, start, end, points):
+
+	samples_per_point = -(-(end - start) // points)
+	chunk = np.asarray(values[start:end], dtype = np.float32)
+
+	return reduce_buckets(chunk, chunk, samples_per_point)
+
+
+def bench_queries(name, query, length, points):
+
+	generator = np.random.default_rng(0)
+	spans = [length, length // 100]
+	results = []
+
+	for span in spans:
+
+		starts = generator.integers(0, length - span + 1, QUERIES)
+		start = time.perf_counter()
+
+		for first in starts:
+
+			query(first, first + span, points)
+
+		results.append((time.perf_counter() - start) / QUERIES)
+
+	print(f"{name:>24} " + " | ".join(f"{span:>10} samples {elapsed * 1000:8.3f}ms" for span, elapsed in zip(spans, results)))
+
+	return
+
+
+def main(points, samples):
+
+	for length in samples:
+
+		root_path = tempfile.mkdtemp()
+		generator = np.random.default_rng(0)
+		write_dataset(root_path, {"press": (1000 + np.cumsum(generator.normal(0, 0.01, length))).astype(np.float32)}, SAMPLE_RATE)
+
+		dataset = Dataset(root_path)
+		store = PyramidStore(False)
+
+		start = time.perf_counter()
+		store.build(dataset)
+		elapsed = time.perf_counter() - start
+
+		pyramid = store.get(dataset)
+		levels, rows = pyramid.levels("press")
+
+		print(f"{length:>10} samples: pyramid built in {elapsed * 1000:8.1f}ms, {len(levels)} levels, {rows.nbytes / 2 ** 20:.1f}MiB")
+
+		bench_queries("from the samples", lambda first, last, points: naive_query(dataset["press"], first, last, points), length, points)
+		bench_queries("from the pyramid", lambda first, last, points: pyramid.query("press", first, last, points), length, points)
+
+		shutil.rmtree(root_path)
+
+	return
+
+
+if __name__ == '__main__':
+
+	main(
+		int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_POINTS,
+		[int(n) for n in sys.argv[2:]] or DEFAULT_SAMPLES
+		)
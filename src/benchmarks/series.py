@@ -0,0 +1,93 @@
+# =============================================================================
+# Benchmark: chart series preparation, Python loops vs numpy
+# Run from the src folder: python -m benchmarks.series [samples ...]
+# =============================================================================
+
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import numpy as np
+import sys
+import timeit
+
+from scripts.series import prepare_series
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+RECORDING_FREQUENCY = 0.3
+CHANNELS = 6
+DEFAULT_SAMPLES = [10 ** 3, 10 ** 5, 10 ** 6]
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Previous Chart.draw_chart preparation: while loop time axis and per sample copy of each channel
+def loop_series(y_values, period):
+
+	X = []
+	i = 0
+	n = 0
+
+	while n < len(y_values[0]):
+
+		X.append(i)
+		n += 1
+		i += 1 * period
+
+	Ys = []
+
+	for values in y_values:
+
+		y = []
+
+		for i in range(0, len(X) -1, 1):
+
+			try:
+
+				y.append(values[i])
+
+			except Exception:
+
+				y.append(0)
+
+		Ys.append(np.array(values, dtype="float64"))
+
+	return X, Ys
+
+
+def best_time(function, repeat):
+
+	return min(timeit.repeat(function, number = 1, repeat = repeat))
+
+
+def main(samples_list):
+
+	print(f"{'samples':>10} {'channels':>9} {'loops (ms)':>11} {'numpy (ms)':>11} {'speedup':>8}")
+
+	for n in samples_list:
+
+		rng = np.random.default_rng(0)
+		y_values = [rng.normal(0, 1, n).astype("float16") for i in range(CHANNELS)]
+		repeat = 3 if n >= 10 ** 6 else 10
+
+		loop_time = best_time(lambda: loop_series(y_values, RECORDING_FREQUENCY), repeat)
+		numpy_time = best_time(lambda: prepare_series(None, y_values, RECORDING_FREQUENCY), repeat)
+
+		print(f"{n:>10} {CHANNELS:>9} {loop_time * 1000:>11.2f} {numpy_time * 1000:>11.2f} {loop_time / numpy_time:>7.0f}x")
+
+	return
+
+
+if __name__ == '__main__':
+
+	main([int(float(n)) for n in sys.argv[1:]] or DEFAULT_SAMPLES)
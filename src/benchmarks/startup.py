@@ -0,0 +1,164 @@
+# =============================================================================
+# Benchmark: application startup (import time per module and time to first request)
+# Run from the src folder: python -m benchmarks.startup [runs]
+# =============================================================================
+
+
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import subprocess
+import statistics
+import json
+import sys
+import time
+import os
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+DEFAULT_RUNS = 5
+SRC_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries and application modules reported even if they are not imported at startup
+MODULES = ["numpy", "yaml", "flask", "matplotlib", "cv2", "folium", "requests"]
+TOP_MODULES = 10
+
+# Runs in a fresh interpreter: imports main, answers a first request then warms up the libraries
+# The application output is hidden, the timings are printed as json
+WARM_UP_MARKER = "-- warm up --\n"
+CHILD = f"""
+import contextlib, io, json, sys, time
+
+WARM_UP_MARKER = {repr(WARM_UP_MARKER)}
+
+launch = float(sys.argv[1])
+start = time.perf_counter()
+
+with contextlib.redirect_stdout(io.StringIO()):
+
+	import main
+	imported = time.perf_counter()
+	status = main.APP.test_client().get("/").status_code
+	first_request = time.perf_counter()
+	loaded = [module for module in main.WARM_UP_MODULES + ["requests"] if module in sys.modules]
+	sys.stderr.write(WARM_UP_MARKER)
+	main.warm_up()
+	warmed_up = time.perf_counter()
+
+print(json.dumps({{
+	"interpreter": time.time() - launch - (warmed_up - start),
+	"import": imported - start,
+	"firstRequest": first_request - imported,
+	"timeToFirstRequest": first_request - start,
+	"warmUp": warmed_up - first_request,
+	"status": status,
+	"loaded": loaded
+}}))
+"""
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# python -X importtime lines: "import time: self [us] | cumulative | package"
+# Returns {module: (self seconds, cumulative seconds, phase)}, phase is "startup" or "warm up"
+def parse_import_times(output):
+
+	times = {}
+	phase = "startup"
+
+	for line in output.splitlines(keepends = True):
+
+		if line == WARM_UP_MARKER:
+
+			phase = "warm up"
+
+		if not line.startswith("import time:") or "[us]" in line:
+
+			continue
+
+		self_time, cumulative, name = line[len("import time:"):].split("|")
+		times[name.strip()] = (int(self_time) / 10 ** 6, int(cumulative) / 10 ** 6, phase)
+
+	return times
+
+
+def run_once():
+
+	process = subprocess.run(
+		[sys.executable, "-X", "importtime", "-c", CHILD, str(time.time())],
+		cwd = SRC_PATH,
+		capture_output = True,
+		text = True
+		)
+
+	if process.returncode != 0:
+
+		sys.exit(process.stderr[-2000:] + process.stdout[-2000:])
+
+	return json.loads(process.stdout.strip().splitlines()[-1]), parse_import_times(process.stderr)
+
+
+def main(runs):
+
+	results = []
+	import_times = []
+
+	for run in range(runs):
+
+		result, times = run_once()
+		results.append(result)
+		import_times.append(times)
+
+	def median(key):
+
+		return statistics.median(result[key] for result in results)
+
+	print(f"{runs} runs (median), first request: GET / -> {results[0]['status']}")
+	print(f"{'interpreter start (ms)':>32} {median('interpreter') * 1000:>8.0f}")
+	print(f"{'import main (ms)':>32} {median('import') * 1000:>8.0f}")
+	print(f"{'first request (ms)':>32} {median('firstRequest') * 1000:>8.0f}")
+	print(f"{'time to first request (ms)':>32} {median('timeToFirstRequest') * 1000:>8.0f}")
+	print(f"{'background warm up (ms)':>32} {median('warmUp') * 1000:>8.0f}")
+	print(f"{'loaded before warm up':>32} {', '.join(results[0]['loaded']) or '-'}")
+
+	# Libraries, application modules and slowest modules (self time) of the startup
+	print(f"\n{'module':>40} {'self (ms)':>10} {'cumulative (ms)':>16} {'imported by':>12}")
+
+	startup = [name for name, times in import_times[0].items() if times[2] == "startup"]
+	names = set(MODULES)
+	names.update(name for name in startup if name.startswith("scripts."))
+	names.update(sorted(startup, key = lambda name: import_times[0][name][0], reverse = True)[:TOP_MODULES])
+
+	def sort_key(name):
+
+		times = import_times[0].get(name, (0, 0, "not imported"))
+
+		return times[2] != "startup", -times[1]
+
+	for name in sorted(names, key = sort_key):
+
+		if name not in import_times[0]:
+
+			print(f"{name:>40} {'-':>10} {'-':>16} {'not imported':>12}")
+			continue
+
+		self_time = statistics.median(times[name][0] for times in import_times if name in times)
+		cumulative = statistics.median(times[name][1] for times in import_times if name in times)
+
+		print(f"{name:>40} {self_time * 1000:>10.1f} {cumulative * 1000:>16.1f} {import_times[0][name][2]:>12}")
+
+	return
+
+
+if __name__ == '__main__':
+
+	main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RUNS)
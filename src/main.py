@@ -19,84 +19,56 @@
 
 import os
 import sys
-import subprocess
-from datetime import date
-from datetime import datetime
+import threading
+import logging
+import types
+import hashlib
+import importlib.util
+import uuid
 import numpy
 import json
 import zipfile
 import shutil
 import time
 import io
-import pickle
+import re
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-# Runs pip install -r requirements.txt
-# 	- if importation error:
-# 		- log errors
-# 		- terminate script
-
-def log(text):
-
-	log_path = os.path.join(BASE_DIR, "logs/webapp")
-	log_name = str(date.today().strftime("%b-%d-%Y") + ".txt")
-
-	with open(os.path.join(log_path, log_name), "a", encoding = "utf-8") as log:
-
-		log.write('\n' + str(text) + '\n')
-		log.close()
-
-	return
+# Logs of the application (logs/webapp/<date>.txt as json lines, and the standard output)
+# The records are written by a background thread, logging never waits for the disk
+from scripts.logs import setup_logging, set_debug
 
-
-def install_packages():
-
-	try:
-		file_path = os.path.join(BASE_DIR, "requirements.txt")
-		subprocess.check_call([sys.executable, "-m", "pip", "install", "-r", file_path])
-
-	except Exception as e:
-
-		log(e)
-
-		sys.exit()
-
-	return
+_log_handler = setup_logging(os.path.join(BASE_DIR, "logs/webapp"))
+LOGGER = logging.getLogger("webapp")
+ACCESS_LOGGER = logging.getLogger("webapp.access")
 
 
-#  If importing external librairies fails then call install_packages 
+# Only the libraries needed to answer the first request are imported here:
+# matplotlib, OpenCV and folium are imported by the chart, video and map scripts when they are first used
+# (and warmed up in the background by warm_up once the server is started)
+# 	- if importation error:
+# 		- log errors
+# 		- terminate script with the missing library (install them with pip install -r requirements.txt)
 
 try:
-	import yaml
-	from flask import Flask, render_template, redirect, url_for, request
-	import matplotlib.pyplot as plt
-	import cv2 as cv
-	import folium
-	import requests
+	from flask import Flask, render_template, redirect, url_for, request, jsonify, send_file, abort, make_response, g, has_request_context, Response
 
-except Exception as e:
-	install_packages()
+except ImportError as e:
 
-finally:
-
-	try:
-		import yaml
-		from flask import Flask, render_template, redirect, url_for, request
-		import matplotlib.pyplot as plt
-		import cv2 as cv
-		import folium
-		import requests
+	LOGGER.error(f"Missing library: {e.name}")
+	sys.exit(f"Missing library: {e.name} (install the dependencies with: pip install -r requirements.txt)")
 
-	except Exception as e:
 
-		log_path = os.path.join(BASE_DIR, "logs")
-		log_name = str(date.today().strftime("%b-%d-%Y") + ".txt")
+# The other libraries are only looked for (without importing them) so a missing one stops the app now
+# instead of failing on the first chart, map or video
+for module in ("numpy", "matplotlib", "cv2", "folium", "requests"):
 
-		log(e)
+	if importlib.util.find_spec(module) is None:
 
-		sys.exit()
+		LOGGER.error(f"Missing library: {module}")
+		sys.exit(f"Missing library: {module} (install the dependencies with: pip install -r requirements.txt)")
 
 
 # =============================================================================
@@ -105,13 +77,28 @@ finally:
 
 
 try:
-	from scripts.graphs import Chart
-	from scripts.maps import Map
-
-except Exception as e:
-
-	log(e)
-	sys.exit()
+	from scripts.config import load_config
+	from scripts.graphs import Chart, CHART_HEIGHT, PANEL_HEIGHT
+	from scripts.maps import Map, track_fixes
+	from scripts.video import Video
+	from scripts.datasets import DatasetRegistry, Dataset, next_data_set
+	from scripts.results import ResultCache, write_result
+	from scripts.jobs import JobQueue
+	from scripts.tiles import TileStore, tile_pyramid, prefetch_tiles
+	from scripts.series import prepare_track
+	from scripts.watcher import FileWatcher
+	from scripts.cansat import CansatClient, CansatError
+	from scripts.live import TelemetryRecorder, LiveFeed
+	from scripts.download import download_data_sets
+	from scripts.catalog import Catalog, read_json, write_json
+	from scripts.motion import motion_source
+	from scripts.pyramid import PyramidStore, MAX_POINTS
+	from scripts.compare import parse_data_sets, join_data_sets, align_options, alignment_offsets, union_bounds, map_parallel, ALIGN_START
+
+except ImportError as e:
+
+	LOGGER.error(f"Missing library: {e.name}")
+	sys.exit(f"Missing library: {e.name} (install the dependencies with: pip install -r requirements.txt)")
 
 
 # =============================================================================
@@ -126,6 +113,47 @@ LOG_PATH = os.path.join(BASE_DIR, 'logs/')
 DATA_PATH = os.path.join(BASE_DIR, 'data/')
 STATIC_PATH = os.path.join(BASE_DIR, 'src/static/')
 THEME_PATH = os.path.join(BASE_DIR, 'res/theme/')
+RESULT_MAX_AGE = 365 * 24 * 3600
+TILES_PATH = os.path.join(BASE_DIR, 'data/tiles/')
+TILES_URL = "/tiles/{z}/{x}/{y}.png"
+TILES_MAX_AGE = 7 * 24 * 3600
+# Camera video of the CanSat and the same video with the moving regions boxed (and its stats) shown by the video page
+CAMERA_VIDEO_PATH = os.path.join(STATIC_PATH, 'result/cam.mp4')
+MOTION_VIDEO_PATH = os.path.join(STATIC_PATH, 'result/motion-detection.webm')
+MOTION_STATS_PATH = os.path.join(STATIC_PATH, 'result/motion-detection.json')
+# Values sent by /api/data when the request does not say
+DATA_POINTS = 1000
+# Chart fields checked before drawing (the chart API takes them as query parameters)
+MAX_LINE_WIDTH = 20
+COLOR_PATTERN = re.compile(r"#[0-9a-fA-F]{6}")
+WARM_UP_MODULES = ["matplotlib.figure", "matplotlib.backends.backend_agg", "folium", "folium.plugins", "cv2"]
+# Texts of each view in the i18n files
+TEXT_BUNDLES = {
+	"processDataFunctions": ["processDataFunctionsPageTitle", "maps", "videos", "charts", "selectDataSet", "dataSet", "samples", "duration", "channels", "noDataSet", "compare", "compareCharts", "compareMaps", "explore"],
+	"map": ["mapPageTitle", "mapTitle", "iconsColor", "selectIcon", "selectZoomStart", "selectMapMode", "submit"],
+	"video": ["videoPageTitle", "videoRenderError", "thermalVideoRenderError"],
+	"job": ["jobPageTitle", "jobRunning", "jobFailed"],
+	"explore": ["explorePageTitle", "exploreChannel", "exploreReset", "exploreHelp", "exploreLoading"],
+	"live": ["livePageTitle", "liveWaiting", "liveRecording", "liveStopped", "liveMap"],
+	"chart": [
+		"chartPageTitle",
+		"chartTitle",
+		"chartXLabel",
+		"chartYLabel",
+		"chartSelectData",
+		"chartlineWidth",
+		"chartFullResolution",
+		"chartSeparatePanels",
+		"chartAlign",
+		"alignStart",
+		"launch",
+		"apogee",
+		"drop",
+		"parachute",
+		"landing",
+		"chartSubmit"
+		]
+	}
 APP = Flask(__name__)
 APP.config['UPLOAD_FOLDER'] = "media/"
 
@@ -135,98 +163,87 @@ APP.config['UPLOAD_FOLDER'] = "media/"
 # =============================================================================
 
 
-# Settings class
-
-class Settings:
-
-
-	def __init__(self, file_path):
+# Language class
+# 	- every language of the i18n folder is loaded once
+# 	- the texts of each view are gathered in bundles for each language,
+# 	  so a view gets all its texts with a single lookup
 
-		self.debug = False
+class Language:
 
-		with open(file_path, 'r', encoding = "utf-8") as file:
 
-			self.settings_data = yaml.load(file)
+	def __init__(self, debug, folder, language):
 
-			file.close()
+		self.debug = debug
+		self.load(folder, language)
 
 		return
 
 
 	def __str__(self):
 
-		return "Settings class"
-
-
-	def reload(self, file_path):
-
-		with open(file_path, 'r', encoding = "utf-8") as file:
+		return "Language class"
 
-			self.settings_data = yaml.load(file)
 
-			file.close()
+	def reload(self, debug, folder, language):
 
-		self.debug = self.get_settings_value("debug")
+		self.debug = debug
+		self.load(folder, language)
 
 		return
 
-	
-	def get_settings_value(self, value):
-
-		if self.debug:
-
-			print("-----------------[SETTINGS]-----------------")
-			print(f"Settings | {str(self.settings_data[value])}")
-			print("---------------[END SETTINGS]---------------\n")
-		
-		return str(self.settings_data[value])
-
-
-# Language class
-
-class Language:
 
+	def load(self, folder, language):
 
-	def __init__(self, debug, file_path):
+		languages = {}
 
-		self.debug = debug
-
-		with open(file_path, 'r', encoding = "utf-8") as file:
+		for file_name in sorted(os.listdir(folder)):
 
-			self.language_data = json.load(file)
+			if file_name.endswith(".json"):
 
-			file.close()
+				with open(os.path.join(folder, file_name), 'r', encoding = "utf-8") as file:
 
-		return
+					languages[file_name[:-len(".json")]] = json.load(file)
+					file.close()
 
+		if language not in languages:
 
-	def __str__(self):
+			raise ValueError(f"Unknown language {language}, available languages: {', '.join(languages)}")
 
-		return "Language class"
+		# A text missing in a language file stops the application here instead of failing in a view
+		bundles = {}
 
+		for code, language_data in languages.items():
 
-	def reload(self, file_path, debug):
+			bundles[code] = {
+				view: {key: language_data[key] for key in keys}
+				for view, keys in TEXT_BUNDLES.items()
+			}
 
-		with open(file_path, 'r', encoding = "utf-8") as file:
+		self.languages = languages
+		self.bundles = bundles
+		self.language = language
+		self.language_data = languages[language]
 
-			self.language_data = json.load(file)
+		# Changes with the texts of the selected language, part of the charts and maps keys
+		self.version = hashlib.sha256(json.dumps(self.language_data, sort_keys = True).encode("utf-8")).hexdigest()[:16]
 
-			file.close()
+		if self.debug:
 
-		self.debug = debug
+			LOGGER.debug(f"languages: {', '.join(languages)}, selected: {language}")
 
 		return
 
 
 	def get_text(self, text):
 
-		if self.debug:
+		return self.language_data[text]
 
-			print("-----------------[LANGUAGE]-----------------")
-			print(f"Language | {str(self.language_data[text])}")
-			print("---------------[END LANGUAGE]---------------\n")
 
-		return self.language_data[text]
+	# Texts of a view (TEXT_BUNDLES) in the selected language, as a read only dict
+	# (the bundles themselves are plain dicts: the Chart and Map renderers are sent with this object to the job processes)
+	def texts(self, view):
+
+		return types.MappingProxyType(self.bundles[self.language][view])
 
 
 # =============================================================================
@@ -234,20 +251,30 @@ class Language:
 # =============================================================================
 
 
-_settings = Settings(
-	os.path.join(SETTINGS_PATH, 'settings.yaml')
-	)
+try:
+
+	_config = load_config(os.path.join(SETTINGS_PATH, 'settings.yaml'))
 
-DEBUG = _settings.get_settings_value("debug")
+except ValueError as e:
+
+	LOGGER.error(str(e))
+	sys.exit(str(e))
+
+DEBUG = _config.debug
+
+# Debug traces of the application and its scripts are only written on the standard output
+set_debug(DEBUG)
 
 _language = Language(
 	DEBUG,
-	LANGUAGE_FOLDER + _settings.get_settings_value("language") + ".json"
+	LANGUAGE_FOLDER,
+	_config.language
 	)
 
 _map = Map(
 	DEBUG,
-	os.path.join(SETTINGS_PATH, "maps.json")
+	os.path.join(SETTINGS_PATH, "maps.json"),
+	_language
 	)
 
 _chart = Chart(
@@ -257,15 +284,105 @@ _chart = Chart(
 	_language
 	)
 
+_video = Video(
+	DEBUG,
+	os.path.join(SETTINGS_PATH, "video.json")
+	)
+
+_datasets = DatasetRegistry(
+	DEBUG,
+	os.path.join(DATA_PATH, "normal/"),
+	1 / _chart.config["recordingFrequency"],
+	_config.dataset_cache_size * 2 ** 20
+	)
+
+# Min / max pyramids of the channels (data/normal/<data_set>/lod/) for /api/data
+_pyramids = PyramidStore(
+	DEBUG
+	)
+
+# Manifests of the data sets (data/normal/<data_set>/manifest.json) and their index, the pyramids are built with them
+_catalog = Catalog(
+	DEBUG,
+	_datasets,
+	os.path.join(DATA_PATH, "catalog.json"),
+	_pyramids
+	)
+
+_chart_results = ResultCache(
+	DEBUG,
+	os.path.join(STATIC_PATH, "result/charts/"),
+	".png",
+	_config.chart_cache_files,
+	_config.chart_cache_size * 2 ** 20
+	)
+
+_map_results = ResultCache(
+	DEBUG,
+	os.path.join(STATIC_PATH, "result/maps/"),
+	".html",
+	_config.map_cache_files,
+	_config.map_cache_size * 2 ** 20
+	)
+
+_video_results = ResultCache(
+	DEBUG,
+	os.path.join(STATIC_PATH, "result/videos/"),
+	".webm",
+	_config.video_cache_files,
+	_config.video_cache_size * 2 ** 20
+	)
+
+# Render processes of each server process: jobWorkers, or the CPU cores shared by the server processes (0)
+def job_workers(server_processes):
+
+	return _config.job_workers or max((os.cpu_count() or 1) // server_processes, 1)
+
+
+_jobs = JobQueue(
+	DEBUG,
+	job_workers(1),
+	os.path.join(STATIC_PATH, "result/jobs/")
+	)
+
+_cansat = CansatClient(
+	DEBUG,
+	_config.cansat_ip,
+	os.path.join(SETTINGS_PATH, "urls.json"),
+	os.path.join(SETTINGS_PATH, "cansat.json")
+	)
+
+# Live telemetry (live.json): each server worker reads the data set being recorded for its viewers
+with open(os.path.join(SETTINGS_PATH, "live.json"), "r", encoding = "utf-8") as file:
+
+	_live_config = json.load(file)
+	file.close()
+
+# Each live viewer holds a server thread for as long as it watches: the serve command gives each worker maxClients
+# threads for the viewers on top of its serverThreads threads (the development server starts a thread per request)
+_live_feed = LiveFeed(
+	DEBUG,
+	DATA_PATH,
+	_live_config["bufferSize"],
+	_live_config["tailInterval"],
+	_live_config["maxClients"]
+	)
+
+_caches = {
+	"datasets": _datasets,
+	"catalog": _catalog,
+	"pyramids": _pyramids,
+	"charts": _chart_results,
+	"maps": _map_results,
+	"videos": _video_results
+	}
+
+
+if DEBUG:
 
-if _settings.get_settings_value("debug"):
+	for instance in (_config, _language, _map, _chart, _video, _datasets, _catalog, _pyramids, _chart_results, _map_results, _video_results, _jobs, _cansat, _live_feed):
 
-	print("------------------[DEBUG]------------------")
-	print(f"DEBUG | {_settings}\t OK")
-	print(f"DEBUG | {_language}\t OK")
-	print(f"DEBUG | {_map}\t      OK")
-	print(f"DEBUG | {_chart}\t      OK")
-	print("----------------[END DEBUG]----------------\n")
+		LOGGER.debug(f"{instance} OK")
 
 
 # =============================================================================
@@ -282,307 +399,1515 @@ def create_theme(theme_path, file_path):
 		data = file.read()
 		file.close()
 
-	with open(file_path, 'w', encoding = "utf-8") as file:
+	# Written in a temporary file then renamed, the theme can change while the server runs
+	def write_theme(path):
 
-		file.write(data)
-		file.close()
+		with open(path, 'w', encoding = "utf-8") as file:
+
+			file.write(data)
+			file.close()
+
+		return
+
+	write_result(file_path, write_theme)
 
-	if _settings.get_settings_value("debug"):
+	if DEBUG:
 
-		print("------------------[THEME]------------------")
-		print(f"Chosen theme : {theme_path}")
-		print(f"thme path : {file_path}")
-		print("----------------[END THEME]----------------\n")
+		LOGGER.debug(f"theme: {theme_path} copied to {file_path}")
 
 	return
 
 
 create_theme(
-	os.path.join(THEME_PATH, _settings.get_settings_value("theme") + ".css"), 
+	os.path.join(THEME_PATH, _config.theme + ".css"), 
 	os.path.join(STATIC_PATH, "css/theme.css")
 	)
 
 
 # =============================================================================
-# Texts
+# Configuration reload
 # =============================================================================
 
 
+# Called by the config watcher with the files changed in res/settings/, res/i18n/ and res/theme/
+# 	- the new objects are all created before replacing any of them: a view uses either the old or the new
+# 	  configuration, and a file with errors (half saved for example) keeps the previous configuration
+# 	- results rendered with a configuration that changed are deleted
+# 	- jobWorkers and the server settings need a restart
+# 	- returns False when the files were not reloaded: the watcher passes them again with the next changed files
+def reload_configuration(paths):
+
+	global _config, DEBUG, _language, _map, _chart, _video, _cansat, _tile_store
+
+	names = [os.path.relpath(path, BASE_DIR).replace(os.sep, "/") for path in paths]
+
+	settings_changed = "res/settings/settings.yaml" in names
+	language_changed = any(name.startswith("res/i18n/") for name in names)
+	charts_changed = "res/settings/charts.json" in names
+	maps_changed = "res/settings/maps.json" in names
+	video_changed = "res/settings/video.json" in names
+	theme_changed = any(name.startswith("res/theme/") for name in names)
+	cansat_changed = "res/settings/urls.json" in names or "res/settings/cansat.json" in names
+
+	try:
+
+		config = load_config(os.path.join(SETTINGS_PATH, 'settings.yaml')) if settings_changed else _config
+		language_changed = language_changed or config.language != _config.language
+
+		language = Language(config.debug, LANGUAGE_FOLDER, config.language) if language_changed or settings_changed else _language
+		map_renderer = Map(config.debug, os.path.join(SETTINGS_PATH, "maps.json"), language) if maps_changed or language is not _language else _map
+		chart = Chart(config.debug, os.path.join(SETTINGS_PATH, "charts.json"), os.path.join(STATIC_PATH, "result/"), language) if charts_changed or language is not _language else _chart
+		video = Video(config.debug, os.path.join(SETTINGS_PATH, "video.json")) if video_changed else _video
+
+		# Requests already sent keep the previous client
+		if cansat_changed or config.cansat_ip != _config.cansat_ip or config.debug != _config.debug:
+
+			cansat = CansatClient(config.debug, config.cansat_ip, os.path.join(SETTINGS_PATH, "urls.json"), os.path.join(SETTINGS_PATH, "cansat.json"))
+
+		else:
+
+			cansat = _cansat
 
-# Load all texts from the selected language for the select process data function
-def load_process_data_functions_texts():
+		if not os.path.isfile(os.path.join(THEME_PATH, config.theme + ".css")):
 
-	texts = {}
-	texts["processDataFunctionsPageTitle"] = _language.get_text("processDataFunctionsPageTitle")
-	texts["maps"] = _language.get_text("maps")
-	texts["videos"] = _language.get_text("videos")
-	texts["charts"] = _language.get_text("charts")
+			raise ValueError(f"Unknown theme {config.theme}")
 
-	if _settings.get_settings_value('debug'):
+	except (ValueError, KeyError, OSError) as e:
 
-		print("------------------[TEXTS]------------------")
-		print(texts)
-		print("----------------[END TEXTS]----------------\n")
+		LOGGER.error(f"configuration not reloaded ({', '.join(names)}): {e!r}")
 
-	return texts
+		return False
 
+	_config, DEBUG, _language, _map, _chart, _video, _cansat = config, config.debug, language, map_renderer, chart, video, cansat
+	set_debug(DEBUG)
 
-# Load all texts from the selected language for the map view
-def load_map_texts():
+	# The charts show the texts of the language and the maps its tooltips
+	if charts_changed or language_changed:
 
-	texts = {}
-	texts["mapPageTitle"] = _language.get_text("mapPageTitle")
-	texts["mapTitle"] = _language.get_text("mapTitle")
-	texts["iconsColor"] = _language.get_text("iconsColor")
-	texts["selectIcon"] = _language.get_text("selectIcon")
-	texts["selectZoomStart"] = _language.get_text("selectZoomStart")
-	texts["submit"] = _language.get_text("submit")
+		_chart_results.clear()
 
-	if _settings.get_settings_value('debug'):
+	if maps_changed or language_changed:
 
-		print("------------------[TEXTS]------------------")
-		print(texts)
-		print("----------------[END TEXTS]----------------\n")
+		_map_results.clear()
+		_tile_store = None
 
-	return texts
+	if video_changed:
 
+		_video_results.clear()
 
-# Load all texts from the selected language for the video view
-def load_video_texts():
+	if theme_changed or settings_changed:
+
+		create_theme(
+			os.path.join(THEME_PATH, _config.theme + ".css"),
+			os.path.join(STATIC_PATH, "css/theme.css")
+			)
 
-	texts = {}
-	texts["videoPageTitle"] = _language.get_text("videoPageTitle")
-	texts["videoRenderError"] = _language.get_text("videoRenderError")
-	texts["thermalVideoRenderError"] = _language.get_text("thermalVideoRenderError")
+	if settings_changed:
 
-	if _settings.get_settings_value('debug'):
+		with _datasets.lock:
 
-		print("------------------[TEXTS]------------------")
-		print(texts)
-		print("----------------[END TEXTS]----------------\n")
+			_datasets.max_bytes = _config.dataset_cache_size * 2 ** 20
+			_datasets.evict()
 
-	return texts
+		for cache, max_files, max_bytes in (
+			(_chart_results, _config.chart_cache_files, _config.chart_cache_size),
+			(_map_results, _config.map_cache_files, _config.map_cache_size),
+			(_video_results, _config.video_cache_files, _config.video_cache_size)
+			):
 
+			with cache.lock:
 
-# Load all texts from the selected language for the chart view
-def load_chart_texts():
+				cache.max_files = max_files
+				cache.max_bytes = max_bytes * 2 ** 20
+				cache.evict()
 
-	texts = {}
-	texts["chartPageTitle"] = _language.get_text("chartPageTitle")
-	texts["chartTitle"] = _language.get_text("chartTitle")
-	texts["chartXLabel"] = _language.get_text("chartXLabel")
-	texts["chartYLabel"] = _language.get_text("chartYLabel")
-	texts["chartSelectData"] = _language.get_text("chartSelectData")
-	texts["chartlineWidth"] = _language.get_text("chartlineWidth")
-	texts["chartSubmit"] = _language.get_text("chartSubmit")
+	LOGGER.info(f"configuration reloaded: {', '.join(names)}")
 
-	if _settings.get_settings_value('debug'):
+	return True
 
-		print("------------------[TEXTS]------------------")
-		print(texts)
-		print("----------------[END TEXTS]----------------\n")
 
-	return texts
+_watcher = FileWatcher(
+	DEBUG,
+	[SETTINGS_PATH, LANGUAGE_FOLDER, THEME_PATH],
+	_config.config_watch_interval,
+	reload_configuration
+	)
 
 
 # =============================================================================
-# Routes
+# Data
 # =============================================================================
 
 
-# Links to different data processing functions
-@APP.route('/', methods = ['GET', 'POST'])
-def process_data_functions_view():
+# Get a recorded data set (data/normal/<data_set>/) from the registry, channels are memory-mapped on first access
+def load_data_set(data_set):
 
-	texts = load_process_data_functions_texts()
-	data = {}
-	data['set'] = "0"
-	
-	return render_template('process_index.html', texts = texts, data = data)
+	return _datasets.get(data_set)
 
 
-# First render a form then render in a new window a map with different tyles and markers
-@APP.route("/process_data/map/<data_set>", methods = ['GET', 'POST'])
-def process_data_map_view(data_set):
+# The MBTiles file of the offline tiles, opened on first use
+_tile_store = None
 
-	# Load default values in form
-	with open(os.path.join(SETTINGS_PATH, "maps.json"), "r", encoding = "utf-8") as file:
+def load_tile_store():
 
-		map_config = json.load(file)
-		file.close()
+	global _tile_store
 
-	texts = load_map_texts()
+	if _tile_store is None:
 
-	default_data = {}
-	default_data["mapTitle"] = map_config['defaultTitle']
-	default_data["iconsColor"] = map_config['iconsColor']
-	default_data["defaultIconsColor"] = map_config['icon_default_color']
-	default_data["defaultIcon"] = map_config["defaultIcon"]
-	default_data["icons"] = map_config["icons"]
-	default_data["zoomStart"] = map_config["defaultZoom"]
+		_tile_store = TileStore(os.path.join(TILES_PATH, _map.tiles["offlineTiles"]["file"]))
 
-	# Create the map with the selected values
-	if request.method == 'POST':
+	return _tile_store
 
-		with open(os.path.join(DATA_PATH, "normal/" + str(data_set)) + "/data.bin", "rb") as file:
 
-			data =  pickle.load(file)
-			file.close()
+# =============================================================================
+# Charts
+# =============================================================================
 
-		_map.create_map(
-			data["lat"],
-			data["lon"],
-			str(request.form.get("mapTitle")),
-			str(request.form.get("iconTypes")),
-			str(request.form.get("iconsColor")),
-			int(request.form.get("zoomStart")),
-			os.path.join(BASE_DIR, 'src/templates/')
-			)
 
-		return render_template("map.html")
+# Read the chart options from the chart form values (or the same query parameters)
+# channels are the channels of the data set (of the data sets compared), version its version
+# flights are the data sets compared (their label and time offset), None for a single data set
+def load_chart_request(data_set, channels, version, form, flights = None):
 
-	return render_template("maps.html", texts = texts, default_data = default_data)
+	data_config = _chart.config
 
+	chart_title = form.get("chartTitle", "")
 
-# Render the classic and the thermal video
-@APP.route("/process_data/video/<data_set>", methods = ['GET', 'POST'])
-def process_data_video_view(data_set):
+	try:
 
-	texts = load_video_texts()
+		line_width = float(form.get("lineWidth", data_config["defaultLineWidth"]))
 
-	return render_template("video.html", texts = texts)
+	except ValueError:
 
+		abort(400)
 
-# First render a form then create the graph 
-@APP.route("/process_data/chart/<data_set>", methods = ['GET', 'POST'])
-def process_data_chart_view(data_set):
+	if not 0 < line_width <= MAX_LINE_WIDTH:
 
-	texts = load_chart_texts()
+		abort(400)
 
-	# load default values in the form
-	with open(os.path.join(DATA_PATH, "normal/" + str(data_set)) + "/data.bin", "rb") as file:
+	# Getting the abscisses value
 
-		data =  pickle.load(file)
-		file.close()
+	Xdata = []
 
-	with open(os.path.join(SETTINGS_PATH, 'charts.json'), "r") as file:
+	if form.get("xData", "time") == "time":
 
-		data_config = json.load(file)
-		file.close()
+		Xdata.append({"name": "time", "prefix": "time", "unit": "0.3s"})
 
-	chart_config = {}
-	chart_config["pointsType"] = data_config["pointsType"]
-	chart_config["linesType"] = data_config["linesType"]
-	chart_config["defaultLineWidth"] = data_config["defaultLineWidth"]
-	chart_config["defaultColor"] = data_config["defaultColor"]
-		
-	x_data = {}
-	x_data["data"] = []
+	else:
 
-	y_data = {}
-	y_data["data"] = []
+		# A channel of the data set
+		if data_config["nameToPrefix"].get(form.get("xData")) not in channels:
+
+			abort(400)
+
+		dic = {}
+		dic["name"] = form.get("xData")
+		dic["prefix"] = data_config["data_config"][data_config["nameToPrefix"][dic["name"]]]["prefix"]
+		dic["unit"] = data_config["data_config"][dic["prefix"]]["unit"]
+		Xdata.append(dic)
 
-	for d in data.keys():
+	# Getting the ordonates value
+	yValues = []
+
+	for d in channels:
 
 		try:
 
-			x_data["data"].append(data_config["data_config"][d])
-			y_data["data"].append(data_config["data_config"][d])
+			if form.get(data_config["data_config"][d]["name"]) != None and data_config["data_config"][d]["prefix"] != Xdata[0]["prefix"]:
+
+				yValues.append(d)
 
 		except KeyError:
 
 			pass
 
-	time = {"name": "time", "unit": "s", "prefix": "time"}
-	x_data["data"].append(time)
+	Ydata = []
 
-	# Loading all users choices and create chart
+	for value in yValues:
 
-	if request.method == 'POST':
+		dic = {}
+		dic["name"] = data_config["data_config"][value]["name"]
+		dic["prefix"] = value
+		dic["color"] = form.get(data_config["data_config"][value]["name"] + "Color", data_config["defaultColor"])
+		dic["point"] = form.get(data_config["data_config"][value]["name"] + "PointStyle", data_config["defaultPointStyle"])
+		dic["line"] = form.get(data_config["data_config"][value]["name"] + "LineStyle", data_config["defaultLineStyle"])
+		dic["legend"] = form.get(data_config["data_config"][value]["name"] + "Legend", data_config["data_config"][value]["name"])
+		dic["unit"] = data_config["data_config"][value]["unit"]
 
-		chart_title = request.form["chartTitle"]
-		line_width = request.form.get("lineWidth")
-		
-		# Getting the abscisses value
+		if not COLOR_PATTERN.fullmatch(dic["color"]) or dic["point"] not in data_config["pointsType"] or dic["line"] not in data_config["linesType"]:
 
-		Xdata = []
-		
-		if request.form.get("xData") == "time":
+			abort(400)
 
-			Xdata.append({"name": "time", "values": [], "prefix": "time", "unit": "0.3s"})
-		
-		else:
+		Ydata.append(dic)
 
-			dic = {}
-			dic["name"] = request.form.get("xData")
-			dic["prefix"] = data_config["data_config"][data_config["nameToPrefix"][dic["name"]]]["prefix"]
-			prefix = data_config["data_config"][data_config["nameToPrefix"][dic["name"]]]["prefix"]
-			dic["values"] = data[prefix]
-			dic["unit"] = data_config["data_config"][dic["prefix"]]["unit"]
-			Xdata.append(dic)
- 
-		# Getting the ordonates value
-		yValues = []
+	chart = {}
+	chart["x_data"] = Xdata
+	chart["y_data"] = Ydata
+	chart["title"] = chart_title
+	chart["x_label"] = form.get("chartXLabel") or ""
+	chart["y_label"] = form.get("chartYLabel") or ""
+	chart["line_width"] = line_width
+	chart["full_resolution"] = form.get("fullResolution") != None
+	chart["separate_panels"] = form.get("separatePanels") != None
 
-		for d in data.keys():
+	chart["height"] = CHART_HEIGHT
 
-			try:
+	if flights is not None:
 
-				if request.form.get(data_config["data_config"][d]["name"]) != None and data_config["data_config"][d] not in Xdata:
+		chart["flights"] = flights
 
-					yValues.append(d)
+	chart["key"] = chart_key(data_set, version, chart)
 
-			except KeyError:
+	return chart
 
-				pass
 
-		Ydata = []
+# The chart is named after everything used to draw it
+def chart_key(data_set, version, chart):
 
-		for value in yValues:
+	return _chart_results.key(
+		str(data_set),
+		version,
+		_chart.language.language,
+		_chart.language.version,
+		_chart.config["recordingFrequency"],
+		{k: v for k, v in chart.items() if k != "key"}
+		)
 
-			dic = {}
-			dic["name"] = data_config["data_config"][value]["name"]
-			dic["prefix"] = value
-			dic["values"] = data[value]
-			dic["color"] = request.form.get(data_config["data_config"][value]["name"] + "Color")
-			dic["point"] = request.form.get(data_config["data_config"][value]["name"] + "PointStyle")
-			dic["line"] = request.form.get(data_config["data_config"][value]["name"] + "LineStyle")
-			dic["legend"] = request.form.get(data_config["data_config"][value]["name"] + "Legend")
-			dic["unit"] = data_config["data_config"][value]["unit"]
-			
-			Ydata.append(dic)
 
-		if request.form["chartYLabel"] == "" or request.form["chartYLabel"] == None:
+# Split a chart in one chart per ordinate, so each panel can be rendered by a different job process
+def chart_panels(data_set, version, chart):
 
-			x_label = ""
+	panels = []
 
-		else:
+	for y_data in chart["y_data"]:
 
-			x_label = request.form["chartXLabel"]
+		panel = dict(chart, y_data = [y_data], height = PANEL_HEIGHT)
+		panel["key"] = chart_key(data_set, version, panel)
+		panels.append(panel)
 
-		if request.form["chartYLabel"] == "" or request.form["chartYLabel"] == None:
+	return panels
 
-			y_label = ""
 
-		else:
+# Add the channels values to the chart abscissa and ordinates
+# A channel missing from the data set (one of the data sets compared) has no value
+def chart_series(chart, data):
+
+	x_data = [dict(d) for d in chart["x_data"]]
+
+	if x_data[0]["name"] != "time":
+
+		x_data[0]["values"] = data.get(x_data[0]["prefix"], [])
+
+	y_data = [dict(d, values = data.get(d["prefix"], [])) for d in chart["y_data"]]
+
+	return x_data, y_data
 
-			y_label = request.form["chartYLabel"]
 
-		_chart.draw_chart(Xdata, Ydata, chart_title, x_label, y_label, line_width)
+# Manifests of the data sets of a comparison, built at the same time if needed (404 if a data set is missing)
+def load_manifests(data_sets):
 
-		return render_template("chart.html")
+	manifests = map_parallel(_catalog.manifest, data_sets)
 
-	return render_template("charts.html", texts = texts, y_data = y_data, x_data = x_data, chart_config = chart_config)
+	if len(manifests) == 0 or any(manifest is None for manifest in manifests):
+
+		abort(404)
+
+	return manifests
+
+
+# Channels of the data sets compared, in the order of the first one then of the others
+def union_channels(manifests):
+
+	return list(dict.fromkeys(name for manifest in manifests for name in manifest["channels"]))
 
 
 # =============================================================================
-# Run program
+# Jobs
 # =============================================================================
 
 
-def main():
+# These functions run in the job processes: they open the data set again from its folder
+# and write their result with write_result, the result is registered in its cache by the server process
+
+def render_chart_job(chart_renderer, data_path, chart, output, progress):
+
+	data = Dataset(data_path)
+	x_data, y_data = chart_series(chart, data)
+
+	return write_result(
+		output,
+		lambda path: chart_renderer.draw_chart(x_data, y_data, chart["title"], chart["x_label"], chart["y_label"], chart["line_width"], path, chart["full_resolution"], chart["height"])
+		)
+
+
+# The flights of a comparison are opened, aligned and decimated by a pool of threads, then drawn in one chart
+def render_comparison_job(chart_renderer, data_paths, chart, output, progress):
+
+	flights = map_parallel(lambda item: chart_flight(chart_renderer, chart, item[0], item[1]), zip(data_paths, chart["flights"]))
+
+	return write_result(
+		output,
+		lambda path: chart_renderer.draw_chart(chart["x_data"], chart["y_data"], chart["title"], chart["x_label"], chart["y_label"], chart["line_width"], path, chart["full_resolution"], chart["height"], flights)
+		)
+
+
+def chart_flight(chart_renderer, chart, data_path, flight):
+
+	data = Dataset(data_path)
+	x_data, y_data = chart_series(chart, data)
+	x_values = x_data[0]["values"] if x_data[0]["name"] != "time" else None
+
+	return {
+		"label": flight["label"],
+		"lines": chart_renderer.flight_lines(x_values, [d["values"] for d in y_data], flight["offset"], chart["full_resolution"])
+		}
+
+
+def render_map_job(map_renderer, data_path, title, icon, color, zoom_start, mode, tiles_url, bounds, output, progress):
+
+	data = Dataset(data_path)
+	events = data.metrics["events"] if data.metrics is not None else None
+
+	return write_result(
+		output,
+		lambda path: map_renderer.create_map(data["lat"], data["lon"], title, icon, color, zoom_start, path, mode, data.get("alt"), tiles_url, events, bounds)
+		)
+
+
+# The tracks of a comparison are opened by a pool of threads, then drawn in one map
+def render_comparison_map_job(map_renderer, data_paths, labels, title, icon, zoom_start, mode, tiles_url, bounds, output, progress):
+
+	flights = map_parallel(map_flight, data_paths)
+
+	for flight, label in zip(flights, labels):
+
+		flight["label"] = label
+
+	return write_result(
+		output,
+		lambda path: map_renderer.create_comparison_map(flights, title, icon, zoom_start, path, mode, tiles_url, bounds)
+		)
+
+
+def map_flight(data_path):
+
+	data = Dataset(data_path)
+	latitude, longitude, altitude, samples = track_fixes(data["lat"], data["lon"], data.get("alt"))
+
+	return {
+		"latitude": latitude,
+		"longitude": longitude,
+		"altitude": altitude,
+		"samples": samples,
+		"events": data.metrics["events"] if data.metrics is not None else None
+		}
+
+
+# The encoding stats (frames, time, frames per second) are saved next to the video
+def render_thermal_job(video, data_path, output, stats_path, progress):
+
+	data = Dataset(data_path)
+	stats = {}
+	render_time = write_result(
+		output,
+		lambda path: stats.update(video.encode_thermal(data["therm"], path, progress))
+		)
+
+	write_json(stats_path, stats)
+
+	return render_time
+
+
+# The stats are saved with the source of the video: it is rendered again when the camera video or the motion settings change
+def render_motion_job(video, source_path, output, stats_path, source, progress):
+
+	stats = {}
+	render_time = write_result(
+		output,
+		lambda path: stats.update(video.detect_motion(source_path, path, progress))
+		)
+
+	stats["source"] = source
+	write_json(stats_path, stats)
+
+	return render_time
+
+
+# The client of the server process can't be sent to the job process (its lock and sessions), a new one is created
+def download_job(debug, cansat_ip, data_path, sample_rate, progress):
+
+	client = CansatClient(debug, cansat_ip, os.path.join(SETTINGS_PATH, "urls.json"), os.path.join(SETTINGS_PATH, "cansat.json"))
+
+	try:
+
+		return download_data_sets(client, data_path, sample_rate, progress)
+
+	finally:
+
+		client.close()
+
+
+# Answer a request that started jobs: the job page (polls /api/jobs/<job_id> then opens the result) or the jobs status in json
+# result_url is opened once every job is done (default: the result of the first job)
+def job_response(job_ids, result_url = None):
+
+	jobs = [_jobs.status(job_id) for job_id in job_ids]
+
+	# The state of a job was deleted (finished more than an hour ago)
+	if None in jobs:
+
+		abort(404)
+
+	if result_url is None:
+
+		result_url = jobs[0]["resultUrl"]
+
+	if request.accept_mimetypes.best == "application/json":
+
+		if len(jobs) == 1:
+
+			return jsonify(jobs[0]), 202
+
+		return jsonify({"jobs": jobs, "resultUrl": result_url}), 202
+
+	return render_template("job.html", texts = _language.texts("job"), jobs = jobs, result_url = result_url)
+
+
+# =============================================================================
+# Request logs
+# =============================================================================
+
+
+# Adds the id of the current request to the records logged while answering it
+class RequestFilter(logging.Filter):
+
+
+	def __str__(self):
+
+		return "RequestFilter class"
+
+
+	def filter(self, record):
+
+		if has_request_context():
+
+			record.requestId = g.get("request_id")
+
+		return True
+
+
+_log_handler.addFilter(RequestFilter())
+
+
+# The request id comes from the X-Request-Id header (set by a proxy) or is created here
+@APP.before_request
+def start_request():
+
+	g.request_id = request.headers.get("X-Request-Id") or uuid.uuid4().hex[:16]
+	g.request_start = time.perf_counter()
+
+	return
+
+
+# One record per request with its method, path, status and latency
+@APP.after_request
+def log_request(response):
+
+	latency = (time.perf_counter() - g.request_start) * 1000
+	response.headers["X-Request-Id"] = g.request_id
+
+	ACCESS_LOGGER.info(
+		f"{request.method} {request.path} {response.status_code} {latency:.1f}ms",
+		extra = {
+			"method": request.method,
+			"path": request.path,
+			"status": response.status_code,
+			"latencyMs": round(latency, 3)
+			}
+		)
+
+	return response
+
+
+# =============================================================================
+# Routes
+# =============================================================================
+
+
+# Links to different data processing functions
+@APP.route('/', methods = ['GET', 'POST'])
+def process_data_functions_view():
+
+	texts = _language.texts("processDataFunctions")
+
+	# Every data set from the catalog, the selected one (the last by default) gets the links
+	data_sets = _catalog.scan()
+	data_set = request.args.get("data_set")
+
+	if data_set is None:
+
+		selected = data_sets[-1] if len(data_sets) > 0 else None
+
+	else:
+
+		selected = next((manifest for manifest in data_sets if manifest["dataSet"] == data_set), None)
+
+		if selected is None:
+
+			abort(404)
+
+	return render_template('process_index.html', texts = texts, data_sets = data_sets, selected = selected)
+
+
+# Charts or maps of the data sets ticked on the index page
+@APP.route("/compare", methods = ['GET'])
+def compare_view():
+
+	data_sets = request.args.getlist("data_set")
+	view = request.args.get("view")
+
+	if len(data_sets) == 0 or view not in ("chart", "map"):
+
+		return redirect(url_for("process_data_functions_view"))
+
+	return redirect(url_for(f"process_data_{view}_view", data_set = join_data_sets(data_sets)))
+
+
+# First render a form then render in a new window a map with different tyles and markers
+@APP.route("/process_data/map/<data_set>", methods = ['GET', 'POST'])
+def process_data_map_view(data_set):
+
+	# Load default values in form (maps.json, reloaded by the config watcher)
+	map_renderer = _map
+	map_config = map_renderer.tiles
+	texts = _language.texts("map")
+
+	# The manifests tell if the data sets have GPS fixes and where they are, without reading them
+	# Several data sets (/process_data/map/0,2) are drawn in the same map
+	data_sets = parse_data_sets(data_set)
+	manifests = load_manifests(data_sets)
+	bounds = union_bounds(manifests)
+
+	if bounds is None:
+
+		abort(404)
+
+	default_data = {}
+	default_data["mapTitle"] = map_config['defaultTitle']
+	default_data["iconsColor"] = map_config['iconsColor']
+	default_data["defaultIconsColor"] = map_config['icon_default_color']
+	default_data["defaultIcon"] = map_config["defaultIcon"]
+	default_data["icons"] = map_config["icons"]
+	default_data["zoomStart"] = map_config["defaultZoom"]
+	default_data["defaultMode"] = map_config["defaultMode"]
+	default_data["modes"] = map_config["modes"]
+
+	# Create the map with the selected values
+	if request.method == 'POST':
+
+		title = str(request.form.get("mapTitle"))
+		icon = str(request.form.get("iconTypes"))
+		color = str(request.form.get("iconsColor"))
+		zoom_start = int(request.form.get("zoomStart"))
+		mode = str(request.form.get("mapMode", map_config["defaultMode"]))
+
+		# The map is named after everything used to create it (tiles and track options come from maps.json)
+		map_key = _map_results.key(
+			join_data_sets(data_sets),
+			[manifest["version"] for manifest in manifests],
+			map_renderer.language.language,
+			map_renderer.language.version,
+			map_config,
+			title,
+			icon,
+			color,
+			zoom_start,
+			mode
+			)
+
+		if map_config["offlineTiles"]["enabled"]:
+
+			tiles_url = TILES_URL
+
+		else:
+
+			tiles_url = None
+
+		map_url = url_for("map_result_view", map_key = map_key)
+
+		if _map_results.lookup(map_key):
+
+			return redirect(map_url, code = 303)
+
+		if len(data_sets) == 1:
+
+			job = (render_map_job, (map_renderer, _datasets.path(data_sets[0]), title, icon, color, zoom_start, mode, tiles_url, bounds, _map_results.path(map_key)))
+
+		else:
+
+			job = (render_comparison_map_job, (map_renderer, [_datasets.path(name) for name in data_sets], data_sets, title, icon, zoom_start, mode, tiles_url, bounds, _map_results.path(map_key)))
+
+		_jobs.submit(
+			map_key,
+			map_url,
+			job[0],
+			job[1],
+			lambda render_time: _map_results.register(map_key, render_time)
+			)
+
+		return job_response([map_key])
+
+	return render_template("maps.html", texts = texts, default_data = default_data)
+
+
+# Render the motion detection video (from the camera video) and the thermal video
+@APP.route("/process_data/video/<data_set>", methods = ['GET', 'POST'])
+def process_data_video_view(data_set):
+
+	texts = _language.texts("video")
+	manifest = _catalog.manifest(data_set)
+	thermal_key = None
+	job_ids = []
+
+	if manifest is None:
+
+		abort(404)
+
+	# Box the moving regions of the camera video, unless it was already done with the same motion settings
+	if os.path.isfile(CAMERA_VIDEO_PATH):
+
+		source = motion_source(CAMERA_VIDEO_PATH, _video.config["motionDetection"])
+		stats = read_json(MOTION_STATS_PATH)
+
+		if stats is None or stats.get("source") != source or not os.path.isfile(MOTION_VIDEO_PATH):
+
+			motion_key = hashlib.sha256(f"motion-{source}".encode("utf-8")).hexdigest()
+
+			_jobs.submit(
+				motion_key,
+				request.path,
+				render_motion_job,
+				(_video, CAMERA_VIDEO_PATH, MOTION_VIDEO_PATH, MOTION_STATS_PATH, source)
+				)
+
+			job_ids.append(motion_key)
+
+	# Encode the thermal camera frames, unless this data set was already encoded with the same video.json
+	if "therm" in manifest["channels"] and manifest["length"] > 0:
+
+		thermal_key = _video_results.key(str(data_set), manifest["version"], _video.config)
+
+		if not _video_results.lookup(thermal_key):
+
+			_jobs.submit(
+				thermal_key,
+				request.path,
+				render_thermal_job,
+				(_video, _datasets.path(data_set), _video_results.path(thermal_key), _video_results.stats_path(thermal_key)),
+				lambda render_time: _video_results.register(thermal_key, render_time)
+				)
+
+			job_ids.append(thermal_key)
+
+	# The page is opened again once the videos are encoded
+	if len(job_ids) > 0:
+
+		return job_response(job_ids)
+
+	return render_template("video.html", texts = texts, thermal_key = thermal_key)
+
+
+# First render a form then create the graph 
+@APP.route("/process_data/chart/<data_set>", methods = ['GET', 'POST'])
+def process_data_chart_view(data_set):
+
+	texts = _language.texts("chart")
+
+	# The form lists the channels of the manifests, the samples are only read to create the chart
+	# Several data sets (/process_data/chart/0,2) are drawn in the same chart, aligned on their start or on a flight event
+	data_sets = parse_data_sets(data_set)
+	manifests = load_manifests(data_sets)
+	channels = union_channels(manifests)
+
+	data_config = _chart.config
+
+	chart_config = {}
+	chart_config["pointsType"] = data_config["pointsType"]
+	chart_config["linesType"] = data_config["linesType"]
+	chart_config["defaultLineWidth"] = data_config["defaultLineWidth"]
+	chart_config["defaultColor"] = data_config["defaultColor"]
+		
+	x_data = {}
+	x_data["data"] = []
+
+	y_data = {}
+	y_data["data"] = []
+
+	for d in channels:
+
+		try:
+
+			x_data["data"].append(data_config["data_config"][d])
+			y_data["data"].append(data_config["data_config"][d])
+
+		except KeyError:
+
+			pass
+
+	time = {"name": "time", "unit": "s", "prefix": "time"}
+	x_data["data"].append(time)
+
+	# Loading all users choices and create chart
+
+	if request.method == 'POST':
+
+		if len(data_sets) == 1:
+
+			name, version, flights = data_sets[0], manifests[0]["version"], None
+
+		else:
+
+			try:
+
+				offsets = alignment_offsets(manifests, request.form.get("align", ALIGN_START), data_config["recordingFrequency"])
+
+			except ValueError:
+
+				abort(400)
+
+			name, version = join_data_sets(data_sets), [manifest["version"] for manifest in manifests]
+			flights = [{"label": label, "offset": offset} for label, offset in zip(data_sets, offsets)]
+
+		chart = load_chart_request(name, channels, version, request.form, flights)
+
+		# Nothing to draw: the job would fail
+		if len(chart["y_data"]) == 0:
+
+			abort(400)
+
+		# One image per ordinate (rendered in parallel) or a single image with every ordinate
+		if chart["separate_panels"] and len(chart["y_data"]) > 1:
+
+			panels = chart_panels(name, version, chart)
+
+		else:
+
+			panels = [chart]
+
+		chart_keys = [panel["key"] for panel in panels]
+		page_url = url_for("chart_page_view", chart_keys = "-".join(chart_keys))
+		job_ids = []
+
+		for panel in panels:
+
+			if _chart_results.lookup(panel["key"]):
+
+				continue
+
+			if flights is None:
+
+				job = (render_chart_job, (_chart, _datasets.path(name), panel, _chart_results.path(panel["key"])))
+
+			else:
+
+				job = (render_comparison_job, (_chart, [_datasets.path(label) for label in data_sets], panel, _chart_results.path(panel["key"])))
+
+			_jobs.submit(
+				panel["key"],
+				page_url,
+				job[0],
+				job[1],
+				lambda render_time, key = panel["key"]: _chart_results.register(key, render_time)
+				)
+			job_ids.append(panel["key"])
+
+		if len(job_ids) == 0:
+
+			return render_template("chart.html", chart_keys = chart_keys)
+
+		return job_response(job_ids, page_url)
+
+	# The flights of a comparison can be aligned on the events every data set has
+	align = align_options(manifests) if len(data_sets) > 1 else None
+
+	return render_template("charts.html", texts = texts, y_data = y_data, x_data = x_data, chart_config = chart_config, align = align)
+
+
+# Render a chart in memory and send it directly, takes the chart form fields as query parameters
+@APP.route("/api/chart/<data_set>.png", methods = ['GET'])
+def chart_api_view(data_set):
+
+	if _catalog.manifest(data_set) is None:
+
+		abort(404)
+
+	data = load_data_set(data_set)
+	chart = load_chart_request(data_set, data.keys(), data.version, request.args)
+
+	if len(chart["y_data"]) == 0:
+
+		abort(400)
+
+	# The browser already has this chart
+	if request.if_none_match.contains(chart["key"]):
+
+		response = make_response("", 304)
+
+	else:
+
+		x_data, y_data = chart_series(chart, data)
+
+		response = make_response(_chart.render_chart(
+			x_data,
+			y_data,
+			chart["title"],
+			chart["x_label"],
+			chart["y_label"],
+			chart["line_width"],
+			chart["full_resolution"],
+			chart["height"]
+			))
+		response.mimetype = "image/png"
+
+	response.set_etag(chart["key"])
+
+	return response
+
+
+# Serve a rendered chart or map, its name is a content hash so it never changes
+# Page showing one or several charts (keys joined with "-")
+@APP.route("/result/chart/<chart_keys>.html", methods = ['GET'])
+def chart_page_view(chart_keys):
+
+	chart_keys = chart_keys.split("-")
+
+	for chart_key in chart_keys:
+
+		if not chart_key.isalnum() or not _chart_results.exists(chart_key):
+
+			abort(404)
+
+	return render_template("chart.html", chart_keys = chart_keys)
+
+
+@APP.route("/result/chart/<chart_key>.png", methods = ['GET'])
+def chart_result_view(chart_key):
+
+	return send_result(_chart_results, chart_key, "image/png")
+
+
+@APP.route("/result/map/<map_key>.html", methods = ['GET'])
+def map_result_view(map_key):
+
+	return send_result(_map_results, map_key, "text/html")
+
+
+@APP.route("/result/video/<video_key>.webm", methods = ['GET'])
+def video_result_view(video_key):
+
+	return send_result(_video_results, video_key, "video/webm")
+
+
+def send_result(cache, key, mimetype):
+
+	if not key.isalnum() or not cache.exists(key):
+
+		abort(404)
+
+	response = send_file(
+		cache.path(key),
+		mimetype = mimetype,
+		etag = key,
+		max_age = RESULT_MAX_AGE,
+		conditional = True
+		)
+	response.cache_control.public = True
+	response.cache_control.immutable = True
+
+	return response
+
+
+# Serve the offline map tiles (see the prefetch_tiles command)
+@APP.route("/tiles/<int:zoom>/<int:x>/<int:y>.png", methods = ['GET'])
+def tile_view(zoom, x, y):
+
+	config = _map.tiles["offlineTiles"]
+
+	# The MBTiles file is only created by prefetch_tiles or once the offline tiles are enabled,
+	# and only the zoom levels it was filled with exist
+	if not config["enabled"] or zoom > max(config["zoomLevels"]) or not (0 <= x < 2 ** zoom and 0 <= y < 2 ** zoom):
+
+		abort(404)
+
+	tile = load_tile_store().get(zoom, x, y)
+
+	if tile is None:
+
+		abort(404)
+
+	response = make_response(tile)
+
+	if tile[:3] == b"\xff\xd8\xff":
+
+		response.mimetype = "image/jpeg"
+
+	else:
+
+		response.mimetype = "image/png"
+
+	response.cache_control.public = True
+	response.cache_control.max_age = TILES_MAX_AGE
+
+	return response
+
+
+# State, progress and result url of a render job
+@APP.route("/api/jobs/<job_id>", methods = ['GET'])
+def job_view(job_id):
+
+	status = _jobs.status(job_id)
+
+	if status is None:
+
+		abort(404)
+
+	return jsonify(status)
+
+
+# Flight events (sample indices) and statistics of each phase of a data set, the derived channels are listed with the others
+@APP.route("/api/metrics/<data_set>", methods = ['GET'])
+def metrics_view(data_set):
+
+	if _catalog.manifest(data_set) is None:
+
+		abort(404)
+
+	data = load_data_set(data_set)
+
+	return jsonify({
+		"dataSet": str(data_set),
+		"channels": list(data.metrics["channels"]),
+		"events": data.metrics["events"],
+		"phases": data.metrics["phases"]
+	})
+
+
+# Manifests of every data set (the catalog index) or of one data set
+@APP.route("/api/catalog", methods = ['GET'])
+def catalog_view():
+
+	return jsonify({"dataSets": _catalog.scan()})
+
+
+@APP.route("/api/catalog/<data_set>", methods = ['GET'])
+def catalog_data_set_view(data_set):
+
+	manifest = _catalog.manifest(data_set)
+
+	if manifest is None:
+
+		abort(404)
+
+	return jsonify(manifest)
+
+
+# Samples of a channel between start and end (seconds from the first sample, the whole flight by default),
+# at most points values: little-endian float32, one value per sample or (min, max) pairs per bucket of samples (X-Data-Layout)
+# Read from the pyramid of the channel: the work of a request depends on the points, not on the length of the data set
+@APP.route("/api/data/<data_set>/<channel>", methods = ['GET'])
+def data_api_view(data_set, channel):
+
+	manifest = _catalog.manifest(data_set)
+
+	if manifest is None or channel not in manifest["channels"]:
+
+		abort(404)
+
+	data = load_data_set(data_set)
+	pyramid = _pyramids.get(data)
+
+	# The thermal camera frames have no pyramid
+	if channel not in pyramid.channels:
+
+		abort(404)
+
+	sample_rate = data.header["sampleRate"]
+
+	try:
+
+		start = float(request.args.get("start", 0))
+		end = float(request.args.get("end", len(data) / sample_rate))
+		points = int(request.args.get("points", DATA_POINTS))
+
+	except ValueError:
+
+		abort(400)
+
+	if not (numpy.isfinite(start) and numpy.isfinite(end)) or end < start or points < 1 or points > MAX_POINTS:
+
+		abort(400)
+
+	key = hashlib.sha256(f"{pyramid.source}-{channel}-{start}-{end}-{points}".encode("utf-8")).hexdigest()
+
+	# The browser already has these values
+	if request.if_none_match.contains(key):
+
+		response = make_response("", 304)
+
+	else:
+
+		layout, first, step, values = pyramid.query(channel, round(start * sample_rate), round(end * sample_rate), points)
+
+		response = make_response(values.tobytes())
+		response.mimetype = "application/octet-stream"
+		response.headers["X-Data-Layout"] = layout
+		response.headers["X-Data-Start"] = str(first / sample_rate)
+		response.headers["X-Data-Step"] = str(step / sample_rate)
+		response.headers["X-Data-Count"] = str(len(values) // (2 if layout == "minmax" else 1))
+		response.headers["X-Data-Duration"] = str(len(data) / sample_rate)
+
+	response.set_etag(key)
+
+	return response
+
+
+# Chart of the channels of a data set drawn by the browser from /api/data: zoomed with the wheel and moved by dragging
+@APP.route("/explore/<data_set>", methods = ['GET'])
+def explore_view(data_set):
+
+	manifest = _catalog.manifest(data_set)
+
+	if manifest is None:
+
+		abort(404)
+
+	texts = _language.texts("explore")
+	data_config = _chart.config["data_config"]
+
+	channels = [
+		{"prefix": prefix, "name": _language.get_text(prefix), "unit": data_config[prefix]["unit"]}
+		for prefix, info in manifest["channels"].items()
+		if prefix in data_config and len(info["shape"]) == 0
+	]
+
+	explore_config = {
+		"dataUrl": url_for("data_api_view", data_set = manifest["dataSet"], channel = "CHANNEL"),
+		"duration": manifest["length"] / manifest["sampleRate"],
+		"sampleRate": manifest["sampleRate"],
+		"maxPoints": MAX_POINTS,
+		"color": _map.tiles["trackColor"]
+	}
+
+	return render_template("explore.html", texts = texts, data_set = manifest["dataSet"], channels = channels, explore_config = explore_config)
+
+
+# Cache counters (datasets, catalog, pyramids, charts, maps)
+@APP.route("/api/cache/<name>", methods = ['GET'])
+def cache_view(name):
+
+	if name not in _caches:
+
+		abort(404)
+
+	return jsonify(_caches[name].stats())
+
+
+# =============================================================================
+# CanSat
+# =============================================================================
+
+
+# Json answer of a CanSat request: its result and latency, or the error (502, 504 if the CanSat didn't answer in time)
+def cansat_response(endpoint, function):
+
+	start = time.perf_counter()
+
+	try:
+
+		result = function()
+
+	except CansatError as e:
+
+		LOGGER.warning(f"CanSat request failed: {e}")
+
+		return jsonify({"endpoint": endpoint, "error": str(e)}), 504 if e.timeout else 502
+
+	return jsonify({"endpoint": endpoint, "result": result, "latencyMs": round((time.perf_counter() - start) * 1000, 3)})
+
+
+# Endpoints of the CanSat API (urls.json), their methods and the client counters
+@APP.route("/api/cansat", methods = ['GET'])
+def cansat_endpoints_view():
+
+	client = _cansat
+
+	return jsonify({
+		"endpoints": {endpoint: client.method(endpoint) for endpoint in client.endpoints()},
+		"stats": client.stats()
+		})
+
+
+# Status of the CanSat, the browsers polling it at the same time share one request to the CanSat
+@APP.route("/api/cansat/status", methods = ['GET'])
+def cansat_status_view():
+
+	return cansat_response("status", _cansat.status)
+
+
+# Download the recordings of the CanSat to new data sets (a job: the job page opens the data sets page once it is done)
+@APP.route("/api/cansat/download", methods = ['POST'])
+def cansat_download_view():
+
+	_jobs.submit(
+		"download",
+		url_for("process_data_functions_view"),
+		download_job,
+		(DEBUG, _config.cansat_ip, DATA_PATH, 1 / _chart.config["recordingFrequency"])
+		)
+
+	return job_response(["download"])
+
+
+# Other endpoints (commands and logs), called with their method in cansat.json
+@APP.route("/api/cansat/<endpoint>", methods = ['GET', 'POST'])
+def cansat_view(endpoint):
+
+	client = _cansat
+
+	# The data sets are downloaded by cansat_download_view
+	if endpoint not in client.urls or endpoint == "download":
+
+		abort(404)
+
+	if request.method != client.method(endpoint):
+
+		abort(405)
+
+	return cansat_response(endpoint, lambda: client.call(endpoint))
+
+
+# =============================================================================
+# Live telemetry
+# =============================================================================
+
+
+# Charts and map of the data set being recorded, updated by the rows pushed by /api/live/stream
+@APP.route("/live", methods = ['GET'])
+def live_view():
+
+	texts = _language.texts("live")
+	data_config = _chart.config["data_config"]
+	map_config = _map.tiles
+
+	channels = [
+		{"prefix": prefix, "name": _language.get_text(prefix), "unit": data_config[prefix]["unit"]}
+		for prefix in _live_config["channels"]
+		if prefix in data_config
+	]
+
+	if map_config["offlineTiles"]["enabled"]:
+
+		tiles_url = TILES_URL
+
+	else:
+
+		tiles_url = map_config["offlineTiles"]["url"]
+
+	live_config = {
+		"streamUrl": url_for("live_stream_view"),
+		"bufferSize": _live_config["bufferSize"],
+		"tilesUrl": tiles_url,
+		"attribution": map_config["offlineTiles"]["attribution"],
+		"zoomStart": map_config["defaultZoom"],
+		"trackColor": map_config["trackColor"]
+	}
+
+	return render_template("live.html", texts = texts, channels = channels, live_config = live_config)
+
+
+# Server-Sent Events: one "rows" event ({"dataSet", "running", "rows"}) each time rows are recorded
+# 	- the event id is <data_set>/<next row index>: a browser reconnecting (Last-Event-ID) only gets the rows it missed
+# 	- a comment is sent every keepAlive seconds without rows, so closed connections are noticed
+@APP.route("/api/live/stream", methods = ['GET'])
+def live_stream_view():
+
+	feed = _live_feed
+	keep_alive = _live_config["keepAlive"]
+	last_event_id = request.headers.get("Last-Event-ID", "")
+	data_set, separator, index = last_event_id.rpartition("/")
+
+	if separator == "" or not index.isdigit():
+
+		data_set, index = None, 0
+
+	else:
+
+		index = int(index)
+
+	if not feed.connect():
+
+		return jsonify({"error": "too many live viewers", "maxClients": feed.max_clients}), 503
+
+	def stream(data_set, index):
+
+		running = None
+
+		try:
+
+			yield "retry: 1000\n\n"
+
+			while True:
+
+				new_data_set, first, rows, new_running = feed.wait(data_set, index, running, keep_alive)
+
+				if new_data_set == data_set and len(rows) == 0 and new_running == running:
+
+					yield ": keep-alive\n\n"
+
+					continue
+
+				data_set, index, running = new_data_set, first + len(rows), new_running
+				event_id = f"id: {data_set}/{index}\n" if data_set is not None else ""
+				yield f'{event_id}event: rows\ndata: {{"dataSet":{json.dumps(data_set)},"running":{json.dumps(running)},"rows":[{",".join(rows)}]}}\n\n'
+
+		finally:
+
+			feed.disconnect()
+
+	return Response(stream(data_set, index), mimetype = "text/event-stream", headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# Data set being recorded and viewers of this worker
+@APP.route("/api/live", methods = ['GET'])
+def live_stats_view():
+
+	return jsonify(_live_feed.stats())
+
+
+# =============================================================================
+# Run program
+# =============================================================================
+
+
+# Download the tiles covering the GPS track of the given data sets (all data sets if none is given)
+# 	python main.py prefetch_tiles [data_set ...]
+def prefetch_tiles_command(data_sets):
+
+	config = _map.tiles["offlineTiles"]
+
+	if len(data_sets) == 0:
+
+		data_sets = sorted(os.listdir(os.path.join(DATA_PATH, "normal/")))
+
+	tiles = set()
+
+	for data_set in data_sets:
+
+		data = load_data_set(data_set)
+		latitude, longitude = prepare_track(data["lat"], data["lon"])
+
+		if len(latitude) == 0:
+
+			continue
+
+		tiles.update(tile_pyramid(
+			float(latitude.min()),
+			float(latitude.max()),
+			float(longitude.min()),
+			float(longitude.max()),
+			config["zoomLevels"],
+			config["padding"]
+			))
+
+	store = load_tile_store()
+	store.set_metadata({"name": config["name"], "format": "png", "attribution": config["attribution"]})
+	downloaded, failed = prefetch_tiles(store, config["url"], sorted(tiles), config["workers"], DEBUG)
+
+	print(f"{len(tiles)} tiles, {downloaded} downloaded, {failed} failed ({store.path})")
+
+	return
+
+
+# Record the telemetry of the CanSat in a new data set (or the given one) until Ctrl+C
+# The server shows it live at /live, it can run at the same time as any server command
+# An existing data set is only recorded again (its recording is lost) with --overwrite
+# 	python main.py record [data_set] [--overwrite]
+def record_command(args):
+
+	overwrite = "--overwrite" in args
+	args = [arg for arg in args if arg != "--overwrite"]
+
+	if len(args) > 0:
+
+		data_set = args[0]
+
+	else:
+
+		data_set = next_data_set(os.path.join(DATA_PATH, "normal/"))
+
+	recorder = TelemetryRecorder(
+		DEBUG,
+		_cansat,
+		DATA_PATH,
+		data_set,
+		_live_config,
+		1 / _chart.config["recordingFrequency"],
+		overwrite
+		)
+
+	try:
+
+		recorder.run()
+
+	except FileExistsError as e:
+
+		sys.exit(f"{e}: choose another data set or add --overwrite to replace it")
+
+	except KeyboardInterrupt:
+
+		pass
+
+	print(f"data set {data_set}: {recorder.stats()}")
+
+	return
+
+
+# Download the recordings of the CanSat to new data sets, an interrupted download goes on where it stopped
+# 	python main.py download
+def download_command(args):
+
+	data_sets = download_data_sets(_cansat, DATA_PATH, 1 / _chart.config["recordingFrequency"])
+
+	print(f"new data sets: {', '.join(data_sets)}")
+
+	return
+
+
+# Box the moving regions of a camera video (src/static/result/cam.mp4 by default) and print the speed of each stage
+# 	python main.py motion [source] [output]
+def motion_command(args):
+
+	source = args[0] if len(args) > 0 else CAMERA_VIDEO_PATH
+	output = args[1] if len(args) > 1 else MOTION_VIDEO_PATH
+
+	os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok = True)
+	stats = _video.detect_motion(source, output)
+
+	print(f"{stats['frames']} frames ({stats['movingFrames']} with motion, {stats['regions']} regions) in {stats['seconds']}s: {stats['fps']} frames/s with {stats['workers']} workers")
+
+	for stage, stage_stats in stats["stages"].items():
+
+		print(f"{stage:>8}: {stage_stats['seconds']:8.3f}s {stage_stats['fps']:10.1f} frames/s")
+
+	return
+
+
+# Import the libraries of the charts, maps and videos and load the matplotlib fonts,
+# so the first render doesn't wait for them (called in a thread once the server is started)
+def warm_up():
+
+	start = time.perf_counter()
+
+	for module in WARM_UP_MODULES:
+
+		__import__(module)
+
+	from matplotlib import font_manager
+	from matplotlib.figure import Figure
+	from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+	font_manager.findfont("DejaVu Sans")
+	FigureCanvasAgg(Figure()).draw()
+
+	if DEBUG:
+
+		LOGGER.debug(f"warm up: {', '.join(WARM_UP_MODULES)} imported in {time.perf_counter() - start:.3f}s")
+
+	return
+
+
+# Load once, before the server forks its workers, what every worker needs
+# (the workers share these pages copy-on-write instead of loading them again)
+def preload():
+
+	start = time.perf_counter()
+
+	# Data sets headers and channels mappings
+	for data_set in sorted(os.listdir(os.path.join(DATA_PATH, "normal/"))):
+
+		data = load_data_set(data_set)
+
+		for channel in data.keys():
+
+			data[channel]
+
+	# matplotlib, OpenCV and folium
+	warm_up()
+
+	# Compiled templates
+	for template in APP.jinja_env.list_templates():
+
+		APP.jinja_env.get_template(template)
+
+	LOGGER.info(f"preload: {_datasets.stats()['entries']} data sets, fonts and templates loaded in {time.perf_counter() - start:.3f}s")
+
+	return
+
+
+# Run the application with a multi-process WSGI server (gunicorn, not available on Windows)
+# 	python main.py serve [bind]
+def serve_command(args):
+
+	try:
+
+		from scripts.server import serve
+
+	except ImportError as e:
+
+		LOGGER.error(f"The serve command needs gunicorn: {e}")
+		sys.exit(f"The serve command needs gunicorn (pip install gunicorn): {e}")
+
+	preload()
+
+	# The pool of each worker is started by its first job, once forked
+	_jobs.workers = job_workers(_config.server_workers)
+
+	serve(
+		APP,
+		args[0] if len(args) > 0 else _config.server_bind,
+		_config.server_workers,
+		_config.server_threads + _live_feed.max_clients,
+		_config.server_timeout,
+		lambda server, worker: _watcher.start()
+		)
+
+	return
+
+
+COMMANDS = {
+	"download": download_command,
+	"motion": motion_command,
+	"prefetch_tiles": prefetch_tiles_command,
+	"record": record_command,
+	"serve": serve_command
+	}
+
+
+def main():
+
+	if len(sys.argv) > 1:
+
+		if sys.argv[1] not in COMMANDS:
+
+			sys.exit(f"Unknown command {sys.argv[1]}, available commands: {', '.join(COMMANDS)}")
+
+		COMMANDS[sys.argv[1]](sys.argv[2:])
+
+	else:
 
-	APP.run()
+		threading.Thread(target = warm_up, daemon = True).start()
+		_watcher.start()
+		APP.run()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,280 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import threading
+import logging
+import time
+import json
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+LOGGER = logging.getLogger(__name__)
+USER_AGENT = "LC-SAT web application"
+
+# Upstream statuses retried (GET requests only, the commands are only retried if the connection failed)
+RETRY_STATUSES = (502, 503, 504)
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# The CanSat can't be reached, didn't answer in time or answered an error
+# 	- endpoint: name of the endpoint in urls.json
+# 	- timeout: True if the CanSat didn't answer in time
+# 	- status: HTTP status of the error answer (None if there was no answer)
+class CansatError(IOError):
+
+
+	def __init__(self, endpoint, message, timeout = False, status = None):
+
+		super().__init__(f"{endpoint}: {message}")
+
+		self.endpoint = endpoint
+		self.timeout = timeout
+		self.status = status
+
+		return
+
+
+# A status request shared by the callers arriving while it runs
+class Flight:
+
+
+	def __init__(self):
+
+		self.done = threading.Event()
+		self.result = None
+		self.error = None
+
+		return
+
+
+# Client of the CanSat API (urls.json) at cansatIp
+# 	- one keep-alive session (pool of poolSize connections), a command is a single round trip
+# 	- timeouts (connect and read) per endpoint, methods per endpoint (GET by default)
+# 	- failed connections are retried with an exponential backoff (and 502/503/504 answers to GET requests)
+# 	- status requests are coalesced: callers arriving while a status request runs get its result,
+# 	  and a status younger than statusMaxAge seconds is returned without asking the CanSat
+class CansatClient:
+
+
+	def __init__(self, debug, base_url, urls_path, config_path):
+
+		self.debug = debug
+		self.base_url = base_url.rstrip("/")
+
+		with open(urls_path, "r", encoding = "utf-8") as file:
+
+			self.urls = json.load(file)
+			file.close()
+
+		with open(config_path, "r", encoding = "utf-8") as file:
+
+			self.config = json.load(file)
+			file.close()
+
+		self.lock = threading.Lock()
+		self.http = None
+		self.status_value = None
+		self.status_time = 0
+		self.flight = None
+		self.upstream_requests = 0
+		self.coalesced_requests = 0
+
+		return
+
+
+	def __str__(self):
+
+		return "CansatClient class"
+
+
+	# requests is imported and the session created on first use (after the server workers are forked)
+	def session(self):
+
+		with self.lock:
+
+			if self.http is None:
+
+				import requests
+				from urllib3.util.retry import Retry
+
+				retry = Retry(
+					total = self.config["retries"],
+					backoff_factor = self.config["backoff"],
+					status_forcelist = RETRY_STATUSES,
+					allowed_methods = frozenset(["GET"]),
+					raise_on_status = False
+					)
+				adapter = requests.adapters.HTTPAdapter(pool_connections = 1, pool_maxsize = self.config["poolSize"], max_retries = retry)
+
+				self.http = requests.Session()
+				self.http.headers["User-Agent"] = USER_AGENT
+				self.http.mount("http://", adapter)
+				self.http.mount("https://", adapter)
+
+		return self.http
+
+
+	def endpoints(self):
+
+		return list(self.urls)
+
+
+	def url(self, endpoint):
+
+		return self.base_url + self.urls[endpoint]
+
+
+	def method(self, endpoint):
+
+		return self.config["methods"].get(endpoint, "GET")
+
+
+	# (connect, read) timeouts in seconds
+	def timeout(self, endpoint):
+
+		return self.config["connectTimeout"], self.config["timeouts"].get(endpoint, self.config["readTimeout"])
+
+
+	# Returns the requests response (stream: the body is read by the caller), raises CansatError
+	def request(self, endpoint, stream = False, **kwargs):
+
+		import requests
+
+		if endpoint not in self.urls:
+
+			raise KeyError(f"Unknown CanSat endpoint {endpoint}")
+
+		session = self.session()
+		start = time.perf_counter()
+
+		try:
+
+			response = session.request(self.method(endpoint), self.url(endpoint), timeout = self.timeout(endpoint), stream = stream, **kwargs)
+			response.raise_for_status()
+
+		except requests.Timeout as e:
+
+			raise CansatError(endpoint, f"no answer in {self.timeout(endpoint)} seconds ({e})", timeout = True)
+
+		except requests.HTTPError as e:
+
+			raise CansatError(endpoint, str(e), status = e.response.status_code)
+
+		except requests.RequestException as e:
+
+			raise CansatError(endpoint, str(e))
+
+		finally:
+
+			with self.lock:
+
+				self.upstream_requests += 1
+
+		if self.debug:
+
+			LOGGER.debug(f"{self.method(endpoint)} {endpoint}: {response.status_code} in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+		return response
+
+
+	# Json answer of the endpoint (or its text if it isn't json)
+	def call(self, endpoint):
+
+		response = self.request(endpoint)
+
+		try:
+
+			return response.json()
+
+		except ValueError:
+
+			return response.text
+
+
+	def status(self):
+
+		with self.lock:
+
+			if self.status_value is not None and time.monotonic() - self.status_time < self.config["statusMaxAge"]:
+
+				self.coalesced_requests += 1
+
+				return self.status_value
+
+			flight = self.flight
+			leader = flight is None
+
+			if leader:
+
+				flight = self.flight = Flight()
+
+			else:
+
+				self.coalesced_requests += 1
+
+		if not leader:
+
+			flight.done.wait()
+
+			if flight.error is not None:
+
+				raise flight.error
+
+			return flight.result
+
+		try:
+
+			flight.result = self.call("status")
+
+			with self.lock:
+
+				self.status_value = flight.result
+				self.status_time = time.monotonic()
+
+		except Exception as e:
+
+			flight.error = e
+			raise
+
+		finally:
+
+			with self.lock:
+
+				self.flight = None
+
+			flight.done.set()
+
+		return flight.result
+
+
+	def stats(self):
+
+		with self.lock:
+
+			return {
+				"url": self.base_url,
+				"upstreamRequests": self.upstream_requests,
+				"coalescedRequests": self.coalesced_requests
+			}
+
+
+	def close(self):
+
+		with self.lock:
+
+			if self.http is not None:
+
+				self.http.close()
+				self.http = None
+
+		return
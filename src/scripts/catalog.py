@@ -0,0 +1,335 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import numpy as np
+import threading
+import hashlib
+import logging
+import json
+import time
+import os
+
+from scripts.datasets import HEADER_NAME, PICKLE_NAME, open_dataset, temporary_path
+from scripts.metrics import METRICS_VERSION, has_nan
+from scripts.series import prepare_track
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+LOGGER = logging.getLogger(__name__)
+
+# data/normal/<data_set>/manifest.json: what the views need to know about a data set without reading its samples
+# 	- dataSet, source (the files it was built from), version (of the data set, part of the results keys)
+# 	- length, sampleRate, duration (s)
+# 	- channels: dtype, shape of a sample, min and max (None without a finite value), derived (computed by scripts/metrics.py)
+# 	- gps: bounding box and number of the fixes (None without fix)
+# 	- events: flight events (sample indices) of the metrics
+# 	- hash: sha256 of the recorded channel files
+MANIFEST_NAME = "manifest.json"
+
+# Part of the manifest source: change it when the manifest changes (2: the pyramid is built with the manifest)
+MANIFEST_VERSION = 2
+
+# Bytes of a channel file hashed at once
+HASH_CHUNK_SIZE = 2 ** 20
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Minimum and maximum of a channel (every value of a sample), NaN are left out
+def channel_range(values):
+
+	values = np.asarray(values)
+
+	if values.size == 0:
+
+		return None, None
+
+	if values.dtype.kind != "f" or not has_nan(values):
+
+		return values.min().item(), values.max().item()
+
+	if np.isnan(values).all():
+
+		return None, None
+
+	return np.nanmin(values).item(), np.nanmax(values).item()
+
+
+# Bounding box of the GPS fixes, None if there is none
+def gps_bounds(dataset):
+
+	if "lat" not in dataset or "lon" not in dataset:
+
+		return None
+
+	latitude, longitude = prepare_track(dataset["lat"], dataset["lon"])
+
+	if len(latitude) == 0:
+
+		return None
+
+	return {
+		"south": float(latitude.min()),
+		"west": float(longitude.min()),
+		"north": float(latitude.max()),
+		"east": float(longitude.max()),
+		"fixes": len(latitude)
+	}
+
+
+# sha256 of the recorded channels files (in the order of their names), the same recording always gets the same hash
+def content_hash(dataset, channels):
+
+	digest = hashlib.sha256()
+
+	for name in sorted(channels):
+
+		digest.update(name.encode("utf-8"))
+
+		with open(os.path.join(dataset.path, dataset.header["channels"][name]["file"]), "rb") as file:
+
+			for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+
+				digest.update(chunk)
+
+			file.close()
+
+	return digest.hexdigest()
+
+
+def build_manifest(data_set, dataset, source):
+
+	derived = dataset.metrics["channels"] if dataset.metrics is not None else {}
+	channels = {}
+
+	for name, info in dataset.header["channels"].items():
+
+		minimum, maximum = channel_range(dataset[name])
+		channels[name] = {
+			"dtype": np.dtype(info["dtype"]).name,
+			"shape": info["shape"][1:],
+			"min": minimum,
+			"max": maximum,
+			"derived": name in derived
+		}
+
+	length = len(dataset)
+	sample_rate = dataset.header["sampleRate"]
+
+	# Live recordings have the time of each sample
+	if "time" in dataset and length > 0:
+
+		duration = float(dataset["time"][-1] - dataset["time"][0])
+
+	else:
+
+		duration = length / sample_rate
+
+	return {
+		"dataSet": data_set,
+		"source": source,
+		"version": dataset.version,
+		"length": length,
+		"sampleRate": sample_rate,
+		"duration": duration,
+		"channels": channels,
+		"gps": gps_bounds(dataset),
+		"events": dataset.metrics["events"] if dataset.metrics is not None else {},
+		"hash": content_hash(dataset, [name for name in dataset.keys() if name not in derived])
+	}
+
+
+def read_json(path):
+
+	try:
+
+		with open(path, "r", encoding = "utf-8") as file:
+
+			data = json.load(file)
+			file.close()
+
+	except (FileNotFoundError, ValueError):
+
+		return None
+
+	return data
+
+
+# Written in a temporary file then renamed: a reader never sees a partial file
+def write_json(path, data):
+
+	tmp_path = temporary_path(path)
+
+	with open(tmp_path, "w", encoding = "utf-8") as file:
+
+		json.dump(data, file, indent = "\t")
+		file.close()
+
+	os.replace(tmp_path, path)
+
+	return
+
+
+# Manifests of the data sets of the registry (data/normal/*) and their index (index_path)
+# 	- a manifest is built once per version of a data set, when a view first asks for it, and saved next to it
+# 	- the min / max pyramid of the channels (pyramids, scripts/pyramid.py) is built with the manifest: the data set
+# 	  is read once and the queries of /api/data only read the pyramid
+# 	- the index keeps the manifests of every data set: a scan only checks the files of each data set,
+# 	  the data sets added or changed since the last scan get a new manifest and the removed ones are dropped
+class Catalog:
+
+
+	def __init__(self, debug, datasets, index_path, pyramids = None):
+
+		self.debug = debug
+		self.datasets = datasets
+		self.index_path = index_path
+		self.pyramids = pyramids
+
+		index = read_json(index_path)
+		self.entries = index["dataSets"] if index is not None and index.get("version") == MANIFEST_VERSION else {}
+
+		self.scans = 0
+		self.builds = 0
+		self.lock = threading.Lock()
+
+		return
+
+
+	def __str__(self):
+
+		return "Catalog class"
+
+
+	# Files a manifest was built from (the data set stamp) and the manifest and metrics versions
+	def source(self, path):
+
+		stamp = self.datasets.stamp(path)
+
+		if stamp[1] is None:
+
+			return None
+
+		return "-".join("none" if entry is None else f"{entry[0]}-{entry[1]}" for entry in stamp) + f"-{MANIFEST_VERSION}-{METRICS_VERSION}"
+
+
+	# Manifest of a data set, built if it is missing or outdated, None if there is no such data set
+	def manifest(self, data_set, write_index = True):
+
+		data_set = str(data_set)
+		path = self.datasets.path(data_set)
+
+		if not os.path.isfile(os.path.join(path, HEADER_NAME)) and not os.path.isfile(os.path.join(path, PICKLE_NAME)):
+
+			return None
+
+		source = self.source(path)
+
+		with self.lock:
+
+			manifest = self.entries.get(data_set)
+
+		if manifest is not None and manifest["source"] == source:
+
+			return manifest
+
+		manifest_path = os.path.join(path, MANIFEST_NAME)
+		manifest = read_json(manifest_path)
+
+		# Built by another server worker (or before a restart)
+		if manifest is None or manifest.get("source") != source:
+
+			start = time.perf_counter()
+
+			# Converts data.bin and computes the metrics if needed: the source is read again after
+			# (not through the registry: its lock would build the manifests of a comparison one after the other)
+			dataset = open_dataset(path, self.datasets.sample_rate)
+			manifest = build_manifest(data_set, dataset, self.source(path))
+
+			# Before the manifest: a data set with a manifest has its pyramid
+			if self.pyramids is not None:
+
+				self.pyramids.build(dataset)
+
+			write_json(manifest_path, manifest)
+
+			with self.lock:
+
+				self.builds += 1
+
+			LOGGER.info(f"catalog: manifest of {data_set} built in {time.perf_counter() - start:.3f}s")
+
+		with self.lock:
+
+			self.entries[data_set] = manifest
+
+			if write_index:
+
+				self.write_index()
+
+		return manifest
+
+
+	# Manifests of every data set (in the order of their numbers), the index is written if it changed
+	def scan(self):
+
+		root_path = self.datasets.root_path
+		names = [name for name in os.listdir(root_path) if os.path.isdir(os.path.join(root_path, name))] if os.path.isdir(root_path) else []
+		names.sort(key = lambda name: (not name.isdigit(), int(name) if name.isdigit() else 0, name))
+
+		with self.lock:
+
+			self.scans += 1
+			previous = dict(self.entries)
+
+		manifests = []
+
+		for name in names:
+
+			manifest = self.manifest(name, False)
+
+			if manifest is not None:
+
+				manifests.append(manifest)
+
+		with self.lock:
+
+			self.entries = {manifest["dataSet"]: manifest for manifest in manifests}
+
+			if self.entries != previous:
+
+				self.write_index()
+
+		if self.debug:
+
+			LOGGER.debug(f"catalog: {self.stats()}")
+
+		return manifests
+
+
+	# Called with the lock held
+	def write_index(self):
+
+		write_json(self.index_path, {"version": MANIFEST_VERSION, "dataSets": self.entries})
+
+		return
+
+
+	def stats(self):
+
+		with self.lock:
+
+			return {
+				"entries": len(self.entries),
+				"scans": self.scans,
+				"builds": self.builds
+			}
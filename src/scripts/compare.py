@@ -0,0 +1,93 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+
+from scripts.metrics import FLIGHT_EVENTS
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+# The data sets of a comparison are given in the urls as their ids joined with "," (/process_data/chart/0,2)
+DATA_SETS_SEPARATOR = ","
+
+# Alignment of the flights of a comparison on their first sample (or on one of FLIGHT_EVENTS)
+ALIGN_START = "start"
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Data sets of an url (each one once, in the given order)
+def parse_data_sets(data_set):
+
+	return list(dict.fromkeys(name for name in str(data_set).split(DATA_SETS_SEPARATOR) if name != ""))
+
+
+def join_data_sets(data_sets):
+
+	return DATA_SETS_SEPARATOR.join(data_sets)
+
+
+# Alignments possible for the manifests of a comparison: the start and the flight events found in every data set
+def align_options(manifests):
+
+	return [ALIGN_START] + [event for event in FLIGHT_EVENTS if all(event in manifest["events"] for manifest in manifests)]
+
+
+# Time (s) of the aligned event in each data set: it is subtracted from their time axis so the events happen at 0
+# period is the time between two samples of the chart time axis
+def alignment_offsets(manifests, align, period):
+
+	if align == ALIGN_START:
+
+		return [0.0 for manifest in manifests]
+
+	if align not in FLIGHT_EVENTS or not all(align in manifest["events"] for manifest in manifests):
+
+		raise ValueError(f"unknown alignment {align}")
+
+	return [manifest["events"][align] * period for manifest in manifests]
+
+
+# Bounding box of the GPS fixes of several manifests, None if one of them has no fix
+def union_bounds(manifests):
+
+	bounds = [manifest["gps"] for manifest in manifests]
+
+	if any(bound is None for bound in bounds):
+
+		return None
+
+	return {
+		"south": min(bound["south"] for bound in bounds),
+		"west": min(bound["west"] for bound in bounds),
+		"north": max(bound["north"] for bound in bounds),
+		"east": max(bound["east"] for bound in bounds),
+		"fixes": sum(bound["fixes"] for bound in bounds)
+	}
+
+
+# Call function on each item from a pool of threads, the results are in the order of the items
+# Reading the memory-mapped channels, converting and decimating them run in numpy without the GIL:
+# the flights of a comparison are loaded at the same time on the cores of the machine
+def map_parallel(function, items, workers = None):
+
+	items = list(items)
+	workers = min(len(items), workers or os.cpu_count() or 1)
+
+	if workers <= 1:
+
+		return [function(item) for item in items]
+
+	with ThreadPoolExecutor(max_workers = workers) as pool:
+
+		return list(pool.map(function, items))
@@ -0,0 +1,93 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import dataclasses
+import yaml
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# General settings of the application (res/settings/settings.yaml), loaded once
+# 	- the attributes are the settings names in snake case (cansatIp -> cansat_ip)
+# 	- the values are checked against the attribute types when the file is loaded
+# 	- the object can't be modified: load the file again to get new settings
+@dataclasses.dataclass(frozen = True)
+class Config:
+
+	theme: str
+	language: str
+	cansat_ip: str
+	debug: bool
+	dataset_cache_size: int
+	chart_cache_files: int
+	chart_cache_size: int
+	map_cache_files: int
+	map_cache_size: int
+	video_cache_files: int
+	video_cache_size: int
+	job_workers: int
+	server_bind: str
+	server_workers: int
+	server_threads: int
+	server_timeout: int
+	config_watch_interval: float
+
+
+	def __str__(self):
+
+		return "Config class"
+
+
+# Name of an attribute in settings.yaml
+def setting_name(attribute):
+
+	first, *others = attribute.split("_")
+
+	return first + "".join(word.capitalize() for word in others)
+
+
+# Raises ValueError with the file and the setting name if a setting is missing or has a wrong type (or the file isn't valid yaml)
+def load_config(file_path):
+
+	with open(file_path, "r", encoding = "utf-8") as file:
+
+		# A syntax error (a file being saved for example) is reported like the other setting errors
+		try:
+
+			data = yaml.safe_load(file) or {}
+
+		except yaml.YAMLError as e:
+
+			raise ValueError(f"{file_path}: {e}") from e
+
+		file.close()
+
+	values = {}
+
+	for field in dataclasses.fields(Config):
+
+		name = setting_name(field.name)
+
+		if name not in data:
+
+			raise ValueError(f"{file_path}: missing setting {name}")
+
+		value = data[name]
+
+		# yaml reads 1, 1.0 and true as int, float and bool (bool is a subclass of int)
+		if field.type is float and type(value) is int:
+
+			value = float(value)
+
+		if not isinstance(value, field.type) or (field.type is int and isinstance(value, bool)):
+
+			raise ValueError(f"{file_path}: {name} must be a {field.type.__name__}, not {value!r}")
+
+		values[field.name] = value
+
+	return Config(**values)
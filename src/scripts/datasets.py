@@ -0,0 +1,537 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import numpy as np
+import collections
+import threading
+import json
+import os
+import pickle
+import logging
+
+from scripts.metrics import compute_metrics, METRICS_VERSION
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+LOGGER = logging.getLogger(__name__)
+
+# A dataset folder (data/normal/<n>/) contains:
+# 	- header.json: format version, sample rate, length and one entry per channel (dtype, shape, file)
+# 	- <channel>.col: the raw channel values, one contiguous C-ordered array per file
+# 	- data.bin: the original pickle recorded by the CanSat (kept as source)
+# 	- metrics.json and <channel>.col: the derived channels (scripts/metrics.py), flight events and phases statistics
+
+FORMAT_VERSION = 1
+HEADER_NAME = "header.json"
+PICKLE_NAME = "data.bin"
+CHANNEL_EXTENSION = ".col"
+METRICS_NAME = "metrics.json"
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+class Dataset:
+
+
+	def __init__(self, path):
+
+		self.path = path
+		self.channels = {}
+
+		with open(os.path.join(path, HEADER_NAME), "r", encoding = "utf-8") as file:
+
+			self.header = json.load(file)
+			stat = os.fstat(file.fileno())
+			file.close()
+
+		self.header_version = f"{stat.st_mtime_ns}-{stat.st_size}"
+		self.metrics = self.load_metrics()
+
+		# Changes each time the data set is written again (or its metrics computed differently)
+		self.version = self.header_version if self.metrics is None else self.metrics["source"]
+
+		# The derived channels are read like the recorded ones
+		if self.metrics is not None:
+
+			self.header = dict(self.header, channels = dict(self.header["channels"], **self.metrics["channels"]))
+
+		return
+
+
+	def __str__(self):
+
+		return "Dataset class"
+
+
+	def __contains__(self, channel):
+
+		return channel in self.header["channels"]
+
+
+	def __getitem__(self, channel):
+
+		# Channels are only mapped the first time a view asks for them
+		if channel not in self.channels:
+
+			self.channels[channel] = self.open_channel(channel)
+
+		return self.channels[channel]
+
+
+	def __len__(self):
+
+		return self.header["length"]
+
+
+	def keys(self):
+
+		return self.header["channels"].keys()
+
+
+	def get(self, channel, default = None):
+
+		if channel not in self:
+
+			return default
+
+		return self[channel]
+
+
+	# The metrics computed for this version of the data set, None if they are missing or outdated
+	def load_metrics(self):
+
+		try:
+
+			with open(os.path.join(self.path, METRICS_NAME), "r", encoding = "utf-8") as file:
+
+				metrics = json.load(file)
+				file.close()
+
+		except (FileNotFoundError, ValueError):
+
+			return None
+
+		if metrics.get("source") != self.metrics_source():
+
+			return None
+
+		return metrics
+
+
+	def metrics_source(self):
+
+		return f"{self.header_version}-{METRICS_VERSION}"
+
+
+	def open_channel(self, channel):
+
+		info = self.header["channels"][channel]
+		dtype = np.dtype(info["dtype"])
+		shape = tuple(info["shape"])
+
+		# numpy can't map an empty file
+		if 0 in shape:
+
+			return np.empty(shape, dtype = dtype)
+
+		return np.memmap(os.path.join(self.path, info["file"]), dtype = dtype, mode = "r", shape = shape)
+
+
+	@property
+	def sample_rate(self):
+
+		return self.header["sampleRate"]
+
+
+	@property
+	def nbytes(self):
+
+		size = 0
+
+		for info in self.header["channels"].values():
+
+			size += int(np.prod(info["shape"])) * np.dtype(info["dtype"]).itemsize
+
+		return size
+
+
+# Write each channel of data (dict of arrays) in its own file then write the header
+# The header is replaced last so a reader never sees a partially written dataset
+def write_dataset(path, data, sample_rate):
+
+	channels = {}
+	length = 0
+
+	for name, values in data.items():
+
+		array = np.ascontiguousarray(values)
+		channels[str(name)] = write_channel(path, str(name), array)
+
+		if array.ndim > 0:
+
+			length = max(length, array.shape[0])
+
+	header = {
+		"version": FORMAT_VERSION,
+		"sampleRate": sample_rate,
+		"length": length,
+		"channels": channels
+	}
+
+	write_header(path, header)
+
+	return header
+
+
+# Temporary file written then renamed to path
+# Two server workers (or two threads building manifests) might write the same data set: each one gets its own file
+def temporary_path(path):
+
+	return f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+
+# Write a channel file (replaced at once) and return its header entry
+def write_channel(path, name, array):
+
+	file_name = name + CHANNEL_EXTENSION
+	tmp_path = temporary_path(os.path.join(path, file_name))
+
+	with open(tmp_path, "wb") as file:
+
+		array.tofile(file)
+		file.close()
+
+	os.replace(tmp_path, os.path.join(path, file_name))
+
+	return {
+		"dtype": array.dtype.str,
+		"shape": list(array.shape),
+		"file": file_name
+	}
+
+
+# Compute the metrics of a data set and write them in its folder, the channels first
+def write_metrics(dataset, period):
+
+	metrics = compute_metrics(dataset, period)
+	channels = {name: write_channel(dataset.path, name, values) for name, values in metrics["channels"].items()}
+
+	tmp_path = temporary_path(os.path.join(dataset.path, METRICS_NAME))
+
+	with open(tmp_path, "w", encoding = "utf-8") as file:
+
+		json.dump({
+			"source": dataset.metrics_source(),
+			"channels": channels,
+			"events": metrics["events"],
+			"phases": metrics["phases"]
+		}, file, indent = "\t")
+		file.close()
+
+	os.replace(tmp_path, os.path.join(dataset.path, METRICS_NAME))
+
+	return
+
+
+def write_header(path, header):
+
+	tmp_path = temporary_path(os.path.join(path, HEADER_NAME))
+
+	with open(tmp_path, "w", encoding = "utf-8") as file:
+
+		json.dump(header, file, indent = "\t")
+		file.close()
+
+	os.replace(tmp_path, os.path.join(path, HEADER_NAME))
+
+	return
+
+
+# Data set written while it is recorded: the rows are appended at the end of the channel files
+# 	- channels: {channel: (dtype, row shape)}, a missing value is written as NaN (0 for integers)
+# 	- the header (length) is replaced after the rows are written, so readers only see whole rows
+class DatasetWriter:
+
+
+	def __init__(self, path, channels, sample_rate, overwrite = False):
+
+		# The channel files are truncated: a recorded data set is only replaced when asked
+		if not overwrite and (os.path.exists(os.path.join(path, HEADER_NAME)) or os.path.exists(os.path.join(path, PICKLE_NAME))):
+
+			raise FileExistsError(f"The data set {path} already exists")
+
+		self.path = path
+		self.channels = {name: (np.dtype(dtype), tuple(shape)) for name, (dtype, shape) in channels.items()}
+		self.sample_rate = sample_rate
+		self.length = 0
+		self.files = {}
+
+		os.makedirs(path, exist_ok = True)
+
+		for name in self.channels:
+
+			self.files[name] = open(os.path.join(path, name + CHANNEL_EXTENSION), "wb")
+
+		self.write_header()
+
+		return
+
+
+	def __str__(self):
+
+		return "DatasetWriter class"
+
+
+	def write_header(self):
+
+		write_header(self.path, {
+			"version": FORMAT_VERSION,
+			"sampleRate": self.sample_rate,
+			"length": self.length,
+			"channels": {
+				name: {"dtype": dtype.str, "shape": [self.length, *shape], "file": name + CHANNEL_EXTENSION}
+				for name, (dtype, shape) in self.channels.items()
+			}
+		})
+
+		return
+
+
+	# rows: list of {channel: value}, nothing is written if a value can't be converted
+	def append(self, rows):
+
+		columns = {}
+
+		for name, (dtype, shape) in self.channels.items():
+
+			missing = np.full(shape, np.nan if dtype.kind == "f" else 0)
+			columns[name] = np.array([missing if row.get(name) is None else row[name] for row in rows], dtype = dtype).reshape(len(rows), *shape)
+
+		for name, values in columns.items():
+
+			self.files[name].write(values.tobytes())
+			self.files[name].flush()
+
+		self.length += len(rows)
+		self.write_header()
+
+		return
+
+
+	def close(self):
+
+		for file in self.files.values():
+
+			file.close()
+
+		return
+
+
+# Name of a new data set: the number following the last one
+def next_data_set(root_path):
+
+	data_sets = [int(name) for name in os.listdir(root_path) if name.isdigit()]
+
+	return str(max(data_sets, default = -1) + 1)
+
+
+# Convert the data.bin pickle of a dataset folder to the columnar format
+def convert_pickle(path, sample_rate):
+
+	with open(os.path.join(path, PICKLE_NAME), "rb") as file:
+
+		data = pickle.load(file)
+		file.close()
+
+	return write_dataset(path, data, sample_rate)
+
+
+# Open a dataset folder, converting data.bin first if the columnar files are missing or outdated
+# and computing the metrics if they are missing or outdated
+def open_dataset(path, sample_rate):
+
+	header_path = os.path.join(path, HEADER_NAME)
+	pickle_path = os.path.join(path, PICKLE_NAME)
+
+	if os.path.exists(pickle_path):
+
+		if not os.path.exists(header_path) or os.path.getmtime(pickle_path) > os.path.getmtime(header_path):
+
+			convert_pickle(path, sample_rate)
+
+	dataset = Dataset(path)
+
+	if dataset.metrics is None:
+
+		write_metrics(dataset, 1 / sample_rate)
+		dataset = Dataset(path)
+
+	return dataset
+
+
+# Keep opened data sets resident between requests
+# 	- an entry is revalidated with the mtime and size of data.bin and header.json
+# 	- the least recently used data sets are evicted once max_bytes is exceeded
+class DatasetRegistry:
+
+
+	def __init__(self, debug, root_path, sample_rate, max_bytes):
+
+		self.debug = debug
+		self.root_path = root_path
+		self.sample_rate = sample_rate
+		self.max_bytes = max_bytes
+
+		self.entries = collections.OrderedDict()
+		self.size = 0
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.opening = {}
+		self.lock = threading.Lock()
+
+		return
+
+
+	def __str__(self):
+
+		return "DatasetRegistry class"
+
+
+	def path(self, data_set):
+
+		return os.path.join(self.root_path, str(data_set))
+
+
+	# Files that can change a data set: the CanSat pickle and the columnar header
+	def stamp(self, path):
+
+		stamp = []
+
+		for name in (PICKLE_NAME, HEADER_NAME):
+
+			try:
+
+				stat = os.stat(os.path.join(path, name))
+				stamp.append((stat.st_mtime_ns, stat.st_size))
+
+			except FileNotFoundError:
+
+				stamp.append(None)
+
+		return tuple(stamp)
+
+
+	# Data set of the entry if it is still valid (same stamp), None otherwise
+	def lookup(self, key, stamp):
+
+		with self.lock:
+
+			entry = self.entries.get(key)
+
+			if entry is None or entry[0] != stamp:
+
+				return None
+
+			self.hits += 1
+			self.entries.move_to_end(key)
+
+			return entry[1]
+
+
+	# Converting data.bin and computing the metrics can take seconds: it is done without the registry lock,
+	# so the other data sets are served meanwhile, and only once per data set (the lock of the data set)
+	def get(self, data_set):
+
+		key = str(data_set)
+		path = self.path(key)
+		dataset = self.lookup(key, self.stamp(path))
+
+		if dataset is not None:
+
+			return dataset
+
+		with self.lock:
+
+			opening = self.opening.setdefault(key, threading.Lock())
+
+		with opening:
+
+			# Opened by another thread while this one was waiting
+			dataset = self.lookup(key, self.stamp(path))
+
+			if dataset is not None:
+
+				return dataset
+
+			dataset = open_dataset(path, self.sample_rate)
+
+			with self.lock:
+
+				self.misses += 1
+
+				if key in self.entries:
+
+					self.remove(key)
+
+				# open_dataset might have converted data.bin
+				self.entries[key] = (self.stamp(path), dataset)
+				self.size += dataset.nbytes
+				self.evict()
+
+		if self.debug:
+
+			LOGGER.debug(f"loaded: {key}")
+			LOGGER.debug(f"cache: {self.stats()}")
+
+		return dataset
+
+
+	def remove(self, key):
+
+		stamp, dataset = self.entries.pop(key)
+		self.size -= dataset.nbytes
+
+		return
+
+
+	# Drop least recently used data sets, the most recent one is always kept
+	def evict(self):
+
+		while self.size > self.max_bytes and len(self.entries) > 1:
+
+			self.remove(next(iter(self.entries)))
+			self.evictions += 1
+
+		return
+
+
+	def clear(self):
+
+		with self.lock:
+
+			self.entries.clear()
+			self.size = 0
+
+		return
+
+
+	def stats(self):
+
+		return {
+			"entries": len(self.entries),
+			"bytes": self.size,
+			"maxBytes": self.max_bytes,
+			"hits": self.hits,
+			"misses": self.misses,
+			"evictions": self.evictions
+		}
@@ -0,0 +1,114 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import numpy as np
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Reduce a series to the first and last samples plus the minimum and the maximum of each bucket
+# 	- buckets is usually the width of the chart in pixels: a line drawn with the kept samples
+# 	  covers the same pixels as the full series (the peaks are never smoothed out)
+# 	- returns the kept indices, in increasing order
+def minmax_indices(y, buckets):
+
+	y = np.asarray(y)
+	n = y.shape[0]
+
+	if buckets < 1 or n <= 2 * buckets + 2:
+
+		return np.arange(n)
+
+	size = -(-n // buckets)
+	count = -(-n // size)
+
+	# Pad the last bucket with its last value so every bucket has the same size
+	values = np.empty(count * size, dtype = "float64")
+	values[:n] = y
+	values[n:] = values[n - 1]
+	values = values.reshape(count, size)
+
+	# NaN are replaced so a missing sample doesn't hide the extrema of its bucket
+	missing = np.isnan(values)
+
+	if missing.any():
+
+		low = np.where(missing, np.inf, values).argmin(axis = 1)
+		high = np.where(missing, -np.inf, values).argmax(axis = 1)
+
+	else:
+
+		low = values.argmin(axis = 1)
+		high = values.argmax(axis = 1)
+
+	offsets = np.arange(count) * size
+	indices = np.concatenate(([0, n - 1], low + offsets, high + offsets))
+	indices = np.unique(np.minimum(indices, n - 1))
+
+	return indices
+
+
+def minmax_decimate(x, y, buckets):
+
+	indices = minmax_indices(y, buckets)
+
+	return np.asarray(x)[indices], np.asarray(y)[indices]
+
+
+# Ramer-Douglas-Peucker simplification of a 2D polyline
+# 	- keeps the samples further than tolerance from the simplified line
+# 	- x, y and tolerance must use the same unit
+# 	- returns the kept indices, in increasing order
+def douglas_peucker_indices(x, y, tolerance):
+
+	x = np.asarray(x, dtype = "float64")
+	y = np.asarray(y, dtype = "float64")
+	n = x.shape[0]
+
+	if n < 3:
+
+		return np.arange(n)
+
+	keep = np.zeros(n, dtype = bool)
+	keep[0] = keep[n - 1] = True
+	stack = [(0, n - 1)]
+
+	while stack:
+
+		start, end = stack.pop()
+
+		if end - start < 2:
+
+			continue
+
+		# Distance of every sample between start and end to the [start, end] segment
+		dx = x[end] - x[start]
+		dy = y[end] - y[start]
+		px = x[start + 1:end] - x[start]
+		py = y[start + 1:end] - y[start]
+		length = dx * dx + dy * dy
+
+		if length == 0:
+
+			distances = np.hypot(px, py)
+
+		else:
+
+			t = np.clip((px * dx + py * dy) / length, 0, 1)
+			distances = np.hypot(px - t * dx, py - t * dy)
+
+		i = int(distances.argmax())
+
+		if distances[i] > tolerance:
+
+			index = start + 1 + i
+			keep[index] = True
+			stack.append((start, index))
+			stack.append((index, end))
+
+	return np.flatnonzero(keep)
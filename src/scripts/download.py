@@ -0,0 +1,312 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import posixpath
+import zipfile
+import hashlib
+import logging
+import shutil
+import json
+import time
+import os
+
+from scripts.datasets import PICKLE_NAME, convert_pickle, next_data_set
+from scripts.cansat import CansatError
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+LOGGER = logging.getLogger(__name__)
+
+# <archive>.part: bytes received so far, <archive>.part.json: validator (ETag or Last-Modified), size and checksum of the archive
+PART_EXTENSION = ".part"
+META_EXTENSION = ".part.json"
+
+# Part of the job progress taken by the download, the rest by the unpacking
+DOWNLOAD_PROGRESS = 0.9
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+def read_meta(path):
+
+	try:
+
+		with open(path + META_EXTENSION, "r", encoding = "utf-8") as file:
+
+			meta = json.load(file)
+			file.close()
+
+	except (FileNotFoundError, ValueError):
+
+		return {}
+
+	return meta
+
+
+def write_meta(path, meta):
+
+	with open(path + META_EXTENSION, "w", encoding = "utf-8") as file:
+
+		json.dump(meta, file)
+		file.close()
+
+	return
+
+
+# Hash of the bytes already received (the download goes on from there)
+def hash_part(part_path, offset, chunk_size):
+
+	digest = hashlib.sha256()
+
+	with open(part_path, "rb") as file:
+
+		while file.tell() < offset:
+
+			digest.update(file.read(min(chunk_size, offset - file.tell())))
+
+		file.close()
+
+	return digest
+
+
+# Total size of the archive from a 200 (Content-Length) or 206 (Content-Range: bytes 10-99/100) answer
+def archive_size(response, offset):
+
+	if response.status_code == 206:
+
+		total = response.headers.get("Content-Range", "").rpartition("/")[2]
+
+		return int(total) if total.isdigit() else None
+
+	length = response.headers.get("Content-Length")
+
+	return int(length) + offset if length is not None and length.isdigit() else None
+
+
+# Download the archive of the download endpoint to path, in chunks written as they arrive
+# 	- a dropped connection (or a transfer stopped before the end) goes on with a Range request from the bytes received,
+# 	  If-Range makes the CanSat send the whole archive again if it changed in the meantime
+# 	- the sha256 of the archive is computed while it is written and checked against the checksumHeader answer header
+# 	- retries more than retries times in a row without receiving anything fail the download,
+# 	  the .part files are kept: the next download goes on from there
+# Returns the sha256 of the archive
+def download_archive(client, path, progress = None):
+
+	import requests
+
+	config = client.config["download"]
+	part_path = path + PART_EXTENSION
+	meta = read_meta(path) if os.path.exists(part_path) else {}
+	failures = 0
+
+	# Hash of the first hashed bytes of the part file, kept between the retries
+	digest = None
+	hashed = 0
+
+	while True:
+
+		offset = os.path.getsize(part_path) if os.path.exists(part_path) and "validator" in meta else 0
+		headers = {}
+		received = 0
+
+		if offset > 0:
+
+			headers["Range"] = f"bytes={offset}-"
+			headers["If-Range"] = meta["validator"]
+
+		try:
+
+			try:
+
+				response = client.request("download", stream = True, headers = headers)
+
+			except CansatError as e:
+
+				# The part file is bigger than the archive: download it again
+				if e.status == 416:
+
+					os.remove(part_path)
+					meta = {}
+
+					continue
+
+				raise
+
+			# The CanSat ignored the range or the archive changed
+			if response.status_code != 206:
+
+				offset = 0
+
+			total = archive_size(response, offset)
+			meta = {
+				"validator": response.headers.get("ETag") or response.headers.get("Last-Modified"),
+				"size": total,
+				"checksum": response.headers.get(config["checksumHeader"])
+			}
+			write_meta(path, meta)
+
+			if offset == 0:
+
+				digest = hashlib.sha256()
+
+			elif digest is None or hashed != offset:
+
+				digest = hash_part(part_path, offset, config["chunkSize"])
+
+			hashed = offset
+			start = time.perf_counter()
+
+			with open(part_path, "r+b" if offset > 0 else "wb") as file:
+
+				file.seek(offset)
+				file.truncate()
+
+				for chunk in response.iter_content(chunk_size = config["chunkSize"]):
+
+					file.write(chunk)
+					digest.update(chunk)
+					received += len(chunk)
+					hashed += len(chunk)
+
+					if progress is not None and total:
+
+						progress(DOWNLOAD_PROGRESS * (offset + received) / total)
+
+				file.close()
+
+			response.close()
+
+			if client.debug:
+
+				LOGGER.debug(f"download: {received} bytes from {offset} in {time.perf_counter() - start:.3f}s")
+
+			if total is not None and offset + received < total:
+
+				raise requests.ConnectionError(f"connection closed after {offset + received} of {total} bytes")
+
+			break
+
+		except (CansatError, requests.RequestException) as e:
+
+			# An error answered by the CanSat (other than 5xx) won't change with a retry
+			if isinstance(e, CansatError) and e.status is not None and e.status < 500:
+
+				raise
+
+			# The retries (and the backoff) start again once bytes were received
+			failures = 1 if received > 0 else failures + 1
+
+			if failures > config["retries"]:
+
+				raise CansatError("download", f"{e} (after {config['retries']} retries)")
+
+			delay = client.config["backoff"] * 2 ** (failures - 1)
+			LOGGER.warning(f"download interrupted, going on in {delay:.1f}s: {e}")
+			time.sleep(delay)
+
+	checksum = digest.hexdigest()
+
+	if meta["checksum"] is not None and meta["checksum"].lower() != checksum:
+
+		os.remove(part_path)
+		os.remove(path + META_EXTENSION)
+
+		raise CansatError("download", f"wrong checksum: {checksum}, expected {meta['checksum']}")
+
+	if meta["checksum"] is None:
+
+		LOGGER.warning(f"download: no {config['checksumHeader']} header, the archive checksum ({checksum}) is not checked")
+
+	os.replace(part_path, path)
+	os.remove(path + META_EXTENSION)
+
+	return checksum
+
+
+# Move the recordings of a downloaded archive to new data sets of root_path and convert them
+# 	- each folder of the archive containing a data.bin is a recording, its files are copied to the data set
+# 	- the members are copied in chunks (and their CRC checked), the archive is never read in memory
+# 	- a data set is written in staging_path then moved to root_path, so the views never see a partial one
+# 	- an archive that isn't a zip file is a data.bin
+# Returns the new data sets
+def unpack_archive(archive_path, root_path, staging_path, sample_rate, chunk_size, progress = None):
+
+	os.makedirs(staging_path, exist_ok = True)
+	data_sets = []
+
+	if not zipfile.is_zipfile(archive_path):
+
+		data_set = next_data_set(root_path)
+		path = os.path.join(staging_path, data_set)
+		os.makedirs(path, exist_ok = True)
+		shutil.copyfile(archive_path, os.path.join(path, PICKLE_NAME))
+		convert_pickle(path, sample_rate)
+		os.replace(path, os.path.join(root_path, data_set))
+
+		return [data_set]
+
+	with zipfile.ZipFile(archive_path) as archive:
+
+		members = [member for member in archive.infolist() if not member.is_dir()]
+		folders = sorted({posixpath.dirname(member.filename) for member in members if posixpath.basename(member.filename) == PICKLE_NAME})
+
+		if len(folders) == 0:
+
+			raise ValueError(f"{archive_path}: no {PICKLE_NAME} in the archive")
+
+		for n, folder in enumerate(folders):
+
+			data_set = next_data_set(root_path)
+			path = os.path.join(staging_path, data_set)
+			os.makedirs(path, exist_ok = True)
+
+			for member in members:
+
+				# Only the file name is kept: a member can't be written out of the data set folder
+				if posixpath.dirname(member.filename) == folder:
+
+					with archive.open(member) as source, open(os.path.join(path, posixpath.basename(member.filename)), "wb") as target:
+
+						shutil.copyfileobj(source, target, chunk_size)
+
+			convert_pickle(path, sample_rate)
+			os.replace(path, os.path.join(root_path, data_set))
+			data_sets.append(data_set)
+
+			if progress is not None:
+
+				progress(DOWNLOAD_PROGRESS + (1 - DOWNLOAD_PROGRESS) * (n + 1) / len(folders))
+
+		archive.close()
+
+	return data_sets
+
+
+# Download the recordings of the CanSat and add them to the data sets, returns the new data sets
+def download_data_sets(client, data_path, sample_rate, progress = None):
+
+	staging_path = os.path.join(data_path, "download")
+	archive_path = os.path.join(staging_path, "archive")
+	os.makedirs(staging_path, exist_ok = True)
+
+	start = time.perf_counter()
+	checksum = download_archive(client, archive_path, progress)
+	size = os.path.getsize(archive_path)
+
+	LOGGER.info(f"download: {size} bytes in {time.perf_counter() - start:.3f}s (sha256 {checksum})")
+
+	data_sets = unpack_archive(archive_path, os.path.join(data_path, "normal"), staging_path, sample_rate, client.config["download"]["chunkSize"], progress)
+	os.remove(archive_path)
+
+	LOGGER.info(f"download: new data sets {', '.join(data_sets)}")
+
+	return data_sets
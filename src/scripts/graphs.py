@@ -3,10 +3,27 @@
 # =============================================================================
 
 
-import matplotlib.pyplot as plt
 import numpy as np
+import io
 import json
-import os
+import logging
+
+from scripts.decimation import minmax_decimate
+from scripts.series import prepare_series
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Size of the rendered chart: 8 x 20 inches at 100 dpi (8 x 4 inches for a single panel)
+CHART_WIDTH = 8
+CHART_HEIGHT = 20
+PANEL_HEIGHT = 4
+CHART_DPI = 100
 
 
 # =============================================================================
@@ -36,19 +53,48 @@ class Chart:
 		return "Chart class"
 
 
-	def reload(self, debug, config_path):
+	# output is a file path or a binary file object, the chart is saved as png
+	def draw_chart(self, x_data, y_data, title, x_label, y_label, line_width, output, full_resolution = False, height = CHART_HEIGHT, flights = None):
 
-		self.debug = debug
+		png = self.render_chart(x_data, y_data, title, x_label, y_label, line_width, full_resolution, height, flights)
 
-		with open(config_path, "r", encoding = "utf-8") as file:
+		if isinstance(output, str):
 
-			self.config = json.load(file)
-			file.close()
+			with open(output, "wb") as file:
+
+				file.write(png)
+				file.close()
+
+		else:
+
+			output.write(png)
 
 		return
 
 
-	def draw_chart(self, x_data, y_data, title, x_label, y_label, line_width):
+	# Abscissa and ordinates to plot for one flight: one (X, Y) per ordinate
+	# 	- x_values is None to use the time of each sample, minus offset (s)
+	# 	- unless full_resolution is set, each series is reduced to the min/max of each pixel column
+	def flight_lines(self, x_values, y_values, offset = 0, full_resolution = False):
+
+		X, Ys = prepare_series(x_values, y_values, self.config["recordingFrequency"])
+
+		if x_values is None and offset != 0:
+
+			X = X - offset
+
+		if full_resolution:
+
+			return [(X, Y) for Y in Ys]
+
+		return [minmax_decimate(X, Y, CHART_WIDTH * CHART_DPI) for Y in Ys]
+
+
+	# Render the chart in memory and return the png bytes
+	# Each call uses its own Figure and Agg canvas (no pyplot global state) so charts can be rendered from several threads
+	# Unless full_resolution is set, each series is reduced to the min/max of each pixel column before plotting
+	# flights overlays several data sets: their label and lines (flight_lines, in the order of y_data), each one in its own color
+	def render_chart(self, x_data, y_data, title, x_label, y_label, line_width, full_resolution = False, height = CHART_HEIGHT, flights = None):
 
 		# Creating title if no title given
 		chart_title = title
@@ -85,45 +131,45 @@ class Chart:
 			chart_xlabel += self.language.get_text(x_data[0]["prefix"]) + " (" + self.language.get_text("in") + " " + str(x_data[0]["unit"]) + ")"
 
 
-		if x_data[0]["name"] != "time":
+		if flights is None:
 
-			X = np.array(x_data[0]["values"], dtype="float64")
+			if x_data[0]["name"] != "time":
 
-		else:
+				x_values = x_data[0]["values"]
+
+			else:
 
-			X = []
-			i = 0
-			n = 0
+				x_values = None
 
-			while n < len(y_data[0]["values"]):
+			flights = [{"label": None, "lines": self.flight_lines(x_values, [data["values"] for data in y_data], 0, full_resolution)}]
 
-				X.append(i)
-				n += 1
-				i += 1 * self.config["recordingFrequency"]
 
+		# matplotlib is slow to import, it is only imported by the first chart
+		from matplotlib.figure import Figure
+		from matplotlib.backends.backend_agg import FigureCanvasAgg
 
-		fig, axs = plt.subplots(len(y_data), sharex = True)
-		fig.set_size_inches(8, 20)
+		fig = Figure(figsize = (CHART_WIDTH, height))
+		FigureCanvasAgg(fig)
+		axs = fig.subplots(len(y_data), sharex = True, squeeze = False)[:, 0]
 
 
 		for r, data in enumerate(y_data):
-			
-			y = []
 
-			for i in range(0, len(X) -1, 1):
+			for n, flight in enumerate(flights):
 
-				try:
+				X_plot, Y_plot = flight["lines"][r]
 
-					y.append(data["values"][i])
+				if flight["label"] is None:
 
-				except Exception:
+					color, legend = str(data["color"]), data["legend"]
 
-					y.append(0)
-			
+				else:
+
+					color, legend = f"C{n % 10}", f"{data['legend']} ({self.language.get_text('dataSet')} {flight['label']})"
 
-			Y = np.array(data["values"], dtype="float64")
+				axs[r].plot(X_plot, Y_plot, color = color, marker = data["point"], linestyle = data["line"], linewidth = line_width, label = legend)
 
-			axs[r].plot(X, Y, str(data["color"]), marker = data["point"], linestyle = data["line"], linewidth = line_width)
+			axs[r].legend()
 
 			
 			axs[r].set(xlabel=chart_xlabel, ylabel=self.language.get_text(data["prefix"]) + " (" + self.language.get_text("in") + " " + str(data["unit"]) + ')')
@@ -140,18 +186,21 @@ class Chart:
 
 		if self.debug:
 
-			print("------------------[CHARTS]------------------")
-			print(f"Chart title | {chart_title}")
-			print(f"Chart x_label | {chart_xlabel}")
-			print(f"Chart y_label | {chart_ylabel}")
-			print(f"X values | {x_data}")
-			print(f"Y values | {y_data}")
-			print(f"Line width | {line_width}")
-			print("----------------[END CHARTS]----------------\n")
+			LOGGER.debug(f"title: {chart_title}")
+			LOGGER.debug(f"x label: {chart_xlabel}")
+			LOGGER.debug(f"y label: {chart_ylabel}")
+			LOGGER.debug(f"x values: {[(data['name'], np.shape(data.get('values'))) for data in x_data]}")
+			LOGGER.debug(f"y values: {[(data['name'], np.shape(data.get('values'))) for data in y_data]}")
+			LOGGER.debug(f"line width: {line_width}")
+			LOGGER.debug(f"full resolution: {full_resolution}")
 
 
-		plt.legend()
 		fig.suptitle(chart_title)
-		plt.savefig(os.path.join(self.static_path, "chart.png"), dpi=100)
 
-		return
\ No newline at end of file
+		buffer = io.BytesIO()
+		fig.savefig(buffer, dpi=CHART_DPI, format="png")
+
+		# Release the figure now instead of waiting for the garbage collector
+		fig.clear()
+
+		return buffer.getvalue()
\ No newline at end of file
@@ -0,0 +1,329 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+from concurrent.futures import ProcessPoolExecutor
+import threading
+import time
+import logging
+import os
+
+from scripts.catalog import read_json, write_json
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+LOGGER = logging.getLogger(__name__)
+
+# <directory>/<job_id>.json: state of a job, read by every server worker (the job page can poll any of them)
+# <directory>/<job_id>.lock: created by the worker that queued the job, deleted once it is finished
+JOB_EXTENSION = ".json"
+LOCK_EXTENSION = ".lock"
+
+# Seconds the state of a finished job is kept, and between two deletions of the old ones
+JOB_MAX_AGE = 3600
+PRUNE_INTERVAL = 60
+
+# Seconds between two writes of the progress of a job
+PROGRESS_INTERVAL = 0.25
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Runs in a worker process: gives the job a progress function and returns its result
+# The progress is written in the job file (at most every PROGRESS_INTERVAL seconds), the other fields are kept
+def run_job(function, path, job, args):
+
+	job = dict(job, state = "running")
+	write_json(path, job)
+	last_write = time.monotonic()
+
+	def set_progress(value):
+
+		nonlocal last_write
+
+		job["progress"] = float(value)
+
+		if time.monotonic() - last_write >= PROGRESS_INTERVAL:
+
+			write_json(path, job)
+			last_write = time.monotonic()
+
+		return
+
+	return function(*args, progress = set_progress)
+
+
+# The process that created a lock is still running (not a server worker that was restarted or killed)
+# Without os.kill(pid, 0) (Windows, where it would kill the process), only the locks of this process are alive:
+# the application runs in a single process there
+def process_alive(pid):
+
+	if pid == os.getpid():
+
+		return True
+
+	if os.name == "nt":
+
+		return False
+
+	try:
+
+		os.kill(pid, 0)
+
+	except ProcessLookupError:
+
+		return False
+
+	except PermissionError:
+
+		return True
+
+	return True
+
+
+# Render jobs (charts, maps, videos ...) executed by a pool of processes
+# 	- a job id is the key of its result: submitting a job already queued or running (by any server worker)
+# 	  returns the existing job, the lock file of the job makes sure only one worker queues it
+# 	- workers processes render the jobs, the pool is started by the first job (after the server forked)
+# 	- the state of the jobs is saved in directory: any server worker answers /api/jobs/<job_id>
+# 	- job functions are called with the given args and a progress keyword argument (a function taking a value in [0, 1])
+# 	- on_done(result) is called in this process once the job succeeded
+# 	- finished jobs are deleted after JOB_MAX_AGE seconds
+class JobQueue:
+
+
+	def __init__(self, debug, workers, directory):
+
+		self.debug = debug
+		self.workers = workers
+		self.directory = directory
+		self.futures = {}
+		self.last_prune = 0
+		self.lock = threading.Lock()
+
+		# Created on first use, the processes are only started if a job is submitted
+		self.executor = None
+
+		os.makedirs(directory, exist_ok = True)
+
+		return
+
+
+	def __str__(self):
+
+		return "JobQueue class"
+
+
+	def start(self):
+
+		if self.executor is None:
+
+			self.executor = ProcessPoolExecutor(max_workers = self.workers)
+
+		return
+
+
+	def path(self, job_id, extension = JOB_EXTENSION):
+
+		return os.path.join(self.directory, job_id + extension)
+
+
+	# Create the lock file of a job, False if another living process has it
+	def acquire(self, job_id):
+
+		path = self.path(job_id, LOCK_EXTENSION)
+
+		for attempt in range(2):
+
+			try:
+
+				descriptor = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+
+			except FileExistsError:
+
+				try:
+
+					with open(path, "r", encoding = "utf-8") as file:
+
+						pid = int(file.read() or 0)
+						file.close()
+
+				except (FileNotFoundError, ValueError):
+
+					pid = 0
+
+				if pid != 0 and process_alive(pid):
+
+					return False
+
+				# Left by a process that stopped: the job is queued again
+				try:
+
+					os.remove(path)
+
+				except FileNotFoundError:
+
+					pass
+
+				continue
+
+			os.write(descriptor, str(os.getpid()).encode("utf-8"))
+			os.close(descriptor)
+
+			return True
+
+		return False
+
+
+	def release(self, job_id):
+
+		try:
+
+			os.remove(self.path(job_id, LOCK_EXTENSION))
+
+		except FileNotFoundError:
+
+			pass
+
+		return
+
+
+	def submit(self, job_id, result_url, function, args, on_done = None):
+
+		with self.lock:
+
+			self.prune()
+
+			job = {
+				"id": job_id,
+				"state": "queued",
+				"resultUrl": result_url,
+				"error": None,
+				"progress": 0.0,
+				"submitted": time.time(),
+				"finished": None
+			}
+
+			# Queued by another server worker (its job file can still be being written)
+			if not self.acquire(job_id):
+
+				return self.status(job_id) or job
+
+			write_json(self.path(job_id), job)
+
+			self.start()
+			future = self.executor.submit(run_job, function, self.path(job_id), job, args)
+			self.futures[job_id] = future
+
+		future.add_done_callback(lambda future: self.finish(job, future, on_done))
+
+		if self.debug:
+
+			LOGGER.debug(f"submitted: {job_id} ({function.__name__})")
+
+		return job
+
+
+	def finish(self, job, future, on_done):
+
+		error = future.exception() if not future.cancelled() else "cancelled"
+
+		if error is None and on_done is not None:
+
+			try:
+
+				on_done(future.result())
+
+			except Exception as e:
+
+				error = e
+
+		job = dict(job, finished = time.time())
+
+		if error is None:
+
+			job["state"] = "done"
+			job["progress"] = 1.0
+
+		else:
+
+			job["state"] = "failed"
+			job["error"] = str(error)
+
+		write_json(self.path(job["id"]), job)
+
+		with self.lock:
+
+			self.futures.pop(job["id"], None)
+			self.release(job["id"])
+
+		if self.debug:
+
+			LOGGER.debug(f"{job['id']}: {job['state']} in {job['finished'] - job['submitted']:.3f}s")
+
+		return
+
+
+	# State of a job queued by any server worker, None if there is no such job
+	def status(self, job_id):
+
+		if not job_id.isalnum():
+
+			return None
+
+		return read_json(self.path(job_id))
+
+
+	# Delete the state of the jobs finished more than JOB_MAX_AGE seconds ago (called with the lock held)
+	def prune(self):
+
+		now = time.time()
+
+		if now - self.last_prune < PRUNE_INTERVAL:
+
+			return
+
+		self.last_prune = now
+
+		for entry in os.scandir(self.directory):
+
+			if not entry.name.endswith(JOB_EXTENSION) or entry.name.startswith("."):
+
+				continue
+
+			job = read_json(entry.path)
+
+			if job is not None and job.get("finished") is not None and now - job["finished"] > JOB_MAX_AGE:
+
+				try:
+
+					os.remove(entry.path)
+
+				except FileNotFoundError:
+
+					pass
+
+		return
+
+
+	def shutdown(self):
+
+		if self.executor is not None:
+
+			self.executor.shutdown(wait = False, cancel_futures = True)
+
+		with self.lock:
+
+			for job_id in list(self.futures):
+
+				self.release(job_id)
+
+		return
@@ -0,0 +1,426 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import numpy as np
+import collections
+import itertools
+import threading
+import logging
+import json
+import time
+import os
+
+from scripts.datasets import Dataset, DatasetWriter, HEADER_NAME
+from scripts.cansat import CansatError
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+LOGGER = logging.getLogger(__name__)
+
+# data/live.json: the data set being recorded ({"dataSet": "1", "running": true, "started": 1629813731.2})
+POINTER_NAME = "live.json"
+
+# Seconds since the start of the recording, added to the recorded channels
+TIME_CHANNEL = "time"
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+def read_pointer(data_path):
+
+	try:
+
+		with open(os.path.join(data_path, POINTER_NAME), "r", encoding = "utf-8") as file:
+
+			pointer = json.load(file)
+			file.close()
+
+	except (FileNotFoundError, ValueError):
+
+		return None
+
+	return pointer
+
+
+def write_pointer(data_path, pointer):
+
+	tmp_path = os.path.join(data_path, POINTER_NAME + ".tmp")
+
+	with open(tmp_path, "w", encoding = "utf-8") as file:
+
+		json.dump(pointer, file)
+		file.close()
+
+	os.replace(tmp_path, os.path.join(data_path, POINTER_NAME))
+
+	return
+
+
+# Channels of live.json: "press": "float32" or "therm": ["float16", [8, 8]] -> {channel: (dtype, row shape)}
+def live_channels(config):
+
+	channels = {}
+
+	for name, channel in config["channels"].items():
+
+		if isinstance(channel, str):
+
+			channels[name] = (channel, [])
+
+		else:
+
+			channels[name] = (channel[0], channel[1])
+
+	channels[TIME_CHANNEL] = ("float64", [])
+
+	return channels
+
+
+# Polls the status endpoint of the CanSat every pollInterval seconds and appends the frames to a data set
+# 	- the frame is the status answer (or its frameKey field), one value per channel of live.json
+# 	- a frame with the same timeKey value as the previous one (the CanSat didn't record a new one) is skipped
+# 	- data/live.json points the server workers to the data set while it is recorded
+class TelemetryRecorder:
+
+
+	def __init__(self, debug, client, data_path, data_set, config, sample_rate, overwrite = False):
+
+		self.debug = debug
+		self.client = client
+		self.data_path = data_path
+		self.data_set = str(data_set)
+		self.config = config
+		self.sample_rate = sample_rate
+		self.overwrite = overwrite
+		self.stopped = threading.Event()
+
+		self.frames = 0
+		self.duplicates = 0
+		self.errors = 0
+
+		return
+
+
+	def __str__(self):
+
+		return "TelemetryRecorder class"
+
+
+	def frame(self, status):
+
+		if self.config["frameKey"] is not None:
+
+			status = status.get(self.config["frameKey"]) if isinstance(status, dict) else None
+
+		if not isinstance(status, dict):
+
+			raise ValueError(f"the status is not a telemetry frame: {str(status)[:100]}")
+
+		return status
+
+
+	def run(self):
+
+		channels = live_channels(self.config)
+		writer = DatasetWriter(os.path.join(self.data_path, "normal", self.data_set), channels, self.sample_rate, self.overwrite)
+		write_pointer(self.data_path, {"dataSet": self.data_set, "running": True, "started": time.time()})
+
+		time_key = self.config["timeKey"]
+		interval = self.config["pollInterval"]
+		start = time.monotonic()
+		next_poll = start
+		last_time = None
+		failing = False
+
+		LOGGER.info(f"recording data set {self.data_set} every {interval}s")
+
+		try:
+
+			while not self.stopped.is_set():
+
+				try:
+
+					# Not client.status: its cached answer can be older than the poll interval
+					frame = self.frame(self.client.call("status"))
+					frame_time = frame.get(time_key, time.monotonic() - start) if time_key is not None else time.monotonic() - start
+
+					if last_time is not None and frame_time == last_time:
+
+						self.duplicates += 1
+
+					else:
+
+						row = {name: frame.get(name) for name in channels}
+						row[TIME_CHANNEL] = frame_time
+						writer.append([row])
+						last_time = frame_time
+						self.frames += 1
+
+					if failing:
+
+						LOGGER.info(f"CanSat answering again after {self.errors} failed polls")
+						failing = False
+
+				except (CansatError, ValueError, TypeError) as e:
+
+					self.errors += 1
+
+					# Logged once, the CanSat might be out of range for a while
+					if not failing:
+
+						LOGGER.warning(f"telemetry poll failed: {e}")
+						failing = True
+
+				next_poll += interval
+				delay = next_poll - time.monotonic()
+
+				# A slow answer doesn't make the next polls run late
+				if delay < 0:
+
+					next_poll = time.monotonic()
+					delay = 0
+
+				self.stopped.wait(delay)
+
+		finally:
+
+			writer.close()
+			write_pointer(self.data_path, {"dataSet": self.data_set, "running": False, "started": None})
+
+			LOGGER.info(f"data set {self.data_set} recorded: {self.stats()}")
+
+		return
+
+
+	def stop(self):
+
+		self.stopped.set()
+
+		return
+
+
+	def stats(self):
+
+		return {
+			"frames": self.frames,
+			"duplicates": self.duplicates,
+			"errors": self.errors
+		}
+
+
+# Rows of the data set being recorded, read by each server worker for its live viewers
+# 	- a thread checks data/live.json and the data set header every interval seconds and reads the new rows
+# 	- the last buffer_size rows are kept as json (ring buffer): encoded once, sent to every viewer
+# 	- the viewers wait on a condition, they are woken up as soon as rows are read
+# 	- threads don't survive a fork: the thread starts in the server worker on the first viewer
+class LiveFeed:
+
+
+	def __init__(self, debug, data_path, buffer_size, interval, max_clients):
+
+		self.debug = debug
+		self.data_path = data_path
+		self.interval = interval
+		self.max_clients = max_clients
+
+		self.rows = collections.deque(maxlen = buffer_size)
+		self.data_set = None
+		self.length = 0
+		self.running = False
+		self.stamp = None
+		self.clients = 0
+		self.pid = None
+		self.thread = None
+		self.condition = threading.Condition()
+
+		# The lock might be held by another thread when the process forks
+		os.register_at_fork(after_in_child = self.reset)
+
+		return
+
+
+	def __str__(self):
+
+		return "LiveFeed class"
+
+
+	def reset(self):
+
+		self.condition = threading.Condition()
+		self.pid = None
+		self.clients = 0
+
+		return
+
+
+	def start(self):
+
+		with self.condition:
+
+			if self.pid != os.getpid():
+
+				self.pid = os.getpid()
+				self.thread = threading.Thread(target = self.run, name = "live feed", daemon = True)
+				self.thread.start()
+
+		return
+
+
+	def run(self):
+
+		while True:
+
+			# A data set being written again must not stop the feed
+			try:
+
+				self.check()
+
+			except Exception:
+
+				LOGGER.exception("live feed check failed")
+
+			time.sleep(self.interval)
+
+
+	# Read the rows added to the data set since the last check
+	def check(self):
+
+		pointer = read_pointer(self.data_path)
+
+		if pointer is None:
+
+			return
+
+		data_set = str(pointer["dataSet"])
+		path = os.path.join(self.data_path, "normal", data_set)
+		stat = os.stat(os.path.join(path, HEADER_NAME))
+		stamp = (data_set, pointer["running"], stat.st_mtime_ns, stat.st_size)
+
+		if stamp == self.stamp:
+
+			return
+
+		dataset = Dataset(path)
+		length = self.length if data_set == self.data_set else 0
+
+		# A new viewer gets at most the rows of the buffer
+		start = max(length, len(dataset) - self.rows.maxlen)
+		rows = self.encode(dataset, start, len(dataset))
+
+		with self.condition:
+
+			if data_set != self.data_set:
+
+				self.rows.clear()
+
+				if self.debug:
+
+					LOGGER.debug(f"live data set: {data_set}")
+
+			self.rows.extend(rows)
+			self.data_set = data_set
+			self.length = len(dataset)
+			self.running = pointer["running"]
+			self.stamp = stamp
+			self.condition.notify_all()
+
+		return
+
+
+	# Rows [start, end[ as json objects ({"index": 12, "press": 980.9, ...}), NaN values as null
+	def encode(self, dataset, start, end):
+
+		columns = {}
+		derived = dataset.metrics["channels"] if dataset.metrics is not None else {}
+
+		# The recorded channels only: the metrics of a data set being recorded are computed again by the views
+		for name in dataset.keys():
+
+			if name in derived:
+
+				continue
+
+			values = np.asarray(dataset[name][start:end])
+
+			if values.dtype.kind == "f":
+
+				values = values.astype(np.float64)
+				missing = np.isnan(values)
+				values = values.astype(object)
+				values[missing] = None
+
+			columns[name] = values.tolist()
+
+		return [
+			json.dumps(dict({"index": start + i}, **{name: column[i] for name, column in columns.items()}), separators = (",", ":"))
+			for i in range(end - start)
+		]
+
+
+	# A worker accepts at most max_clients live streams: each one holds a server thread (see the LiveFeed of main.py)
+	def connect(self):
+
+		self.start()
+
+		with self.condition:
+
+			if self.clients >= self.max_clients:
+
+				return False
+
+			self.clients += 1
+
+		return True
+
+
+	def disconnect(self):
+
+		with self.condition:
+
+			self.clients -= 1
+
+		return
+
+
+	# Waits up to timeout seconds for rows after index or a new recording state (what the viewer has seen)
+	# Returns the data set, the index of the first row, the json rows and the recording state
+	# 	- a viewer of another data set gets the rows of the buffer (a new recording started)
+	# 	- a viewer behind the buffer gets the rows of the buffer
+	def wait(self, data_set, index, running, timeout):
+
+		with self.condition:
+
+			self.condition.wait_for(lambda: self.data_set is not None and (self.data_set != data_set or self.length > index or self.running != running), timeout)
+
+			if self.data_set != data_set:
+
+				index = 0
+
+			first = self.length - len(self.rows)
+			index = max(index, first)
+			rows = list(itertools.islice(self.rows, index - first, None))
+
+			return self.data_set, index, rows, self.running
+
+
+	def stats(self):
+
+		with self.condition:
+
+			return {
+				"dataSet": self.data_set,
+				"running": self.running,
+				"length": self.length,
+				"bufferedRows": len(self.rows),
+				"clients": self.clients,
+				"maxClients": self.max_clients
+			}
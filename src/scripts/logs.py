@@ -0,0 +1,374 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import threading
+import datetime
+import logging
+import atexit
+import queue
+import copy
+import json
+import time
+import sys
+import os
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+# logs/webapp/Aug-24-2021.txt
+FILE_NAME_FORMAT = "%b-%d-%Y.txt"
+CONSOLE_FORMAT = "%(asctime)s %(levelname)s %(name)s | %(message)s"
+
+# Records waiting to be written, the next ones are dropped (and counted) until the writer catches up
+MAX_RECORDS = 10000
+
+# Records written between two flushes
+BATCH_SIZE = 500
+
+# Record attributes (extra or set by a filter) added to the json lines
+EXTRA_FIELDS = ["requestId", "method", "path", "status", "latencyMs"]
+
+# Loggers of the application and its scripts: only their debug traces are written (not the ones of matplotlib, PIL ...)
+APP_LOGGERS = ["webapp", "scripts"]
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# One json object per line: time, level, logger, message, the extra fields set and the exception
+class JsonFormatter(logging.Formatter):
+
+
+	def __str__(self):
+
+		return "JsonFormatter class"
+
+
+	def format(self, record):
+
+		data = {
+			"time": datetime.datetime.fromtimestamp(record.created).isoformat(timespec = "milliseconds"),
+			"level": record.levelname,
+			"logger": record.name,
+			"message": record.getMessage()
+		}
+
+		for field in EXTRA_FIELDS:
+
+			value = getattr(record, field, None)
+
+			if value is not None:
+
+				data[field] = value
+
+		if record.exc_info and not record.exc_text:
+
+			record.exc_text = self.formatException(record.exc_info)
+
+		if record.exc_text:
+
+			data["exception"] = record.exc_text
+
+		return json.dumps(data, ensure_ascii = False, default = str)
+
+
+# Writes the records in <directory>/<date>.txt, a new file is opened when the date of the records changes
+# Records are only flushed by flush (once per batch)
+class DailyFileHandler(logging.Handler):
+
+
+	def __init__(self, directory):
+
+		super().__init__()
+
+		self.directory = directory
+		self.file_name = None
+		self.file = None
+
+		os.makedirs(directory, exist_ok = True)
+
+		return
+
+
+	def __str__(self):
+
+		return "DailyFileHandler class"
+
+
+	def emit(self, record):
+
+		file_name = time.strftime(FILE_NAME_FORMAT, time.localtime(record.created))
+
+		if file_name != self.file_name:
+
+			self.close_file()
+			self.file = open(os.path.join(self.directory, file_name), "a", encoding = "utf-8")
+			self.file_name = file_name
+
+		self.file.write(self.format(record) + "\n")
+
+		return
+
+
+	def flush(self):
+
+		if self.file is not None:
+
+			self.file.flush()
+
+		return
+
+
+	def close_file(self):
+
+		if self.file is not None:
+
+			self.file.close()
+			self.file = None
+			self.file_name = None
+
+		return
+
+
+	def close(self):
+
+		self.close_file()
+		super().close()
+
+		return
+
+
+# Same as logging.StreamHandler, but the stream is only flushed by flush (once per batch)
+class StreamHandler(logging.StreamHandler):
+
+
+	def __str__(self):
+
+		return "StreamHandler class"
+
+
+	def emit(self, record):
+
+		self.stream.write(self.format(record) + self.terminator)
+
+		return
+
+
+# Background thread writing the records to its handlers by batches
+# 	- put never blocks: above max_records waiting records, the new ones are dropped and counted
+# 	- threads don't survive a fork: the writer starts again in a forked process (server worker, job process) on its first record
+class LogWriter:
+
+
+	def __init__(self, handlers, max_records = MAX_RECORDS, batch_size = BATCH_SIZE):
+
+		self.handlers = handlers
+		self.max_records = max_records
+		self.batch_size = batch_size
+		self.pid = None
+		self.queue = None
+		self.thread = None
+		self.dropped = 0
+		self.lock = threading.Lock()
+
+		# The lock might be held by another thread when the process forks
+		os.register_at_fork(after_in_child = self.reset)
+
+		return
+
+
+	def __str__(self):
+
+		return "LogWriter class"
+
+
+	def reset(self):
+
+		self.lock = threading.Lock()
+		self.pid = None
+
+		return
+
+
+	def start(self):
+
+		with self.lock:
+
+			if self.pid != os.getpid():
+
+				self.pid = os.getpid()
+				self.queue = queue.Queue(self.max_records)
+				self.dropped = 0
+				self.thread = threading.Thread(target = self.run, args = (self.queue,), name = "log writer", daemon = True)
+				self.thread.start()
+
+		return
+
+
+	def put(self, record):
+
+		if self.pid != os.getpid():
+
+			self.start()
+
+		try:
+
+			self.queue.put_nowait(record)
+
+		except queue.Full:
+
+			self.dropped += 1
+
+		return
+
+
+	# None in the queue stops the thread once the previous records are written
+	def run(self, records):
+
+		running = True
+
+		while running:
+
+			batch = [records.get()]
+
+			while batch[-1] is not None and len(batch) < self.batch_size:
+
+				try:
+
+					batch.append(records.get_nowait())
+
+				except queue.Empty:
+
+					break
+
+			if batch[-1] is None:
+
+				running = False
+				batch.pop()
+
+			self.write(batch)
+
+		return
+
+
+	def write(self, batch):
+
+		if self.dropped > 0:
+
+			dropped, self.dropped = self.dropped, 0
+			batch.append(logging.makeLogRecord({
+				"name": __name__,
+				"levelno": logging.WARNING,
+				"levelname": "WARNING",
+				"msg": f"{dropped} log records dropped (more than {self.max_records} records waiting)"
+				}))
+
+		for handler in self.handlers:
+
+			for record in batch:
+
+				if record.levelno >= handler.level:
+
+					handler.handle(record)
+
+			handler.flush()
+
+		return
+
+
+	# Write the waiting records (called at exit)
+	def stop(self):
+
+		if self.pid == os.getpid() and self.thread.is_alive():
+
+			self.queue.put(None)
+			self.thread.join(timeout = 5)
+
+		return
+
+
+# Handler of the loggers: sends the records to the writer thread
+class QueueHandler(logging.Handler):
+
+
+	def __init__(self, writer):
+
+		super().__init__()
+
+		self.writer = writer
+
+		return
+
+
+	def __str__(self):
+
+		return "QueueHandler class"
+
+
+	# The message and the exception are formatted now, the record is written later by another thread
+	def prepare(self, record):
+
+		message = record.getMessage()
+
+		if record.exc_info and not record.exc_text:
+
+			record.exc_text = logging.Formatter().formatException(record.exc_info)
+
+		record = copy.copy(record)
+		record.msg = message
+		record.args = None
+		record.exc_info = None
+
+		return record
+
+
+	def emit(self, record):
+
+		try:
+
+			self.writer.put(self.prepare(record))
+
+		except Exception:
+
+			self.handleError(record)
+
+		return
+
+
+# Logs of the application: json lines in directory (level INFO and above) and text on the standard output
+# Returns the handler added to the root logger (to add filters)
+def setup_logging(directory, level = logging.INFO):
+
+	file_handler = DailyFileHandler(directory)
+	file_handler.setLevel(logging.INFO)
+	file_handler.setFormatter(JsonFormatter())
+
+	console_handler = StreamHandler(sys.stdout)
+	console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+
+	writer = LogWriter([file_handler, console_handler])
+	handler = QueueHandler(writer)
+
+	root = logging.getLogger()
+	root.addHandler(handler)
+	root.setLevel(level)
+
+	atexit.register(writer.stop)
+
+	return handler
+
+
+def set_debug(debug):
+
+	for name in APP_LOGGERS:
+
+		logging.getLogger(name).setLevel(logging.DEBUG if debug else logging.INFO)
+
+	return
@@ -3,9 +3,27 @@
 # =============================================================================
 
 
-import folium
-import os
+import numpy as np
 import json
+import logging
+
+from scripts.series import prepare_track
+from scripts.decimation import douglas_peucker_indices
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Approximate length of one degree (in meters)
+METERS_PER_LATITUDE_DEGREE = 110540
+METERS_PER_LONGITUDE_DEGREE = 111320
+
+# Coordinates precision written in the map (6 decimals ~ 10 cm)
+COORDINATES_DECIMALS = 6
 
 
 # =============================================================================
@@ -13,12 +31,29 @@ import json
 # =============================================================================
 
 
+# Fixes of a track (the samples without latitude or longitude are dropped) and the index of the sample of each fix
+def track_fixes(latitude, longitude, altitude = None):
+
+	samples = np.arange(min(np.shape(latitude)[0], np.shape(longitude)[0]))
+
+	if altitude is None:
+
+		latitude, longitude, samples = prepare_track(latitude, longitude, samples)
+
+	else:
+
+		latitude, longitude, altitude, samples = prepare_track(latitude, longitude, altitude, samples)
+
+	return latitude, longitude, altitude, samples
+
+
 class Map:
 
 
-	def __init__(self, debug, tiles_file):
+	def __init__(self, debug, tiles_file, language):
 
 		self.debug = debug
+		self.language = language
 
 		with open(tiles_file, 'r', encoding = "utf-8") as file:
 
@@ -33,50 +68,128 @@ class Map:
 		return "Map class"
 
 
-	def reload(self, debug, tiles_file):
+	# mode:
+	# 	- "track": simplified trajectory, clustered fixes and icons on launch, apogee and landing
+	# 	- "markers": one icon per GPS fix
+	# output is a file path or a binary file object, the map is saved as html
+	# tiles_url is the url template of the local tile server, None to only use online tiles
+	# events gives the sample index of the flight events (metrics of the data set), None to only show launch, apogee and landing
+	# bounds is the bounding box of the fixes (gps of the data set manifest), the map is centered on it (on the first fix without it)
+	def create_map(self, latitude, longitude, title, icon, color, zoom_start, output, mode = "track", altitude = None, tiles_url = None, events = None, bounds = None):
 
-		self.debug = debug
+		# folium is slow to import, it is only imported by the first map
+		import folium
 
-		with open(tiles_file, 'r', encoding = "utf-8") as file:
+		# Drop the fixes without latitude or longitude, samples is the index of the sample of each fix
+		latitude, longitude, altitude, samples = track_fixes(latitude, longitude, altitude)
 
-			self.tiles = json.load(file)
-			file.close()
-
-		return
+		if bounds is None:
 
+			location = [float(latitude[0]), float(longitude[0])]
 
+		else:
 
-	def create_map(self, latitude, longitude, title, icon, color, zoom_start, map_destination):
+			location = [(bounds["south"] + bounds["north"]) / 2, (bounds["west"] + bounds["east"]) / 2]
 
-		# create map base
-		m = folium.Map(location = [latitude[0], longitude[0]], zoom_start = zoom_start, title = title, control_scale=True)
+		m = self.base_map(location, title, zoom_start, tiles_url)
 
 		if self.debug:
 
-			print("-----------------[MAP]-----------------")
-			print(f"MAP | latitude: {str(latitude)}")
-			print(f"MAP | longitude: {str(longitude)}")
-			print(f"MAP | title: {str(title)}")
-			print(f"MAP | icon: {str(icon)}")
-			print(f"MAP | color: {str(color)}")
-			print(f"MAP | zoom start: {str(zoom_start)}")
-			print(f"MAP | map destination: {str(map_destination)}")
-			print("---------------[END MAP]---------------\n")
+			LOGGER.debug(f"latitude: {str(latitude)}")
+			LOGGER.debug(f"longitude: {str(longitude)}")
+			LOGGER.debug(f"title: {str(title)}")
+			LOGGER.debug(f"icon: {str(icon)}")
+			LOGGER.debug(f"color: {str(color)}")
+			LOGGER.debug(f"zoom start: {str(zoom_start)}")
+			LOGGER.debug(f"mode: {str(mode)}")
+			LOGGER.debug(f"tiles url: {str(tiles_url)}")
+			LOGGER.debug(f"output: {str(output)}")
 
 
-		# Add cansat recorded coordonates markers
-		for i in range(0, len(latitude) - 1):
+		if mode == "markers":
 
-			try:
+			# Add cansat recorded coordonates markers
+			for i in range(0, len(latitude)):
 
 				folium.Marker(
-				    location=[latitude[i], longitude[i]],
+				    location=[float(latitude[i]), float(longitude[i])],
 				    icon = folium.Icon(color=color, icon=icon),
 				).add_to(m)
 
-			except Exception as e:
+		else:
+
+			self.add_track(m, latitude, longitude, altitude, icon, color, events, samples)
+
+		self.save_map(m, output)
+
+		return
+
+
+	# Overlay of several flights: flights gives for each one its label (the data set) and its fixes (track_fixes) and events
+	# Each flight is a layer in its own color (comparisonColors of maps.json), the map is centered on bounds
+	def create_comparison_map(self, flights, title, icon, zoom_start, output, mode = "track", tiles_url = None, bounds = None):
+
+		import folium
+
+		m = self.base_map([(bounds["south"] + bounds["north"]) / 2, (bounds["west"] + bounds["east"]) / 2], title, zoom_start, tiles_url)
+		colors = self.tiles["comparisonColors"]
+
+		for n, flight in enumerate(flights):
+
+			color = colors[n % len(colors)]
+			layer = folium.FeatureGroup(name = f"{self.language.get_text('dataSet')} {flight['label']}").add_to(m)
+
+			if len(flight["latitude"]) == 0:
+
+				continue
 
-				break
+			if mode == "markers":
+
+				for i in range(0, len(flight["latitude"])):
+
+					folium.Marker(
+						location = [float(flight["latitude"][i]), float(flight["longitude"][i])],
+						icon = folium.Icon(color = color, icon = icon),
+					).add_to(layer)
+
+			else:
+
+				self.add_track(layer, flight["latitude"], flight["longitude"], flight["altitude"], icon, color, flight["events"], flight["samples"], color)
+
+		self.save_map(m, output)
+
+		return
+
+
+	# create map base
+	def base_map(self, location, title, zoom_start, tiles_url):
+
+		import folium
+
+		if tiles_url is None:
+
+			m = folium.Map(location = location, zoom_start = zoom_start, title = title, control_scale=True)
+
+		else:
+
+			# The offline tiles are the default layer, online tiles can still be selected
+			m = folium.Map(location = location, zoom_start = zoom_start, title = title, control_scale=True, tiles = None)
+
+			folium.TileLayer(
+				tiles = tiles_url,
+				attr = self.tiles["offlineTiles"]["attribution"],
+				name = self.tiles["offlineTiles"]["name"],
+				min_zoom = min(self.tiles["offlineTiles"]["zoomLevels"]),
+				max_zoom = max(self.tiles["offlineTiles"]["zoomLevels"])
+			).add_to(m)
+
+		return m
+
+
+	# Add the online tiles and the layers control, then save the map
+	def save_map(self, m, output):
+
+		import folium
 
 		# Add map tiles
 
@@ -92,9 +205,57 @@ class Map:
 
 		folium.LayerControl().add_to(m)
 
-		# Save map and store it to static/result folder
-		m.save(os.path.join(map_destination, "map.html"))
+		m.save(output, close_file = False)
 
 		return
 
-		
\ No newline at end of file
+
+	# The trajectory is one polyline simplified with Douglas-Peucker (tolerance in meters, maps.json),
+	# the fixes are clustered and drawn by the browser from a single coordinates array
+	# m is the map or one of its layers, track_color replaces the trackColor of maps.json
+	def add_track(self, m, latitude, longitude, altitude, icon, color, events = None, samples = None, track_color = None):
+
+		import folium
+		from folium.plugins import FastMarkerCluster
+
+		# Local projection in meters around the first fix
+		x = (longitude - longitude[0]) * np.cos(np.radians(latitude[0])) * METERS_PER_LONGITUDE_DEGREE
+		y = (latitude - latitude[0]) * METERS_PER_LATITUDE_DEGREE
+		indices = douglas_peucker_indices(x, y, self.tiles["trackTolerance"])
+
+		track = np.round(np.column_stack((latitude, longitude)), COORDINATES_DECIMALS)
+
+		folium.PolyLine(
+			track[indices].tolist(),
+			color = track_color or self.tiles["trackColor"],
+			weight = 3
+		).add_to(m)
+
+		FastMarkerCluster(
+			track.tolist(),
+			name = self.language.get_text("mapFixes")
+		).add_to(m)
+
+		# Icons on key events only, on the first fix recorded from the event
+		if events:
+
+			fixes = np.minimum(np.searchsorted(samples, list(events.values())), len(latitude) - 1)
+			events = list(zip(events.keys(), fixes.tolist()))
+
+		else:
+
+			events = [("launch", 0), ("landing", len(latitude) - 1)]
+
+			if altitude is not None and np.isfinite(altitude).any():
+
+				events.insert(1, ("apogee", int(np.nanargmax(altitude))))
+
+		for event, i in events:
+
+			folium.Marker(
+				location = track[i].tolist(),
+				tooltip = self.language.get_text(event),
+				icon = folium.Icon(color=color, icon=icon),
+			).add_to(m)
+
+		return
@@ -0,0 +1,262 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import numpy as np
+
+from scripts.series import align
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+# Part of the metrics cache key: change it when the computations change
+METRICS_VERSION = 1
+
+# Samples recorded on the ground before the launch (ground pressure and altitude)
+GROUND_SAMPLES = 10
+
+# Width (in seconds) of the moving average applied to the altitude before it is derived
+SMOOTHING = 1.0
+
+# Height above the ground (m) of the launch and the landing
+LAUNCH_HEIGHT = 5.0
+
+# Descent rate (m/s) starting the drop after the apogee
+DROP_RATE = 3.0
+
+# International barometric formula: h = 44330 * (1 - (p / p0) ^ (1 / 5.255))
+BAROMETRIC_SCALE = 44330.0
+BAROMETRIC_EXPONENT = 1 / 5.255
+
+# Channels computed from the recorded ones (float32, one value per sample)
+# 	- baro_alt: altitude above the launch site from the pressure (m)
+# 	- vvel: vertical velocity (m/s), descent_rate: -vvel
+# 	- acc: magnitude of the acceleration (unit of ax, ay and az)
+DERIVED_CHANNELS = ["baro_alt", "vvel", "descent_rate", "acc"]
+
+# Channels of the phases statistics
+STATS_CHANNELS = ["altitude", "vvel", "descent_rate", "acc"]
+
+# Flight events, in the order they happen
+FLIGHT_EVENTS = ["launch", "apogee", "drop", "parachute", "landing"]
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Whether values contain NaN, without a boolean copy of them (a NaN makes the sum NaN)
+def has_nan(values):
+
+	with np.errstate(invalid = "ignore", over = "ignore"):
+
+		return bool(np.isnan(np.sum(values)))
+
+
+# Centered moving average over window samples, NaN samples are left out of the averages
+# The values are padded with zeros so every average is the difference of two slices of the cumulated sums
+def moving_average(values, window):
+
+	length = len(values)
+	before = window // 2
+	after = window - 1 - before
+
+	valid = None if not has_nan(values) else np.isfinite(values)
+	sums = np.zeros(length + window)
+	sums[before + 1:before + 1 + length] = values if valid is None else np.where(valid, values, 0)
+	np.cumsum(sums, out = sums)
+	averages = sums[window:] - sums[:-window]
+
+	if valid is None and window <= length:
+
+		# Only the averages of the first and last samples are over less than window samples
+		averages /= window
+		averages[:before] *= window / np.arange(after + 1, window)
+		averages[length - after:] *= window / np.arange(window - 1, before, -1)
+
+		return averages
+
+	if valid is None:
+
+		valid = np.ones(length, dtype = bool)
+
+	counts = np.zeros(length + window, dtype = np.int32)
+	counts[before + 1:before + 1 + length] = valid
+	np.cumsum(counts, out = counts)
+
+	with np.errstate(invalid = "ignore", divide = "ignore"):
+
+		averages /= counts[window:] - counts[:-window]
+
+	return averages
+
+
+# Computed in the dtype of pressure (float32 is precise to the millimeter at 1000m)
+def barometric_altitude(pressure, ground_pressure):
+
+	altitude = pressure / pressure.dtype.type(ground_pressure)
+	np.power(altitude, pressure.dtype.type(BAROMETRIC_EXPONENT), out = altitude)
+	np.subtract(1, altitude, out = altitude)
+	altitude *= BAROMETRIC_SCALE
+
+	return altitude
+
+
+# Indices of the flight events in the smoothed altitude (m) and the vertical velocity (m/s), none if the CanSat didn't fly
+# 	- launch: last sample on the ground before the apogee
+# 	- apogee: highest sample
+# 	- drop: first sample falling faster than DROP_RATE after the apogee
+# 	- parachute: fastest fall between the drop and the landing (the parachute slows the fall down from there)
+# 	- landing: first sample back on the ground after the apogee (or the last sample)
+def flight_events(altitude, vvel):
+
+	if has_nan(altitude) and np.isnan(altitude).all():
+
+		return {}
+
+	ground = np.nanmedian(altitude[:GROUND_SAMPLES])
+	apogee = int(np.nanargmax(altitude) if has_nan(altitude) else np.argmax(altitude))
+
+	with np.errstate(invalid = "ignore"):
+
+		above = altitude > ground + LAUNCH_HEIGHT
+		falling = -vvel[apogee:] > DROP_RATE
+
+	# Recorded on the ground only
+	if not above[apogee]:
+
+		return {}
+
+	# Last sample on the ground before the apogee (the first False of the reversed samples)
+	before = above[apogee::-1]
+	launch = apogee - int(np.argmin(before)) if not before.all() else 0
+
+	after = above[apogee:]
+	landing = apogee + int(np.argmin(after)) if not after.all() else len(altitude) - 1
+
+	drop = apogee + int(np.argmax(falling)) if falling.any() else apogee
+	drop = min(drop, landing)
+
+	descent_rate = -vvel[drop:landing + 1]
+	parachute = drop + int(np.nanargmax(descent_rate)) if np.isfinite(descent_rate).any() else drop
+
+	return {
+		"launch": launch,
+		"apogee": apogee,
+		"drop": drop,
+		"parachute": parachute,
+		"landing": landing
+	}
+
+
+# Start, end, duration and min / max / mean of each channel for each phase of the flight (times: seconds of each event)
+def phase_stats(events, times, channels):
+
+	bounds = {
+		"ascent": ("launch", "apogee"),
+		"drop": ("drop", "parachute"),
+		"descent": ("parachute", "landing")
+	}
+	phases = {}
+
+	for phase, (first, last) in bounds.items():
+
+		if first not in events:
+
+			continue
+
+		start, end = events[first], events[last]
+		stats = {
+			"start": start,
+			"end": end,
+			"startTime": float(times[first]),
+			"duration": float(times[last] - times[first])
+		}
+
+		for name, values in channels.items():
+
+			values = values[start:end + 1]
+
+			# The nan* functions copy the values, only needed if there are NaN
+			if not has_nan(values):
+
+				stats[name] = {
+					"min": float(np.min(values)),
+					"max": float(np.max(values)),
+					"mean": float(np.mean(values))
+				}
+
+			elif not np.isnan(values).all():
+
+				stats[name] = {
+					"min": float(np.nanmin(values)),
+					"max": float(np.nanmax(values)),
+					"mean": float(np.nanmean(values))
+				}
+
+		phases[phase] = stats
+
+	return phases
+
+
+# Derived channels, flight events and phases statistics of a data set (period: seconds between two samples)
+# Every channel is computed for all the samples at once: the cost grows linearly with the flight length
+def compute_metrics(data, period):
+
+	length = len(data)
+
+	# Recorded time of each sample (live recordings), otherwise the samples are period seconds apart
+	time = align(data["time"], length) if "time" in data else None
+	channels = {}
+	altitude = None
+
+	if "press" in data:
+
+		pressure = align(data["press"], length, "float32")
+		altitude = barometric_altitude(pressure, np.nanmedian(pressure[:GROUND_SAMPLES]))
+		channels["baro_alt"] = altitude
+
+	elif "alt" in data:
+
+		altitude = align(data["alt"], length, "float32")
+
+	events = {}
+	stats_channels = {}
+
+	if altitude is not None and length > 1:
+
+		window = max(1, int(round(SMOOTHING / period)))
+		smoothed = moving_average(altitude, window)
+
+		# A scalar spacing avoids the (much slower) gradient over a coordinates array
+		# The smoothed altitude stays float64: the float32 rounding over a few samples would be m/s
+		vvel = np.gradient(smoothed, period if time is None else time).astype(np.float32)
+		descent_rate = np.negative(vvel)
+
+		channels["vvel"] = vvel
+		channels["descent_rate"] = descent_rate
+		events = flight_events(smoothed, vvel)
+		stats_channels.update(altitude = smoothed, vvel = vvel, descent_rate = descent_rate)
+
+	if "ax" in data and "ay" in data and "az" in data:
+
+		acceleration = np.zeros(length, dtype = np.float32)
+		square = np.empty(length, dtype = np.float32)
+
+		for axis in ("ax", "ay", "az"):
+
+			acceleration += np.square(align(data[axis], length, "float32"), out = square)
+
+		channels["acc"] = np.sqrt(acceleration, out = acceleration)
+		stats_channels["acc"] = channels["acc"]
+
+	return {
+		"channels": {name: values.astype(np.float32, copy = False) for name, values in channels.items()},
+		"events": events,
+		"phases": phase_stats(events, {event: index * period if time is None else time[index] for event, index in events.items()}, stats_channels)
+	}
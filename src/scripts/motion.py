@@ -0,0 +1,223 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import collections
+import hashlib
+import logging
+import json
+import time
+import os
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Stages of the pipeline, their time is reported with the frames per second of each one
+# 	- read: decoding the camera video (this process)
+# 	- detect: differencing and annotating the frames (the worker processes, time added over the workers)
+# 	- wait: waiting for the oldest chunk to be processed (this process)
+# 	- write: encoding the annotated video (this process)
+STAGES = ["read", "detect", "wait", "write"]
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Blurred gray frame: the sensor noise and the compression artifacts are not seen as motion
+def prepare_frame(cv, frame, blur):
+
+	return cv.GaussianBlur(cv.cvtColor(frame, cv.COLOR_BGR2GRAY), (blur, blur), 0)
+
+
+# Runs in a worker process: each frame is compared with the one before, the regions that changed are boxed
+# 	- previous is the last frame of the chunk before (None for the first chunk): the chunks overlap by one frame,
+# 	  so the first frame of a chunk is compared like the others
+# 	- the frames are annotated in place (this process has its own copy of the chunk)
+# 	- returns the annotated frames, the number of frames with motion, the number of regions and the time spent
+def detect_chunk(frames, previous, settings):
+
+	import cv2 as cv
+
+	start = time.perf_counter()
+	blur = int(settings["blur"]) // 2 * 2 + 1
+	threshold = int(settings["threshold"])
+	min_area = float(settings["minArea"])
+	color = tuple(int(value) for value in settings["boxColor"][::-1])
+
+	last = prepare_frame(cv, previous, blur) if previous is not None else None
+	moving = 0
+	regions = 0
+
+	for frame in frames:
+
+		gray = prepare_frame(cv, frame, blur)
+
+		if last is not None:
+
+			mask = cv.threshold(cv.absdiff(last, gray), threshold, 255, cv.THRESH_BINARY)[1]
+			mask = cv.dilate(mask, None, iterations = 2)
+			contours = cv.findContours(mask, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)[0]
+			boxes = [cv.boundingRect(contour) for contour in contours if cv.contourArea(contour) >= min_area]
+
+			for x, y, width, height in boxes:
+
+				cv.rectangle(frame, (x, y), (x + width, y + height), color, 2)
+
+			moving += len(boxes) > 0
+			regions += len(boxes)
+
+		last = gray
+
+	return frames, moving, regions, time.perf_counter() - start
+
+
+# Next frames of the video (at most count), an empty list at the end
+def read_chunk(capture, count):
+
+	frames = []
+
+	while len(frames) < count:
+
+		read, frame = capture.read()
+
+		if not read:
+
+			break
+
+		frames.append(frame)
+
+	return frames
+
+
+# What a motion video is made from: the camera video file and the motion settings
+def motion_source(source, settings):
+
+	stat = os.stat(source)
+	digest = hashlib.sha256(json.dumps(settings, sort_keys = True).encode("utf-8")).hexdigest()[:16]
+
+	return f"{stat.st_mtime_ns}-{stat.st_size}-{digest}"
+
+
+# Box the moving regions of the camera video (source) and write the annotated video (output)
+# 	- the video is read as a stream, by chunks of chunkFrames frames, each chunk is processed by one of the
+# 	  worker processes (workers, 0: one per CPU core) while the next ones are read
+# 	- the chunks are written in the order they were read: the oldest one is waited for first
+# 	- at most maxFrames frames are read and not written yet: the memory used doesn't depend on the length of the video
+# 	- progress (optional) is called with the processed fraction after each chunk
+# 	- returns the number of frames, the frames with motion, the regions found, the total time and the time
+# 	  and frames per second of each stage
+def detect_motion(source, output, settings, progress = None, debug = False):
+
+	import cv2 as cv
+
+	capture = cv.VideoCapture(source)
+
+	if not capture.isOpened():
+
+		raise IOError(f"Can't open the video {source}")
+
+	fps = capture.get(cv.CAP_PROP_FPS) or 30.0
+	size = (int(capture.get(cv.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv.CAP_PROP_FRAME_HEIGHT)))
+	expected = int(capture.get(cv.CAP_PROP_FRAME_COUNT))
+
+	writer = cv.VideoWriter(output, cv.VideoWriter_fourcc(*settings["fourcc"]), fps, size)
+
+	if not writer.isOpened():
+
+		capture.release()
+
+		raise IOError(f"Can't open the video writer for {output}")
+
+	chunk_frames = max(1, int(settings["chunkFrames"]))
+	max_chunks = max(1, int(settings["maxFrames"]) // chunk_frames)
+	workers = int(settings["workers"]) or os.cpu_count() or 1
+
+	seconds = dict.fromkeys(STAGES, 0.0)
+	pending = collections.deque()
+	previous = None
+	count = 0
+	moving = 0
+	regions = 0
+	start = time.perf_counter()
+
+	try:
+
+		with ProcessPoolExecutor(max_workers = workers) as executor:
+
+			while True:
+
+				stage_start = time.perf_counter()
+				frames = read_chunk(capture, chunk_frames)
+				seconds["read"] += time.perf_counter() - stage_start
+
+				if len(frames) > 0:
+
+					pending.append(executor.submit(detect_chunk, np.stack(frames), previous, settings))
+					previous = frames[-1]
+
+				# Write the oldest chunk once max_chunks chunks are in flight (all of them at the end of the video)
+				while len(pending) > 0 and (len(pending) >= max_chunks or len(frames) == 0):
+
+					stage_start = time.perf_counter()
+					annotated, chunk_moving, chunk_regions, chunk_seconds = pending.popleft().result()
+					seconds["wait"] += time.perf_counter() - stage_start
+					seconds["detect"] += chunk_seconds
+
+					stage_start = time.perf_counter()
+
+					for frame in annotated:
+
+						writer.write(frame)
+
+					seconds["write"] += time.perf_counter() - stage_start
+
+					count += len(annotated)
+					moving += chunk_moving
+					regions += chunk_regions
+
+					if progress is not None and expected > 0:
+
+						progress(min(count / expected, 1.0))
+
+				if len(frames) == 0:
+
+					break
+
+	finally:
+
+		capture.release()
+		writer.release()
+
+	total = time.perf_counter() - start
+	stats = {
+		"frames": count,
+		"movingFrames": moving,
+		"regions": regions,
+		"workers": workers,
+		"seconds": round(total, 3),
+		"fps": round(count / total, 1) if total > 0 else 0,
+		"stages": {
+			stage: {
+				"seconds": round(seconds[stage], 3),
+				"fps": round(count / seconds[stage], 1) if seconds[stage] > 0 else 0
+			}
+			for stage in STAGES
+		}
+	}
+
+	if debug:
+
+		LOGGER.debug(f"motion video: {output}")
+		LOGGER.debug(f"{count} frames in {stats['seconds']}s ({stats['fps']} frames/s), " + ", ".join(f"{stage} {stats['stages'][stage]['fps']} frames/s" for stage in STAGES))
+
+	return stats
@@ -0,0 +1,302 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import numpy as np
+import threading
+import logging
+import time
+import os
+
+from scripts.catalog import read_json, write_json
+from scripts.datasets import temporary_path
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+LOGGER = logging.getLogger(__name__)
+
+# data/normal/<data_set>/lod/: min / max level of detail pyramid of the channels of a data set
+# 	- <channel>.f32: the levels of the channel one after the other, (min, max) float32 little-endian pairs
+# 	- lod.json: source (version of the data set), factor and the levels of each channel (size of their buckets in samples,
+# 	  number of buckets and first bucket in the file)
+# Level k has buckets of factor ^ (k + 1) samples, levels are added until one has LOD_MIN_BUCKETS buckets or less
+LOD_FOLDER = "lod"
+LOD_INDEX_NAME = "lod.json"
+LOD_EXTENSION = ".f32"
+LOD_FACTOR = 4
+LOD_MIN_BUCKETS = 256
+
+# Part of the pyramid source: change it when the pyramid changes
+LOD_VERSION = 1
+
+# Values sent by a query at most
+MAX_POINTS = 10000
+
+LOD_DTYPE = np.dtype("<f4")
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Min and max of each group of factor buckets (the last group can be shorter), NaN are left out
+# The buckets are compared column by column: factor vectorized passes instead of a reduction per group
+def reduce_buckets(minimums, maximums, factor):
+
+	count = -(-len(minimums) // factor)
+	padding = count * factor - len(minimums)
+
+	if padding > 0:
+
+		minimums = np.concatenate((minimums, np.full(padding, np.nan, dtype = minimums.dtype)))
+		maximums = np.concatenate((maximums, np.full(padding, np.nan, dtype = maximums.dtype)))
+
+	minimums = minimums.reshape(count, factor)
+	maximums = maximums.reshape(count, factor)
+	low = minimums[:, 0].copy()
+	high = maximums[:, 0].copy()
+
+	with np.errstate(invalid = "ignore"):
+
+		for column in range(1, factor):
+
+			np.fmin(low, minimums[:, column], out = low)
+			np.fmax(high, maximums[:, column], out = high)
+
+	return low, high
+
+
+# Channels with one number per sample (the thermal camera frames have no pyramid)
+def lod_channels(dataset):
+
+	return [name for name, info in dataset.header["channels"].items() if len(info["shape"]) == 1 and np.dtype(info["dtype"]).kind in "fiub"]
+
+
+# Build the levels of a channel and write them in its file, returns the levels
+def build_channel(dataset, folder, channel):
+
+	values = np.asarray(dataset[channel], dtype = np.float32)
+	minimums, maximums = values, values
+	levels = []
+	blocks = []
+	start = 0
+	size = 1
+
+	while len(minimums) > LOD_MIN_BUCKETS:
+
+		minimums, maximums = reduce_buckets(minimums, maximums, LOD_FACTOR)
+		size *= LOD_FACTOR
+		levels.append({"size": size, "count": len(minimums), "start": start})
+		blocks.append(np.column_stack((minimums, maximums)).astype(LOD_DTYPE))
+		start += len(minimums)
+
+	path = os.path.join(folder, channel + LOD_EXTENSION)
+	tmp_path = temporary_path(path)
+
+	with open(tmp_path, "wb") as file:
+
+		for block in blocks:
+
+			block.tofile(file)
+
+		file.close()
+
+	os.replace(tmp_path, path)
+
+	return levels
+
+
+# Levels of every channel of a data set, written in folder with their index (source: the version of the data set)
+def build_pyramid(dataset, folder, source):
+
+	os.makedirs(folder, exist_ok = True)
+
+	index = {
+		"source": source,
+		"factor": LOD_FACTOR,
+		"channels": {channel: build_channel(dataset, folder, channel) for channel in lod_channels(dataset)}
+	}
+	write_json(os.path.join(folder, LOD_INDEX_NAME), index)
+
+	return index
+
+
+# Pyramid of one version of a data set, built with its manifest (PyramidStore.build): a query only maps its files
+class Pyramid:
+
+
+	def __init__(self, debug, dataset, source):
+
+		self.debug = debug
+		self.dataset = dataset
+		self.source = source
+		self.folder = os.path.join(dataset.path, LOD_FOLDER)
+		self.channels = lod_channels(dataset)
+		self.index = None
+		self.files = {}
+		self.lock = threading.Lock()
+
+		return
+
+
+	def __str__(self):
+
+		return "Pyramid class"
+
+
+	# Levels and file of a channel, no level if the pyramid of this version is missing (the samples are read instead)
+	def levels(self, channel):
+
+		with self.lock:
+
+			# Built by the catalog, possibly in another server worker
+			if self.index is None or channel not in self.index["channels"]:
+
+				index = read_json(os.path.join(self.folder, LOD_INDEX_NAME))
+
+				if index is None or index.get("source") != self.source or channel not in index["channels"]:
+
+					LOGGER.warning(f"pyramid: no {channel} levels for {self.dataset.path} ({self.source})")
+
+					return [], None
+
+				self.index = index
+
+			levels = self.index["channels"][channel]
+
+			if channel not in self.files and len(levels) > 0:
+
+				self.files[channel] = np.memmap(os.path.join(self.folder, channel + LOD_EXTENSION), dtype = LOD_DTYPE, mode = "r").reshape(-1, 2)
+
+			return levels, self.files.get(channel)
+
+
+	# Values of a channel between the samples start and end, at most points values (or (min, max) pairs)
+	# 	- the level read is the coarsest one with buckets of samples_per_point samples or less, its buckets are then merged
+	# 	  by groups: a query reads less than points x LOD_FACTOR buckets whatever the length of the data set
+	# 	- the buckets are aligned on their size from the first sample, so the same bucket always gets the same values
+	# 	  (the first and last ones can cover samples out of [start, end])
+	# Returns the layout ("values": one value per sample, "minmax": (min, max) pairs), the first sample, the samples per value and the values
+	def query(self, channel, start, end, points):
+
+		length = len(self.dataset)
+		start = min(max(int(start), 0), length)
+		end = min(max(int(end), start), length)
+
+		if end == start:
+
+			return "values", start, 1, np.empty(0, dtype = LOD_DTYPE)
+
+		samples_per_point = -(-(end - start) // points)
+
+		if samples_per_point == 1:
+
+			return "values", start, 1, np.asarray(self.dataset[channel][start:end], dtype = LOD_DTYPE)
+
+		levels, rows = self.levels(channel)
+		level = None
+
+		for candidate in levels:
+
+			if candidate["size"] <= samples_per_point:
+
+				level = candidate
+
+		size = level["size"] if level is not None else 1
+		group = -(-samples_per_point // size)
+		step = size * group
+		first = start // step * step
+		last = min(-(-end // step) * step, length)
+
+		if level is None:
+
+			minimums = maximums = np.asarray(self.dataset[channel][first:last], dtype = np.float32)
+
+		else:
+
+			buckets = rows[level["start"] + first // size:level["start"] + -(-last // size)]
+			minimums, maximums = np.array(buckets[:, 0]), np.array(buckets[:, 1])
+
+		minimums, maximums = reduce_buckets(minimums, maximums, group)
+
+		return "minmax", first, step, np.column_stack((minimums, maximums)).astype(LOD_DTYPE).ravel()
+
+
+# Pyramid of each data set (the last version of it), opened once
+class PyramidStore:
+
+
+	def __init__(self, debug):
+
+		self.debug = debug
+		self.pyramids = {}
+		self.hits = 0
+		self.opened = 0
+		self.builds = 0
+		self.lock = threading.Lock()
+
+		return
+
+
+	def __str__(self):
+
+		return "PyramidStore class"
+
+
+	def source(self, dataset):
+
+		return f"{dataset.version}-{LOD_VERSION}"
+
+
+	# Build the pyramid of a data set (with its manifest, see scripts/catalog.py)
+	def build(self, dataset):
+
+		start = time.perf_counter()
+		index = build_pyramid(dataset, os.path.join(dataset.path, LOD_FOLDER), self.source(dataset))
+
+		with self.lock:
+
+			self.builds += 1
+
+		LOGGER.info(f"pyramid: {len(index['channels'])} channels of {dataset.path} built in {time.perf_counter() - start:.3f}s")
+
+		return index
+
+
+	def get(self, dataset):
+
+		source = self.source(dataset)
+
+		with self.lock:
+
+			pyramid = self.pyramids.get(dataset.path)
+
+			if pyramid is not None and pyramid.source == source:
+
+				self.hits += 1
+
+				return pyramid
+
+			pyramid = Pyramid(self.debug, dataset, source)
+			self.pyramids[dataset.path] = pyramid
+			self.opened += 1
+
+		return pyramid
+
+
+	def stats(self):
+
+		with self.lock:
+
+			return {
+				"entries": len(self.pyramids),
+				"hits": self.hits,
+				"opened": self.opened,
+				"builds": self.builds
+			}
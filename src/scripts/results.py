@@ -0,0 +1,291 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import collections
+import threading
+import hashlib
+import tempfile
+import time
+import json
+import os
+import logging
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+LOGGER = logging.getLogger(__name__)
+STATS_EXTENSION = ".json"
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Content-addressed storage for rendered results (charts, maps, videos ...)
+# 	- a result is named after a hash of everything used to render it
+# 	- results are written in a temporary file then renamed, so a reader never gets a partial file
+# 	- the least recently used results are deleted above max_files files or max_bytes bytes (0 = no limit)
+class ResultCache:
+
+
+	def __init__(self, debug, directory, extension, max_files = 0, max_bytes = 0):
+
+		self.debug = debug
+		self.directory = directory
+		self.extension = extension
+		self.max_files = max_files
+		self.max_bytes = max_bytes
+
+		self.entries = collections.OrderedDict()
+		self.render_times = {}
+		self.size = 0
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.render_seconds = 0
+		self.saved_seconds = 0
+		self.lock = threading.Lock()
+
+		os.makedirs(directory, exist_ok = True)
+		self.scan()
+
+		return
+
+
+	def __str__(self):
+
+		return "ResultCache class"
+
+
+	# Index the results already on disk, oldest first
+	def scan(self):
+
+		files = []
+
+		for entry in os.scandir(self.directory):
+
+			# Temporary files start with a dot
+			if entry.is_file() and entry.name.endswith(self.extension) and not entry.name.startswith("."):
+
+				stat = entry.stat()
+				files.append((stat.st_mtime, entry.name[:-len(self.extension)], stat.st_size))
+
+		with self.lock:
+
+			for mtime, key, size in sorted(files):
+
+				self.entries[key] = size
+				self.size += size
+
+			self.evict()
+
+		return
+
+
+	# Hash of any json serializable parameters
+	def key(self, *parameters):
+
+		data = json.dumps(parameters, sort_keys = True, default = str, ensure_ascii = False)
+
+		return hashlib.sha256(data.encode("utf-8")).hexdigest()[:32]
+
+
+	def file_name(self, key):
+
+		return key + self.extension
+
+
+	def path(self, key):
+
+		return os.path.join(self.directory, self.file_name(key))
+
+
+	# Stats saved with a result (how it was rendered), deleted with it
+	def stats_path(self, key):
+
+		return os.path.join(self.directory, key + STATS_EXTENSION)
+
+
+	def remove(self, key):
+
+		for path in [self.path(key), self.stats_path(key)]:
+
+			try:
+
+				os.remove(path)
+
+			except FileNotFoundError:
+
+				pass
+
+		return
+
+
+	def exists(self, key):
+
+		return os.path.exists(self.path(key))
+
+
+	# Same as exists but counts a hit or a miss and marks the result as recently used
+	# A result written by a job queued by another server worker is indexed here the first time it is looked up
+	def lookup(self, key):
+
+		with self.lock:
+
+			if self.exists(key):
+
+				if key not in self.entries:
+
+					size = os.path.getsize(self.path(key))
+					self.entries[key] = size
+					self.size += size
+
+				self.hits += 1
+				self.saved_seconds += self.render_times.get(key, self.average_render_time())
+				self.entries.move_to_end(key)
+
+				return True
+
+			self.misses += 1
+
+		return False
+
+
+	# write_function receives an open binary file
+	def store(self, key, write_function):
+
+		def write_file(path):
+
+			with open(path, "wb") as file:
+
+				write_function(file)
+				file.close()
+
+			return
+
+		return self.store_file(key, write_file)
+
+
+	# write_function receives the path of a temporary file with the cache extension
+	# (for writers that need a path, like cv.VideoWriter)
+	def store_file(self, key, write_function):
+
+		render_time = write_result(self.path(key), write_function)
+
+		return self.register(key, render_time)
+
+
+	# Index a result written with write_result (by another process for example)
+	def register(self, key, render_time):
+
+		size = os.path.getsize(self.path(key))
+
+		with self.lock:
+
+			if key in self.entries:
+
+				self.size -= self.entries.pop(key)
+
+			self.entries[key] = size
+			self.size += size
+			self.render_times[key] = render_time
+			self.render_seconds += render_time
+			self.evict()
+
+		if self.debug:
+
+			LOGGER.debug(f"stored: {self.path(key)}")
+			LOGGER.debug(f"render time: {render_time:.3f}s")
+
+		return self.path(key)
+
+
+	# Delete the least recently used results, the most recent one is always kept
+	def evict(self):
+
+		while len(self.entries) > 1 and ((self.max_files and len(self.entries) > self.max_files) or (self.max_bytes and self.size > self.max_bytes)):
+
+			key, size = self.entries.popitem(last = False)
+			self.size -= size
+			self.render_times.pop(key, None)
+			self.evictions += 1
+
+			self.remove(key)
+
+		return
+
+
+	# Delete every result (when the configuration used to render them changed)
+	def clear(self):
+
+		with self.lock:
+
+			for key in self.entries:
+
+				self.remove(key)
+
+			self.evictions += len(self.entries)
+			self.entries.clear()
+			self.render_times.clear()
+			self.size = 0
+
+		if self.debug:
+
+			LOGGER.debug(f"cleared: {self.directory}")
+
+		return
+
+
+	def average_render_time(self):
+
+		if len(self.render_times) == 0:
+
+			return 0
+
+		return sum(self.render_times.values()) / len(self.render_times)
+
+
+	def stats(self):
+
+		return {
+			"entries": len(self.entries),
+			"bytes": self.size,
+			"maxFiles": self.max_files,
+			"maxBytes": self.max_bytes,
+			"hits": self.hits,
+			"misses": self.misses,
+			"evictions": self.evictions,
+			"renderSeconds": round(self.render_seconds, 3),
+			"savedSeconds": round(self.saved_seconds, 3)
+		}
+
+
+# Write a result in a temporary file (same folder and extension, name starting with a dot) then rename it
+# Returns the time spent in write_function
+def write_result(path, write_function):
+
+	directory, name = os.path.split(path)
+	descriptor, tmp_path = tempfile.mkstemp(dir = directory, prefix = ".", suffix = os.path.splitext(name)[1])
+	os.close(descriptor)
+	start = time.perf_counter()
+
+	try:
+
+		write_function(tmp_path)
+
+		# mkstemp creates the file readable by its owner only: the results are served by any user (static server, proxy)
+		os.chmod(tmp_path, 0o644)
+		os.replace(tmp_path, path)
+
+	except Exception:
+
+		os.remove(tmp_path)
+		raise
+
+	return time.perf_counter() - start
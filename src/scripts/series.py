@@ -0,0 +1,69 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import numpy as np
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Time of each sample (in seconds) for a recording period (in seconds)
+def time_axis(length, period):
+
+	return np.arange(length, dtype = "float64") * period
+
+
+# Convert values to float64 (or dtype) and give them the wanted length:
+# 	- extra samples are dropped
+# 	- missing samples are NaN (matplotlib leaves a gap, numpy nan* functions ignore them)
+def align(values, length, dtype = "float64"):
+
+	values = np.asarray(values, dtype = dtype)
+
+	if values.shape[0] >= length:
+
+		return values[:length]
+
+	aligned = np.full((length,) + values.shape[1:], np.nan, dtype = dtype)
+	aligned[:values.shape[0]] = values
+
+	return aligned
+
+
+# Build the abscissa and the ordinates of a chart (or of any export)
+# 	- x_values is None to use the time of each sample
+# 	- every ordinate is aligned on the abscissa
+def prepare_series(x_values, y_values, period):
+
+	if x_values is None:
+
+		length = max([np.shape(values)[0] for values in y_values], default = 0)
+		X = time_axis(length, period)
+
+	else:
+
+		X = np.asarray(x_values, dtype = "float64")
+
+	return X, [align(values, X.shape[0]) for values in y_values]
+
+
+# Pair latitude and longitude and drop the fixes where one of them is missing
+# Other channels (altitude ...) can be given to be filtered the same way
+def prepare_track(latitude, longitude, *channels):
+
+	length = min(np.shape(latitude)[0], np.shape(longitude)[0])
+	latitude = align(latitude, length)
+	longitude = align(longitude, length)
+	valid = np.isfinite(latitude) & np.isfinite(longitude)
+
+	track = [latitude[valid], longitude[valid]]
+
+	for values in channels:
+
+		track.append(align(values, length)[valid])
+
+	return tuple(track)
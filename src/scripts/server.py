@@ -0,0 +1,68 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import gunicorn.app.base
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Gunicorn server running an application already imported (and warmed up) in this process
+# 	- preload_app: the workers are forked from this process and share its memory copy-on-write
+# 	- gthread workers: each worker process answers several requests with threads
+# 	- send SIGHUP to the master process to gracefully restart the workers
+# 	- post_fork(server, worker) is called in each worker once it is forked
+class Server(gunicorn.app.base.BaseApplication):
+
+
+	def __init__(self, application, options):
+
+		self.application = application
+		self.options = options
+
+		super().__init__()
+
+		return
+
+
+	def __str__(self):
+
+		return "Server class"
+
+
+	def load_config(self):
+
+		for key, value in self.options.items():
+
+			if key in self.cfg.settings and value is not None:
+
+				self.cfg.set(key.lower(), value)
+
+		return
+
+
+	def load(self):
+
+		return self.application
+
+
+def serve(application, bind, workers, threads, timeout, post_fork = None):
+
+	options = {
+		"bind": bind,
+		"workers": workers,
+		"threads": threads,
+		"worker_class": "gthread",
+		"timeout": timeout,
+		"graceful_timeout": timeout,
+		"preload_app": True,
+		"post_fork": post_fork
+	}
+
+	Server(application, options).run()
+
+	return
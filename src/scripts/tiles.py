@@ -0,0 +1,193 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import threading
+import sqlite3
+import time
+import os
+import logging
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+LOGGER = logging.getLogger(__name__)
+
+USER_AGENT = "LC-SAT web application tile prefetch"
+REQUEST_TIMEOUT = 10
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Web Mercator (slippy map) tile containing each coordinate at a zoom level
+def tile_xy(latitude, longitude, zoom):
+
+	latitude = np.radians(np.clip(np.asarray(latitude, dtype = "float64"), -85.0511, 85.0511))
+	longitude = np.asarray(longitude, dtype = "float64")
+	n = 2 ** zoom
+
+	x = np.floor((longitude + 180) / 360 * n)
+	y = np.floor((1 - np.arcsinh(np.tan(latitude)) / np.pi) / 2 * n)
+
+	return np.clip(x, 0, n - 1).astype("int64"), np.clip(y, 0, n - 1).astype("int64")
+
+
+# All the (zoom, x, y) tiles covering a bounding box, padding adds tiles around the box
+def tile_pyramid(latitude_min, latitude_max, longitude_min, longitude_max, zoom_levels, padding = 0):
+
+	tiles = []
+
+	for zoom in zoom_levels:
+
+		n = 2 ** zoom
+		x, y = tile_xy([latitude_max, latitude_min], [longitude_min, longitude_max], zoom)
+
+		for tile_x in range(max(0, x[0] - padding), min(n - 1, x[1] + padding) + 1):
+
+			for tile_y in range(max(0, y[0] - padding), min(n - 1, y[1] + padding) + 1):
+
+				tiles.append((zoom, tile_x, tile_y))
+
+	return tiles
+
+
+# Tiles stored in a MBTiles file (SQLite, rows numbered from the bottom as in TMS)
+class TileStore:
+
+
+	def __init__(self, path):
+
+		self.path = path
+		self.local = threading.local()
+
+		os.makedirs(os.path.dirname(path), exist_ok = True)
+
+		with self.connection() as connection:
+
+			connection.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+			connection.execute("CREATE TABLE IF NOT EXISTS tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)")
+			connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS tile_index ON tiles (zoom_level, tile_column, tile_row)")
+
+		return
+
+
+	def __str__(self):
+
+		return "TileStore class"
+
+
+	# sqlite connections can't be shared between threads
+	def connection(self):
+
+		if getattr(self.local, "connection", None) is None:
+
+			self.local.connection = sqlite3.connect(self.path)
+
+		return self.local.connection
+
+
+	def set_metadata(self, metadata):
+
+		with self.connection() as connection:
+
+			connection.executemany("INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)", [(str(k), str(v)) for k, v in metadata.items()])
+
+		return
+
+
+	def get(self, zoom, x, y):
+
+		row = self.connection().execute(
+			"SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+			(zoom, x, 2 ** zoom - 1 - y)
+			).fetchone()
+
+		if row is None:
+
+			return None
+
+		return row[0]
+
+
+	def put(self, zoom, x, y, data):
+
+		with self.connection() as connection:
+
+			connection.execute(
+				"INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data) VALUES (?, ?, ?, ?)",
+				(zoom, x, 2 ** zoom - 1 - y, sqlite3.Binary(data))
+				)
+
+		return
+
+
+	def missing(self, tiles):
+
+		return [(zoom, x, y) for zoom, x, y in tiles if self.get(zoom, x, y) is None]
+
+
+# Download the tiles not already in the store from url ("https://.../{z}/{x}/{y}.png")
+# Returns the number of downloaded and failed tiles
+def prefetch_tiles(store, url, tiles, workers = 4, debug = False):
+
+	import requests
+
+	missing = store.missing(tiles)
+	session = requests.Session()
+	session.headers["User-Agent"] = USER_AGENT
+	adapter = requests.adapters.HTTPAdapter(pool_connections = 1, pool_maxsize = workers)
+	session.mount("http://", adapter)
+	session.mount("https://", adapter)
+
+	def fetch(tile):
+
+		zoom, x, y = tile
+
+		try:
+
+			response = session.get(url.format(z = zoom, x = x, y = y), timeout = REQUEST_TIMEOUT)
+			response.raise_for_status()
+
+		except requests.RequestException as e:
+
+			LOGGER.warning(f"{zoom}/{x}/{y} failed: {e}")
+
+			return tile, None
+
+		return tile, response.content
+
+	downloaded = 0
+	failed = 0
+	start = time.perf_counter()
+
+	# Downloads run in threads, writes stay in this thread
+	with ThreadPoolExecutor(max_workers = workers) as executor:
+
+		for (zoom, x, y), data in executor.map(fetch, missing):
+
+			if data is None:
+
+				failed += 1
+
+			else:
+
+				store.put(zoom, x, y, data)
+				downloaded += 1
+
+	session.close()
+
+	if debug:
+
+		LOGGER.debug(f"requested: {len(tiles)}, already stored: {len(tiles) - len(missing)}")
+		LOGGER.debug(f"downloaded: {downloaded}, failed: {failed} in {time.perf_counter() - start:.1f}s")
+
+	return downloaded, failed
@@ -0,0 +1,127 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import numpy as np
+import time
+import json
+import logging
+
+from scripts.motion import detect_motion
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+LOGGER = logging.getLogger(__name__)
+
+# Frames read and colored at once
+CHUNK_FRAMES = 256
+# VP8 in a WebM file: played by the browsers (unlike MJPG in an AVI file)
+FOURCC = "VP80"
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+class Video:
+
+
+	def __init__(self, debug, config_path):
+
+		self.debug = debug
+
+		with open(config_path, "r", encoding = "utf-8") as file:
+
+			self.config = json.load(file)
+			file.close()
+
+		return
+
+
+	def __str__(self):
+
+		return "Video class"
+
+
+	# 256 BGR colors going from minimalColor to mediumColor then to maximalColor (RGB in video.json)
+	def color_table(self):
+
+		minimal = np.array(self.config["minimalColor"], dtype = "float64")
+		medium = np.array(self.config["mediumColor"], dtype = "float64")
+		maximal = np.array(self.config["maximalColor"], dtype = "float64")
+
+		t = np.linspace(0, 2, 256)[:, None]
+		table = np.where(t <= 1, minimal + (medium - minimal) * t, medium + (maximal - medium) * (t - 1))
+
+		return np.rint(table[:, ::-1]).astype("uint8")
+
+
+	# Write the thermal camera frames (n x 8 x 8 temperatures) as a video
+	# 	- frames can be a memory-mapped channel, only CHUNK_FRAMES frames are in memory at once
+	# 	- each chunk is colored at once with the color table (8 x 8 pixels), then each frame is upscaled
+	# 	- progress (optional) is called with the encoded fraction after each chunk
+	# 	- returns the number of frames, the encoding time and the frames per second
+	def encode_thermal(self, frames, output, progress = None):
+
+		size = int(self.config["videoSize"])
+		minimal = float(self.config["minimalTemperature"])
+		maximal = float(self.config["maximalTemperature"])
+		table = self.color_table()
+
+		# OpenCV is slow to import, it is only imported by the first video
+		import cv2 as cv
+
+		writer = cv.VideoWriter(output, cv.VideoWriter_fourcc(*FOURCC), float(self.config["FPS"]), (size, size))
+
+		if not writer.isOpened():
+
+			raise IOError(f"Can't open the video writer for {output}")
+
+		start = time.perf_counter()
+		count = len(frames)
+
+		for first in range(0, count, CHUNK_FRAMES):
+
+			chunk = np.asarray(frames[first:first + CHUNK_FRAMES], dtype = "float32")
+
+			# Temperatures scaled to [0, 255], missing values are shown as the minimal temperature
+			indices = np.nan_to_num((chunk - minimal) * (255 / (maximal - minimal)), nan = 0)
+			colored = table[np.clip(indices, 0, 255).astype("uint8")]
+
+			# Resizing the frames one by one is faster than stacking them in the channels of a
+			# single cv.resize call, which needs a transposed copy of the whole upscaled chunk
+			for frame in colored:
+
+				writer.write(cv.resize(frame, (size, size), interpolation = cv.INTER_LINEAR))
+
+			if progress is not None:
+
+				progress(min(first + CHUNK_FRAMES, count) / count)
+
+		writer.release()
+
+		seconds = time.perf_counter() - start
+		stats = {
+			"frames": count,
+			"seconds": round(seconds, 3),
+			"fps": round(count / seconds, 1) if seconds > 0 else 0
+		}
+
+		if self.debug:
+
+			LOGGER.debug(f"thermal video: {output}")
+			LOGGER.debug(f"{stats['frames']} frames in {stats['seconds']}s ({stats['fps']} frames/s)")
+
+		return stats
+
+
+	# Box the moving regions of the camera video (motionDetection settings of video.json), see scripts/motion.py
+	def detect_motion(self, source, output, progress = None):
+
+		return detect_motion(source, output, self.config["motionDetection"], progress, self.debug)
@@ -0,0 +1,126 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import threading
+import logging
+import os
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+# =============================================================================
+# Scripts
+# =============================================================================
+
+
+# Calls on_change(paths) with the files added, modified or deleted in the watched folders
+# 	- the folders are polled every interval seconds (modification time and size of each file)
+# 	- on_change is called from the watcher thread and returns whether the files were reloaded
+# 	- files that were not reloaded stay pending: they are passed again with the next changed files
+# 	- interval 0 disables the thread, check can still be called directly
+class FileWatcher:
+
+
+	def __init__(self, debug, folders, interval, on_change):
+
+		self.debug = debug
+		self.folders = folders
+		self.interval = interval
+		self.on_change = on_change
+		self.files = self.snapshot()
+		self.pending = set()
+		self.thread = None
+		self.stopped = threading.Event()
+
+		return
+
+
+	def __str__(self):
+
+		return "FileWatcher class"
+
+
+	def snapshot(self):
+
+		files = {}
+
+		for folder in self.folders:
+
+			for entry in os.scandir(folder):
+
+				if entry.is_file():
+
+					stat = entry.stat()
+					files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+
+		return files
+
+
+	# Returns the changed files (sorted) after calling on_change with them and the pending ones
+	def check(self):
+
+		files = self.snapshot()
+		changed = sorted(path for path in files.keys() | self.files.keys() if files.get(path) != self.files.get(path))
+		self.files = files
+
+		if len(changed) > 0:
+
+			if self.debug:
+
+				LOGGER.debug(f"changed: {', '.join(changed)}")
+
+			# Still pending if on_change raises
+			self.pending.update(changed)
+
+			if self.on_change(sorted(self.pending)):
+
+				self.pending.clear()
+
+		return changed
+
+
+	def run(self):
+
+		while not self.stopped.wait(self.interval):
+
+			# A failing reload must not stop the watcher
+			try:
+
+				self.check()
+
+			except Exception:
+
+				LOGGER.exception("reload failed")
+
+		return
+
+
+	# Threads don't survive a fork: start the watcher in each server worker
+	def start(self):
+
+		if self.interval > 0 and self.thread is None:
+
+			self.stopped.clear()
+			self.thread = threading.Thread(target = self.run, name = "watcher", daemon = True)
+			self.thread.start()
+
+		return
+
+
+	def stop(self):
+
+		if self.thread is not None:
+
+			self.stopped.set()
+			self.thread.join()
+			self.thread = None
+
+		return
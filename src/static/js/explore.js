@@ -0,0 +1,255 @@
+const explore = document.getElementById("explore");
+const channelSelect = document.getElementById("exploreChannel");
+const resetButton = document.getElementById("exploreReset");
+const loading = document.getElementById("exploreLoading");
+const canvas = document.getElementById("exploreCanvas");
+const startText = document.getElementById("exploreStart");
+const endText = document.getElementById("exploreEnd");
+const unitText = document.getElementById("exploreUnit");
+
+const config = JSON.parse(explore.dataset.config);
+
+// Shortest time drawn (s): about ten samples
+const minSpan = Math.min(10 / config.sampleRate, config.duration);
+
+// Time range shown (s) and the last values received, drawn again at once when the range moves
+let view = {start: 0, end: config.duration};
+let data = null;
+let controller = null;
+let drag = null;
+let drawPending = false;
+
+// Values of the channel in the range, one per device pixel of the canvas at most
+// Read with a DataView: the server sends little-endian float32 whatever the browser is
+async function loadData() {
+
+	const points = Math.max(1, Math.min(Math.round(canvas.clientWidth * window.devicePixelRatio), config.maxPoints));
+	const url = config.dataUrl.replace("CHANNEL", channelSelect.value) + `?start=${view.start}&end=${view.end}&points=${points}`;
+
+	// Only the last request is drawn
+	if (controller != null) {
+
+		controller.abort();
+
+	}
+
+	controller = new AbortController();
+	loading.hidden = false;
+
+	try {
+
+		const response = await fetch(url, {signal: controller.signal});
+
+		if (!response.ok) {
+
+			return;
+
+		}
+
+		const buffer = await response.arrayBuffer();
+		const bytes = new DataView(buffer);
+		const values = new Float32Array(buffer.byteLength / 4);
+
+		for (let i = 0; i < values.length; i++) {
+
+			values[i] = bytes.getFloat32(i * 4, true);
+
+		}
+
+		data = {
+			channel: channelSelect.value,
+			layout: response.headers.get("X-Data-Layout"),
+			start: parseFloat(response.headers.get("X-Data-Start")),
+			step: parseFloat(response.headers.get("X-Data-Step")),
+			values: values
+		};
+
+		loading.hidden = true;
+		requestDraw();
+
+	} catch (error) {
+
+		if (error.name != "AbortError") {
+
+			loading.hidden = true;
+
+		}
+
+	}
+
+}
+
+// Times of the values, and the smallest and largest one of each of them ((min, max) pairs or a single value)
+function points() {
+
+	const pairs = data.layout == "minmax";
+	const count = pairs ? data.values.length / 2 : data.values.length;
+	const result = [];
+
+	for (let i = 0; i < count; i++) {
+
+		const low = pairs ? data.values[2 * i] : data.values[i];
+		const high = pairs ? data.values[2 * i + 1] : data.values[i];
+
+		if (!isNaN(low) && !isNaN(high)) {
+
+			// The middle of a bucket for its min and max
+			result.push([data.start + (i + (pairs ? 0.5 : 0)) * data.step, low, high]);
+
+		}
+
+	}
+
+	return result;
+
+}
+
+// Band between the min and max of each bucket (a line when there is one value per sample)
+function draw() {
+
+	drawPending = false;
+
+	const context = canvas.getContext("2d");
+	const width = canvas.width = canvas.clientWidth * window.devicePixelRatio;
+	const height = canvas.height = canvas.clientHeight * window.devicePixelRatio;
+
+	context.clearRect(0, 0, width, height);
+
+	startText.textContent = view.start.toFixed(2);
+	endText.textContent = view.end.toFixed(2);
+	unitText.textContent = channelSelect.selectedOptions.length > 0 ? channelSelect.selectedOptions[0].dataset.unit : "";
+
+	if (data == null || data.channel != channelSelect.value) {
+
+		return;
+
+	}
+
+	const shown = points().filter(([x]) => x >= view.start - data.step && x <= view.end + data.step);
+
+	if (shown.length == 0) {
+
+		return;
+
+	}
+
+	const yMin = Math.min(...shown.map(point => point[1]));
+	const yMax = Math.max(...shown.map(point => point[2]));
+	const xScale = width / Math.max(view.end - view.start, 1e-9);
+	const yScale = (height - 2) / Math.max(yMax - yMin, 1e-9);
+	const px = x => (x - view.start) * xScale;
+	const py = y => height - 1 - (y - yMin) * yScale;
+
+	context.strokeStyle = config.color;
+	context.fillStyle = config.color;
+	context.lineWidth = window.devicePixelRatio;
+	context.beginPath();
+
+	shown.forEach(([x, low, high], i) => {
+
+		if (i == 0) {
+
+			context.moveTo(px(x), py(high));
+
+		} else {
+
+			context.lineTo(px(x), py(high));
+
+		}
+
+	});
+
+	if (data.layout == "minmax") {
+
+		for (let i = shown.length - 1; i >= 0; i--) {
+
+			context.lineTo(px(shown[i][0]), py(shown[i][1]));
+
+		}
+
+		context.closePath();
+		context.fill();
+
+	}
+
+	context.stroke();
+
+}
+
+function requestDraw() {
+
+	if (!drawPending) {
+
+		drawPending = true;
+		window.requestAnimationFrame(draw);
+
+	}
+
+}
+
+// Keep the range in the flight, at least minSpan long
+function setView(start, end) {
+
+	const span = Math.min(Math.max(end - start, minSpan), config.duration);
+
+	start = Math.min(Math.max(start, 0), config.duration - span);
+	view = {start: start, end: start + span};
+
+	requestDraw();
+	loadData();
+
+}
+
+// Zoom around the time under the mouse
+canvas.addEventListener("wheel", event => {
+
+	event.preventDefault();
+
+	const factor = Math.exp(event.deltaY * 0.002);
+	const time = view.start + event.offsetX / canvas.clientWidth * (view.end - view.start);
+
+	setView(time - (time - view.start) * factor, time + (view.end - time) * factor);
+
+});
+
+canvas.addEventListener("pointerdown", event => {
+
+	drag = {x: event.clientX, view: view};
+	canvas.setPointerCapture(event.pointerId);
+
+});
+
+canvas.addEventListener("pointermove", event => {
+
+	if (drag == null) {
+
+		return;
+
+	}
+
+	const shift = (drag.x - event.clientX) / canvas.clientWidth * (drag.view.end - drag.view.start);
+
+	setView(drag.view.start + shift, drag.view.end + shift);
+
+});
+
+canvas.addEventListener("pointerup", () => drag = null);
+
+resetButton.addEventListener("click", () => setView(0, config.duration));
+channelSelect.addEventListener("change", () => {
+
+	data = null;
+	requestDraw();
+	loadData();
+
+});
+
+window.addEventListener("resize", () => {
+
+	requestDraw();
+	loadData();
+
+});
+
+loadData();
+requestDraw();
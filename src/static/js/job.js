@@ -0,0 +1,47 @@
+const job = document.getElementById("job");
+const jobProgresses = document.querySelectorAll(".jobProgress");
+const jobRunning = document.getElementById("jobRunning");
+const jobFailed = document.getElementById("jobFailed");
+
+const POLLING_DELAY = 500;
+
+// Poll the status of every job then open the result once they are all done
+function pollJobs() {
+
+	Promise.all(Array.from(jobProgresses).map(progress =>
+
+		fetch(progress.dataset.statusUrl)
+			.then(response => response.json())
+			.then(status => {
+
+				progress.value = status.progress;
+
+				return status.state;
+
+			})
+
+	))
+		.then(states => {
+
+			if (states.every(state => state == "done")) {
+
+				window.location.replace(job.dataset.resultUrl);
+
+			} else if (states.some(state => state == "failed")) {
+
+				jobRunning.hidden = true;
+				jobProgresses.forEach(progress => progress.hidden = true);
+				jobFailed.hidden = false;
+
+			} else {
+
+				setTimeout(pollJobs, POLLING_DELAY);
+
+			}
+
+		})
+		.catch(() => setTimeout(pollJobs, POLLING_DELAY));
+
+}
+
+pollJobs();
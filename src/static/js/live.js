@@ -0,0 +1,203 @@
+const live = document.getElementById("live");
+const liveWaiting = document.getElementById("liveWaiting");
+const liveRecording = document.getElementById("liveRecording");
+const liveStopped = document.getElementById("liveStopped");
+const liveDataSet = document.getElementById("liveDataSet");
+const liveState = document.getElementById("liveState");
+const canvases = document.querySelectorAll(".liveCanvas");
+
+const config = JSON.parse(live.dataset.config);
+
+// Values of each channel (at most bufferSize rows), drawn once per animation frame
+let dataSet = null;
+let times = [];
+let values = {};
+let track = [];
+let drawPending = false;
+
+let map = null;
+let trackLine = null;
+let marker = null;
+
+canvases.forEach(canvas => values[canvas.dataset.prefix] = []);
+
+function clearRows() {
+
+	times = [];
+	track = [];
+	Object.keys(values).forEach(prefix => values[prefix] = []);
+
+	if (trackLine != null) {
+
+		trackLine.setLatLngs([]);
+
+	}
+
+}
+
+function addRows(rows) {
+
+	rows.forEach(row => {
+
+		times.push(row.time);
+
+		Object.keys(values).forEach(prefix => values[prefix].push(row[prefix]));
+
+		// No GPS fix: no position or 0, 0
+		if (row.lat != null && row.lon != null && (row.lat != 0 || row.lon != 0)) {
+
+			track.push([row.lat, row.lon]);
+
+		}
+
+	});
+
+	if (times.length > config.bufferSize) {
+
+		const extra = times.length - config.bufferSize;
+
+		times.splice(0, extra);
+		Object.keys(values).forEach(prefix => values[prefix].splice(0, extra));
+
+	}
+
+	if (track.length > config.bufferSize) {
+
+		track.splice(0, track.length - config.bufferSize);
+
+	}
+
+}
+
+// Line of the values of a channel against the time, scaled to the canvas
+function drawChart(canvas) {
+
+	const prefix = canvas.dataset.prefix;
+	const channel = values[prefix];
+	const context = canvas.getContext("2d");
+	const width = canvas.width = canvas.clientWidth * window.devicePixelRatio;
+	const height = canvas.height = canvas.clientHeight * window.devicePixelRatio;
+
+	context.clearRect(0, 0, width, height);
+
+	const points = [];
+
+	for (let i = 0; i < channel.length; i++) {
+
+		if (channel[i] != null && times[i] != null) {
+
+			points.push([times[i], channel[i]]);
+
+		}
+
+	}
+
+	document.getElementById(prefix + "Value").textContent = points.length > 0 ? points[points.length - 1][1].toFixed(2) : "";
+
+	if (points.length < 2) {
+
+		return;
+
+	}
+
+	const xMin = points[0][0];
+	const xMax = points[points.length - 1][0];
+	const yMin = Math.min(...points.map(point => point[1]));
+	const yMax = Math.max(...points.map(point => point[1]));
+	const xScale = width / Math.max(xMax - xMin, 1e-9);
+	const yScale = (height - 2) / Math.max(yMax - yMin, 1e-9);
+
+	context.strokeStyle = config.trackColor;
+	context.lineWidth = window.devicePixelRatio;
+	context.beginPath();
+
+	points.forEach(([x, y], i) => {
+
+		const px = (x - xMin) * xScale;
+		const py = height - 1 - (y - yMin) * yScale;
+
+		if (i == 0) {
+
+			context.moveTo(px, py);
+
+		} else {
+
+			context.lineTo(px, py);
+
+		}
+
+	});
+
+	context.stroke();
+
+}
+
+function drawMap() {
+
+	if (track.length == 0 || typeof L == "undefined") {
+
+		return;
+
+	}
+
+	const position = track[track.length - 1];
+
+	if (map == null) {
+
+		map = L.map("liveMap").setView(position, config.zoomStart);
+		L.tileLayer(config.tilesUrl, {attribution: config.attribution}).addTo(map);
+		trackLine = L.polyline([], {color: config.trackColor}).addTo(map);
+		marker = L.marker(position).addTo(map);
+
+	}
+
+	trackLine.setLatLngs(track);
+	marker.setLatLng(position);
+
+}
+
+function draw() {
+
+	drawPending = false;
+	canvases.forEach(drawChart);
+	drawMap();
+
+}
+
+function showState(running) {
+
+	liveWaiting.hidden = dataSet != null;
+	liveRecording.hidden = dataSet == null || !running;
+	liveStopped.hidden = dataSet == null || running;
+	liveDataSet.textContent = dataSet != null ? dataSet : "";
+	liveState.className = running ? "valid" : "running";
+
+}
+
+// The browser reconnects by itself (sending the id of the last event) if the connection is lost
+const source = new EventSource(config.streamUrl);
+
+source.addEventListener("rows", event => {
+
+	const message = JSON.parse(event.data);
+
+	if (message.dataSet != dataSet) {
+
+		dataSet = message.dataSet;
+		clearRows();
+
+	}
+
+	addRows(message.rows);
+	showState(message.running);
+
+	if (!drawPending) {
+
+		drawPending = true;
+		window.requestAnimationFrame(draw);
+
+	}
+
+});
+
+window.addEventListener("resize", () => window.requestAnimationFrame(draw));
@@ -0,0 +1,26 @@
+# =============================================================================
+# Tests: run from the src folder with python -m pytest tests
+# =============================================================================
+
+
+import sys
+import os
+
+import pytest
+
+
+# The tests import the scripts like main.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# Test client of the application (main.py is imported once, it loads the settings and the data sets)
+@pytest.fixture(scope = "session")
+def client():
+
+	import main
+
+	yield main.APP.test_client()
+
+	# The log writer thread writes to the standard output captured by pytest: stopped before it is closed
+	main._jobs.shutdown()
+	main._log_handler.writer.stop()
@@ -0,0 +1,141 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import concurrent.futures
+import threading
+import json
+import time
+import os
+
+import pytest
+
+from scripts.cansat import CansatClient, CansatError
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+SETTINGS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "res/settings/")
+CALLERS = 10
+
+# Time the stub CanSat takes to answer: the callers arrive while the first request runs
+DELAY = 0.2
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+
+
+requests = pytest.importorskip("requests")
+
+
+# Transport answering the status without a network: counts the requests, fails while error is set
+class StubAdapter(requests.adapters.BaseAdapter):
+
+
+	def __init__(self):
+
+		super().__init__()
+
+		self.requests = 0
+		self.error = None
+		self.lock = threading.Lock()
+
+		return
+
+
+	def send(self, request, **kwargs):
+
+		with self.lock:
+
+			self.requests += 1
+			count = self.requests
+
+		time.sleep(DELAY)
+
+		if self.error is not None:
+
+			raise self.error
+
+		response = requests.Response()
+		response.status_code = 200
+		response.headers["Content-Type"] = "application/json"
+		response._content = json.dumps({"time": count}).encode("utf-8")
+		response.url = request.url
+		response.request = request
+
+		return response
+
+
+	def close(self):
+
+		return
+
+
+@pytest.fixture
+def cansat():
+
+	client = CansatClient(False, "http://cansat.test", os.path.join(SETTINGS_PATH, "urls.json"), os.path.join(SETTINGS_PATH, "cansat.json"))
+	adapter = StubAdapter()
+	client.session().mount("http://", adapter)
+
+	yield client, adapter
+
+	client.close()
+
+
+def call_together(function):
+
+	barrier = threading.Barrier(CALLERS)
+
+	def call():
+
+		barrier.wait()
+
+		return function()
+
+	with concurrent.futures.ThreadPoolExecutor(CALLERS) as executor:
+
+		futures = [executor.submit(call) for n in range(CALLERS)]
+
+	return [future.exception() or future.result() for future in futures]
+
+
+# Callers arriving while a status request runs share it, the next ones get the cached status
+def test_status_coalesced(cansat):
+
+	client, adapter = cansat
+
+	assert call_together(client.status) == [{"time": 1}] * CALLERS
+	assert adapter.requests == 1
+	assert client.stats()["coalescedRequests"] == CALLERS - 1
+
+	assert client.status() == {"time": 1}
+	assert adapter.requests == 1
+
+	# The cached status is too old after statusMaxAge seconds
+	time.sleep(client.config["statusMaxAge"])
+
+	assert client.status() == {"time": 2}
+	assert adapter.requests == 2
+
+
+# A failed status request fails every caller sharing it and isn't cached
+def test_status_error_shared(cansat):
+
+	client, adapter = cansat
+	adapter.error = requests.ConnectionError("unreachable")
+
+	results = call_together(client.status)
+
+	assert all(isinstance(result, CansatError) for result in results)
+	assert adapter.requests == 1
+
+	adapter.error = None
+
+	assert client.status() == {"time": 2}
@@ -0,0 +1,33 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import pytest
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+
+
+@pytest.mark.parametrize("query, status", [
+	("xData=time&pression=on", 200),
+	("xData=altitude&pression=on&lineWidth=2.5", 200),
+	("xData=bogus&pression=on", 400),
+	("xData=time&pression=on&lineWidth=abc", 400),
+	("xData=time&pression=on&lineWidth=nan", 400),
+	("xData=time&pression=on&lineWidth=-1", 400),
+	("xData=time&pression=on&pressionColor=red;", 400),
+	("xData=time&pression=on&pressionPointStyle=bogus", 400),
+	("xData=time&pression=on&pressionLineStyle=bogus", 400),
+	("xData=time", 400)
+])
+def test_chart_api_fields(client, query, status):
+
+	assert client.get(f"/api/chart/0.png?{query}").status_code == status
+
+
+def test_chart_api_unknown_data_set(client):
+
+	assert client.get("/api/chart/missing.png?pression=on").status_code == 404
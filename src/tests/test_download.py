@@ -0,0 +1,179 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import hashlib
+import json
+import io
+import os
+
+import pytest
+
+from scripts.cansat import CansatClient, CansatError
+from scripts.download import download_archive, PART_EXTENSION, META_EXTENSION
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+SETTINGS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "res/settings/")
+ARCHIVE = bytes(range(256)) * 400
+ETAG = '"archive-1"'
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+
+
+requests = pytest.importorskip("requests")
+
+
+# Transport serving the archive of the download endpoint without a network
+# 	- Range / If-Range are answered like the CanSat: 206 from the offset if the validator still matches
+# 	- cuts: bytes sent by the next answers before the connection drops (the headers announce the whole archive)
+class StubAdapter(requests.adapters.BaseAdapter):
+
+
+	def __init__(self, archive, etag, checksum):
+
+		super().__init__()
+
+		self.archive = archive
+		self.etag = etag
+		self.checksum = checksum
+		self.cuts = []
+		self.headers = []
+
+		return
+
+
+	def send(self, request, **kwargs):
+
+		self.headers.append(dict(request.headers))
+
+		response = requests.Response()
+		response.url = request.url
+		response.request = request
+		response.headers["ETag"] = self.etag
+		response.headers["X-Checksum-Sha256"] = self.checksum
+
+		offset = 0
+		range_header = request.headers.get("Range")
+
+		if range_header is not None and request.headers.get("If-Range") == self.etag:
+
+			offset = int(range_header[len("bytes="):-1])
+
+		if offset >= len(self.archive) and offset > 0:
+
+			response.status_code = 416
+			response.raw = io.BytesIO(b"")
+
+			return response
+
+		if offset > 0:
+
+			response.status_code = 206
+			response.headers["Content-Range"] = f"bytes {offset}-{len(self.archive) - 1}/{len(self.archive)}"
+
+		else:
+
+			response.status_code = 200
+
+		body = self.archive[offset:]
+		response.headers["Content-Length"] = str(len(body))
+
+		if len(self.cuts) > 0:
+
+			body = body[:self.cuts.pop(0)]
+
+		response.raw = io.BytesIO(body)
+
+		return response
+
+
+	def close(self):
+
+		return
+
+
+@pytest.fixture
+def cansat():
+
+	client = CansatClient(False, "http://cansat.test", os.path.join(SETTINGS_PATH, "urls.json"), os.path.join(SETTINGS_PATH, "cansat.json"))
+	adapter = StubAdapter(ARCHIVE, ETAG, hashlib.sha256(ARCHIVE).hexdigest())
+	client.session().mount("http://", adapter)
+
+	yield client, adapter
+
+	client.close()
+
+
+# The connection drops twice: each retry asks for the bytes left and the archive is whole in the end
+def test_resume_after_truncation(cansat, tmp_path):
+
+	client, adapter = cansat
+	adapter.cuts = [10000, 30000]
+	path = str(tmp_path / "archive")
+
+	assert download_archive(client, path) == hashlib.sha256(ARCHIVE).hexdigest()
+
+	with open(path, "rb") as file:
+
+		assert file.read() == ARCHIVE
+		file.close()
+
+	assert [headers.get("Range") for headers in adapter.headers] == [None, "bytes=10000-", "bytes=40000-"]
+	assert all(headers["If-Range"] == ETAG for headers in adapter.headers[1:])
+	assert not os.path.exists(path + PART_EXTENSION)
+	assert not os.path.exists(path + META_EXTENSION)
+
+
+# A download stopped before (the .part files left) goes on from there, only while the archive is the same:
+# the bytes of an archive that changed since are replaced
+@pytest.mark.parametrize("etag, part", [(ETAG, ARCHIVE[:25000]), ('"archive-2"', bytes(25000))])
+def test_resume_part_file(cansat, tmp_path, etag, part):
+
+	client, adapter = cansat
+	adapter.etag = etag
+	path = str(tmp_path / "archive")
+
+	with open(path + PART_EXTENSION, "wb") as file:
+
+		file.write(part)
+		file.close()
+
+	with open(path + META_EXTENSION, "w", encoding = "utf-8") as file:
+
+		json.dump({"validator": ETAG, "size": len(ARCHIVE), "checksum": adapter.checksum}, file)
+		file.close()
+
+	assert download_archive(client, path) == hashlib.sha256(ARCHIVE).hexdigest()
+	assert adapter.headers[0]["Range"] == "bytes=25000-"
+	assert adapter.headers[0]["If-Range"] == ETAG
+	assert len(adapter.headers) == 1
+
+	with open(path, "rb") as file:
+
+		assert file.read() == ARCHIVE
+		file.close()
+
+
+# A wrong archive is removed with its .part files: the next download starts again
+def test_checksum_mismatch(cansat, tmp_path):
+
+	client, adapter = cansat
+	adapter.checksum = hashlib.sha256(b"another archive").hexdigest()
+	path = str(tmp_path / "archive")
+
+	with pytest.raises(CansatError, match = "wrong checksum"):
+
+		download_archive(client, path)
+
+	assert not os.path.exists(path)
+	assert not os.path.exists(path + PART_EXTENSION)
+	assert not os.path.exists(path + META_EXTENSION)
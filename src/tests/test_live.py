@@ -0,0 +1,141 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import numpy as np
+import subprocess
+import signal
+import threading
+import socket
+import json
+import time
+import sys
+import os
+
+import pytest
+
+from scripts.datasets import DatasetWriter
+from scripts.live import LiveFeed, write_pointer, live_channels
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+SRC_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONFIG = {
+	"frameKey": None,
+	"timeKey": "time",
+	"channels": {"press": "float32", "therm": ["float16", [8, 8]]}
+}
+VIEWERS = 5
+TIMEOUT = 5
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+
+
+def write_rows(writer, count):
+
+	writer.append([{"press": 1000.0 + n, "therm": np.zeros((8, 8)), "time": float(n)} for n in range(count)])
+
+	return
+
+
+# Every viewer gets the rows, none of them is refused below maxClients
+def test_feed_viewers(tmp_path):
+
+	os.makedirs(tmp_path / "normal")
+	writer = DatasetWriter(str(tmp_path / "normal" / "1"), live_channels(CONFIG), 1.0)
+	write_pointer(str(tmp_path), {"dataSet": "1", "running": True, "started": time.time()})
+
+	feed = LiveFeed(False, str(tmp_path), 100, 0.01, VIEWERS)
+	received = [[] for n in range(VIEWERS)]
+
+	def view(rows):
+
+		data_set, index, running = None, 0, None
+
+		while len(rows) < 3:
+
+			data_set, first, new_rows, running = feed.wait(data_set, index, running, TIMEOUT)
+			index = first + len(new_rows)
+			rows.extend(json.loads(row) for row in new_rows)
+
+		return
+
+	assert all(feed.connect() for n in range(VIEWERS))
+	assert not feed.connect()
+
+	threads = [threading.Thread(target = view, args = (rows,), daemon = True) for rows in received]
+
+	for thread in threads:
+
+		thread.start()
+
+	write_rows(writer, 3)
+
+	for thread in threads:
+
+		thread.join(TIMEOUT)
+
+	writer.close()
+
+	assert feed.stats()["clients"] == VIEWERS
+	assert all([row["press"] for row in rows] == [1000.0, 1001.0, 1002.0] for rows in received)
+
+
+def free_port():
+
+	with socket.socket() as sock:
+
+		sock.bind(("127.0.0.1", 0))
+
+		return sock.getsockname()[1]
+
+
+# More viewers than serverThreads in each worker of the serve command: they have their own threads
+def test_serve_viewers():
+
+	pytest.importorskip("gunicorn")
+	requests = pytest.importorskip("requests")
+
+	bind = f"127.0.0.1:{free_port()}"
+	server = subprocess.Popen([sys.executable, "main.py", "serve", bind], cwd = SRC_PATH, stdout = subprocess.DEVNULL, stderr = subprocess.DEVNULL, start_new_session = True)
+	session = requests.Session()
+	streams = []
+
+	try:
+
+		deadline = time.monotonic() + 120
+
+		while True:
+
+			try:
+
+				requests.get(f"http://{bind}/api/live", timeout = 1)
+				break
+
+			except requests.ConnectionError:
+
+				assert time.monotonic() < deadline and server.poll() is None
+				time.sleep(0.5)
+
+		# More viewers than the serverThreads threads of all the workers (4 x 4 with the settings)
+		for n in range(20):
+
+			streams.append(session.get(f"http://{bind}/api/live/stream", stream = True, timeout = TIMEOUT))
+
+		assert [response.status_code for response in streams] == [200] * len(streams)
+		assert requests.get(f"http://{bind}/api/live", timeout = TIMEOUT).status_code == 200
+
+	finally:
+
+		# The workers would wait for the keep-alive comments to notice the closed streams: the master and its workers are killed
+		session.close()
+		os.killpg(server.pid, signal.SIGKILL)
+		server.wait(TIMEOUT)
@@ -0,0 +1,74 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import numpy as np
+import os
+
+from scripts import pyramid as pyramid_module
+from scripts.datasets import DatasetRegistry, Dataset, write_dataset
+from scripts.catalog import Catalog
+from scripts.pyramid import PyramidStore, LOD_FOLDER, LOD_INDEX_NAME, reduce_buckets
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+SAMPLE_RATE = 1 / 0.3
+LENGTH = 100000
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+
+
+def create_catalog(tmp_path):
+
+	data_path = str(tmp_path / "normal")
+	os.makedirs(os.path.join(data_path, "1"))
+	generator = np.random.default_rng(0)
+	write_dataset(os.path.join(data_path, "1"), {"press": (1000 + np.cumsum(generator.normal(0, 0.1, LENGTH))).astype(np.float32)}, SAMPLE_RATE)
+
+	registry = DatasetRegistry(False, data_path, SAMPLE_RATE, 2 ** 30)
+	pyramids = PyramidStore(False)
+
+	return Catalog(False, registry, str(tmp_path / "catalog.json"), pyramids), registry, pyramids
+
+
+# The pyramid is written with the manifest, a query only reads it
+def test_pyramid_built_with_manifest(tmp_path, monkeypatch):
+
+	catalog, registry, pyramids = create_catalog(tmp_path)
+
+	assert catalog.manifest("1") is not None
+	assert os.path.isfile(os.path.join(registry.path("1"), LOD_FOLDER, LOD_INDEX_NAME))
+	assert pyramids.stats()["builds"] == 1
+
+	def build_channel(*args):
+
+		raise AssertionError("pyramid built by a query")
+
+	monkeypatch.setattr(pyramid_module, "build_channel", build_channel)
+
+	dataset = Dataset(registry.path("1"))
+	layout, first, step, values = pyramids.get(dataset).query("press", 0, LENGTH, 100)
+	minimums, maximums = reduce_buckets(np.asarray(dataset["press"]), np.asarray(dataset["press"]), step)
+
+	assert layout == "minmax" and first == 0 and step >= LENGTH // 100
+	assert np.array_equal(values[0::2], minimums) and np.array_equal(values[1::2], maximums)
+
+
+# Without its pyramid (another version of the data set) a query reads the samples
+def test_query_without_pyramid(tmp_path):
+
+	catalog, registry, pyramids = create_catalog(tmp_path)
+	dataset = Dataset(registry.path("1"))
+	layout, first, step, values = pyramids.get(dataset).query("press", 0, LENGTH, 100)
+	minimums, maximums = reduce_buckets(np.asarray(dataset["press"]), np.asarray(dataset["press"]), step)
+
+	assert pyramids.stats()["builds"] == 0
+	assert np.array_equal(values[0::2], minimums) and np.array_equal(values[1::2], maximums)
@@ -0,0 +1,114 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import sqlite3
+
+import pytest
+
+from scripts.tiles import TileStore, tile_xy
+
+
+# =============================================================================
+# Consts
+# =============================================================================
+
+
+# Tiles of the fixture: (zoom, x, y) in the slippy map numbering, the file stores the rows from the bottom (TMS)
+PNG_TILE = b"\x89PNG\r\n\x1a\n" + b"png tile"
+JPEG_TILE = b"\xff\xd8\xff" + b"jpeg tile"
+TILES = {
+	(12, 2074, 1409): PNG_TILE,
+	(13, 4148, 2819): JPEG_TILE
+}
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+
+
+# A small MBTiles file written with sqlite only, like the files made by other tools
+@pytest.fixture
+def mbtiles(tmp_path):
+
+	path = tmp_path / "fixture.mbtiles"
+	connection = sqlite3.connect(path)
+
+	with connection:
+
+		connection.execute("CREATE TABLE metadata (name TEXT, value TEXT)")
+		connection.execute("CREATE TABLE tiles (zoom_level INTEGER, tile_column INTEGER, tile_row INTEGER, tile_data BLOB)")
+		connection.executemany("INSERT INTO metadata VALUES (?, ?)", [("name", "fixture"), ("format", "png")])
+		connection.executemany(
+			"INSERT INTO tiles VALUES (?, ?, ?, ?)",
+			[(zoom, x, 2 ** zoom - 1 - y, data) for (zoom, x, y), data in TILES.items()]
+			)
+
+	connection.close()
+
+	return path
+
+
+def test_store_hit_and_miss(mbtiles):
+
+	store = TileStore(str(mbtiles))
+
+	assert store.get(12, 2074, 1409) == PNG_TILE
+	assert store.get(12, 2074, 2 ** 12 - 1 - 1409) is None
+	assert store.missing(list(TILES) + [(12, 0, 0)]) == [(12, 0, 0)]
+
+
+# Paris is in the png tile of the fixture
+def test_tile_xy():
+
+	x, y = tile_xy([48.8566], [2.3522], 12)
+
+	assert (int(x[0]), int(y[0])) == (2074, 1409)
+
+
+@pytest.fixture
+def offline_tiles(client, mbtiles, monkeypatch):
+
+	import main
+
+	monkeypatch.setattr(main, "TILES_PATH", str(mbtiles.parent))
+	monkeypatch.setattr(main, "_tile_store", None)
+	monkeypatch.setitem(main._map.tiles, "offlineTiles", dict(main._map.tiles["offlineTiles"], enabled = True, file = mbtiles.name, zoomLevels = [12, 13]))
+
+	return client
+
+
+@pytest.mark.parametrize("url, status, mimetype", [
+	("/tiles/12/2074/1409.png", 200, "image/png"),
+	("/tiles/13/4148/2819.png", 200, "image/jpeg"),
+	("/tiles/12/2074/1410.png", 404, None),
+	("/tiles/14/0/0.png", 404, None),
+	("/tiles/12/4096/0.png", 404, None),
+	("/tiles/12/0/4096.png", 404, None),
+	("/tiles/12/-1/0.png", 404, None)
+])
+def test_tile_route(offline_tiles, url, status, mimetype):
+
+	response = offline_tiles.get(url)
+
+	assert response.status_code == status
+
+	if status == 200:
+
+		assert response.mimetype == mimetype
+		assert response.get_data() == TILES[tuple(int(part) for part in url[len("/tiles/"):-len(".png")].split("/"))]
+
+
+# Disabled offline tiles: no MBTiles file is created
+def test_tile_route_disabled(client, tmp_path, monkeypatch):
+
+	import main
+
+	monkeypatch.setattr(main, "TILES_PATH", str(tmp_path / "tiles"))
+	monkeypatch.setattr(main, "_tile_store", None)
+	monkeypatch.setitem(main._map.tiles, "offlineTiles", dict(main._map.tiles["offlineTiles"], enabled = False))
+
+	assert client.get("/tiles/12/2074/1409.png").status_code == 404
+	assert not (tmp_path / "tiles").exists()
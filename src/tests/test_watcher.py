@@ -0,0 +1,70 @@
+# =============================================================================
+# Imports
+# =============================================================================
+
+
+import os
+
+from scripts.watcher import FileWatcher
+
+
+# =============================================================================
+# Tests
+# =============================================================================
+
+
+def touch(path, text):
+
+	with open(path, "w", encoding = "utf-8") as file:
+
+		file.write(text)
+		file.close()
+
+	# Same size, the modification time must differ
+	stat = os.stat(path)
+	os.utime(path, ns = (stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+	return
+
+
+# A file changed with a broken one is passed again once the broken one is fixed
+def test_failed_reload_pending(tmp_path):
+
+	settings_path = str(tmp_path / "settings.yaml")
+	maps_path = str(tmp_path / "maps.json")
+	touch(settings_path, "debug: true")
+	touch(maps_path, "{}")
+
+	calls = []
+
+	def on_change(paths):
+
+		calls.append(paths)
+
+		# maps.json doesn't load while it is broken
+		with open(maps_path, "r", encoding = "utf-8") as file:
+
+			broken = file.read() == "{"
+			file.close()
+
+		return maps_path not in paths or not broken
+
+	watcher = FileWatcher(False, [str(tmp_path)], 0, on_change)
+
+	touch(settings_path, "debug: false")
+	touch(maps_path, "{")
+	assert watcher.check() == sorted([maps_path, settings_path])
+	assert watcher.pending == {maps_path, settings_path}
+
+	# Nothing changed: nothing is reloaded
+	assert watcher.check() == []
+	assert len(calls) == 1
+
+	touch(maps_path, "{}")
+	assert watcher.check() == [maps_path]
+	assert calls[-1] == sorted([maps_path, settings_path])
+	assert watcher.pending == set()
+
+	touch(maps_path, "[]")
+	watcher.check()
+	assert calls[-1] == [maps_path]